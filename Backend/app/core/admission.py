@@ -0,0 +1,213 @@
+"""
+Admission control: keeps one client from starving everyone else of the database.
+
+Every authenticated request is charged its route's cost (ROUTE_COSTS, 1 by
+default) against a per-user budget of cost units per RATE_LIMIT_WINDOW_SECONDS,
+and holds one of the user's concurrent-request slots until it finishes.
+Both limits depend on the user's role (RATE_LIMITS, CONCURRENCY_LIMITS). The
+budget is a sliding window: the previous window's usage counts in proportion
+to how much of it still overlaps the last RATE_LIMIT_WINDOW_SECONDS. Requests
+over either limit get 429 with Retry-After.
+
+When the moving average of SQL statement latency exceeds LOAD_SHED_LATENCY_MS,
+routes costing LOAD_SHED_MIN_COST or more get 503 with Retry-After, for at
+least LOAD_SHED_HOLD_SECONDS. Cheaper requests are still served, and their
+statements let the average recover.
+
+Every request touches the rate and concurrency counters, so they only go
+through app.core.shared_state when SHARED_STATE_BACKEND is redis, where an
+increment is cheap. With the database backend they would cost every request,
+GETs included, write transactions on the database the limits protect. So with
+that backend and the memory backend, each worker keeps its own counters. The
+rate limits are then split evenly across the WEB_CONCURRENCY workers, and each
+worker caps a user's in-flight requests at the full concurrency limit. The
+shedding flag is written rarely and read at most once a second, so it is
+always shared.
+"""
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from .config import get_settings
+from .metrics import route_template
+from .shared_state import MemoryState, get_shared_state
+
+# (method, route template) -> cost in rate-limit units
+ROUTE_COSTS = {
+    ("GET", "/reports/monthly"): 10,
+    ("POST", "/reports/jobs"): 10,
+    ("GET", "/reports/trend"): 3,
+    ("GET", "/dashboard/stats"): 3,
+    ("POST", "/items/bulk"): 10,
+    ("GET", "/items/export"): 10,
+    ("GET", "/items/facets"): 2,
+    ("POST", "/items/batch"): 2,
+    ("GET", "/locations/summary"): 3,
+    ("GET", "/audit-logs/export"): 10,
+}
+DEFAULT_COST = 1
+
+SHED_KEY = "admission:shedding"
+# How often a worker that is not itself overloaded looks at the shared shedding flag
+SHED_CHECK_INTERVAL = 1.0
+# Slots leaked by a crashed worker are released after this long
+CONCURRENCY_TTL = 600
+LATENCY_SMOOTHING = 0.1
+
+
+def route_cost(scope) -> int:
+    return ROUTE_COSTS.get((scope["method"], route_template(scope)), DEFAULT_COST)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, state=None, rate_limits: Optional[Dict[str, int]] = None,
+                 concurrency_limits: Optional[Dict[str, int]] = None, window_seconds: Optional[int] = None,
+                 shed_latency_ms: Optional[float] = None, shed_min_cost: Optional[int] = None,
+                 shed_hold_seconds: Optional[float] = None, clock=time.time):
+        settings = get_settings()
+        self._state = state
+        self.rate_limits = settings.rate_limit_by_role if rate_limits is None else rate_limits
+        self.concurrency_limits = settings.concurrency_limit_by_role if concurrency_limits is None else concurrency_limits
+        self.window = window_seconds or settings.rate_limit_window_seconds
+        self.shed_latency = (settings.load_shed_latency_ms if shed_latency_ms is None else shed_latency_ms) / 1000
+        self.shed_min_cost = settings.load_shed_min_cost if shed_min_cost is None else shed_min_cost
+        self.shed_hold = settings.load_shed_hold_seconds if shed_hold_seconds is None else shed_hold_seconds
+        self.clock = clock
+        # Where the per-request counters live; see the module docstring
+        self._local_counters = state is None and settings.shared_state_backend != "redis"
+        self._counters = MemoryState() if self._local_counters else None
+        self.workers = max(1, settings.web_concurrency or 1) if self._local_counters else 1
+        self.latency = 0.0
+        self._lock = threading.Lock()
+        self._previous = {}  # user key -> (window index, usage in that window)
+        self._shed_published_until = 0.0
+        self._shed_flag = False
+        self._shed_checked_at = 0.0
+
+    @property
+    def state(self):
+        return self._state if self._state is not None else get_shared_state()
+
+    @property
+    def counters(self):
+        return self._counters if self._local_counters else self.state
+
+    def observe_statement(self, seconds: float):
+        self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def shedding(self) -> bool:
+        now = self.clock()
+        if self.latency > self.shed_latency:
+            # Tell the other workers, refreshing the flag before it expires
+            if now >= self._shed_published_until - self.shed_hold / 2:
+                self.state.set(SHED_KEY, "1", ttl=self.shed_hold)
+                self._shed_published_until = now + self.shed_hold
+            return True
+        if now >= self._shed_checked_at + SHED_CHECK_INTERVAL:
+            self._shed_flag = self.state.get(SHED_KEY) is not None
+            self._shed_checked_at = now
+        return self._shed_flag
+
+    def admit(self, user_key: str, role: str, cost: int = DEFAULT_COST):
+        """Take ``cost`` units and a concurrency slot for the user, or raise AdmissionRejected."""
+        if cost >= self.shed_min_cost and self.shedding():
+            raise AdmissionRejected(503, "The server is under heavy load; try again later", math.ceil(self.shed_hold))
+        limit = self.concurrency_limits.get(role)
+        key = f"admission:active:{user_key}"
+        if limit is not None and self.counters.incr(key, 1, ttl=CONCURRENCY_TTL) > limit:
+            self.counters.incr(key, -1, ttl=CONCURRENCY_TTL)
+            raise AdmissionRejected(429, "Too many concurrent requests", 1)
+        # Charged only once the request has a slot, so a rejected request costs nothing
+        try:
+            self._charge(user_key, role, cost)
+        except AdmissionRejected:
+            if limit is not None:
+                self.counters.incr(key, -1, ttl=CONCURRENCY_TTL)
+            raise
+
+    def release(self, user_key: str, role: str):
+        if role in self.concurrency_limits:
+            self.counters.incr(f"admission:active:{user_key}", -1, ttl=CONCURRENCY_TTL)
+
+    def _charge(self, user_key: str, role: str, cost: int):
+        limit = self.rate_limits.get(role)
+        if limit is None:
+            return
+        limit = math.ceil(limit / self.workers)
+        now = self.clock()
+        index, offset = divmod(now, self.window)
+        index = int(index)
+        key = f"admission:rate:{user_key}:{index}"
+        used = self.counters.incr(key, cost, ttl=2 * self.window)
+        previous = self._previous_usage(user_key, index)
+        weight = 1 - offset / self.window
+        if previous * weight + used <= limit:
+            return
+        self.counters.incr(key, -cost, ttl=2 * self.window)
+        raise AdmissionRejected(429, "Rate limit exceeded",
+                                self._retry_after(limit, cost, used - cost, previous, offset))
+
+    def _previous_usage(self, user_key: str, index: int) -> int:
+        # A finished window no longer changes, so each worker reads it once
+        with self._lock:
+            cached = self._previous.get(user_key)
+        if cached is not None and cached[0] == index:
+            return cached[1]
+        value = int(self.counters.get(f"admission:rate:{user_key}:{index - 1}") or 0)
+        with self._lock:
+            self._previous[user_key] = (index, value)
+        return value
+
+    def _retry_after(self, limit: int, cost: int, used: int, previous: int, offset: float) -> int:
+        """Seconds until the sliding window has room for ``cost`` more units."""
+        if used + cost <= limit and previous:
+            # Wait for the previous window's share to shrink enough
+            wait = self.window * (1 - (limit - used - cost) / previous) - offset
+        else:
+            # This window is full: wait for the next one, where it counts as the previous window
+            wait = self.window - offset
+            if used:
+                wait += self.window * max(0.0, 1 - (limit - cost) / used)
+        return max(1, math.ceil(wait))
+
+
+def monitor_engine(engine):
+    """Feed the latency of every statement on ``engine`` to the admission controller."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("admission_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        get_admission_controller().observe_statement(time.perf_counter() - conn.info["admission_start"].pop())
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide admission controller, created on first use."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+    return _controller
+
+
+def set_admission_controller(controller: Optional[AdmissionController]):
+    """Replace the controller (used by tests)."""
+    global _controller
+    _controller = controller
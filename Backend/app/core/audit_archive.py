@@ -0,0 +1,176 @@
+"""
+Audit log retention.
+
+Whole months older than AUDIT_RETENTION_MONTHS are moved out of audit_logs
+into one gzip-compressed newline-delimited JSON file per month under
+AUDIT_ARCHIVE_DIR (audit-2024-01.ndjson.gz), newest entry first. Run it from
+cron; monthly is enough and more often is harmless:
+
+    python -m app.core.audit_archive
+
+Archived months stay readable. The monthly report reads a month's file
+whenever it exists, and the audit-log list, search and export include
+archived entries with include_archived=true. Archiving a month again (for example
+after entries with old timestamps were imported) merges into its file.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..schemas import audit as audit_schemas
+from .config import get_settings
+from .serialization import dumps, schema_columns
+
+ARCHIVE_NAME = re.compile(r"^audit-(\d{4})-(\d{2})\.ndjson\.gz$")
+
+
+def archive_dir(directory=None) -> Path:
+    return Path(directory if directory is not None else get_settings().audit_archive_dir)
+
+
+def archive_path(year: int, month: int, directory=None) -> Path:
+    return archive_dir(directory) / f"audit-{year}-{month:02d}.ndjson.gz"
+
+
+def archived_months(directory=None) -> List[Tuple[int, int]]:
+    """(year, month) of every archive file, newest first."""
+    path = archive_dir(directory)
+    if not path.is_dir():
+        return []
+    months = [ARCHIVE_NAME.match(name) for name in os.listdir(path)]
+    return sorted(((int(m.group(1)), int(m.group(2))) for m in months if m), reverse=True)
+
+
+def read_month(year: int, month: int, directory=None) -> List[dict]:
+    """The archived entries of a month, newest first; empty if the month is not archived."""
+    path = archive_path(year, month, directory)
+    if not path.exists():
+        return []
+    rows = []
+    with gzip.open(path, "rb") as archive:
+        for line in archive:
+            row = json.loads(line)
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            rows.append(row)
+    return rows
+
+
+def archived_logs(user_id: Optional[int] = None, fields: Optional[List[str]] = None, directory=None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  match: Optional[Callable[[dict], bool]] = None) -> Iterator[dict]:
+    """
+    Archived entries, newest first, optionally only ``user_id``'s, those in
+    [since, until) and those ``match`` accepts, with only ``fields`` (see
+    serialization.parse_fields). Reads one month at a time, skipping the
+    months outside the time range.
+    """
+    for year, month in archived_months(directory):
+        if until is not None and _month_start(year, month) >= until:
+            continue
+        if since is not None and _month_start(*_next_month(year, month)) <= since:
+            break
+        for row in read_month(year, month, directory):
+            if user_id and row["user_id"] != user_id:
+                continue
+            if (since is not None and row["timestamp"] < since) or (until is not None and row["timestamp"] >= until):
+                continue
+            if match is not None and not match(row):
+                continue
+            yield {name: row.get(name) for name in fields} if fields else row
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year, month, 1)
+
+
+def _next_month(year: int, month: int) -> Tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def archive_month(db: Session, year: int, month: int, directory=None) -> int:
+    """Move one month of audit_logs into its archive file. Returns the number of entries moved."""
+    start, end = _month_start(year, month), _month_start(*_next_month(year, month))
+    in_month = (models.AuditLog.timestamp >= start, models.AuditLog.timestamp < end)
+    rows = [row._asdict() for row in
+            db.query(*schema_columns(models.AuditLog, audit_schemas.AuditLog)).filter(*in_month)]
+    if not rows:
+        return 0
+    moved = len(rows)
+    # Keep what an earlier run archived; an entry left in the database by a
+    # run that failed after writing the file replaces its archived copy
+    ids = {row["id"] for row in rows}
+    rows += [row for row in read_month(year, month, directory) if row["id"] not in ids]
+    rows.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+
+    path = archive_path(year, month, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed, so readers never see a partial file
+    partial = path.with_name(path.name + ".partial")
+    with gzip.open(partial, "wb") as archive:
+        for row in rows:
+            archive.write(dumps(row) + b"\n")
+    db.query(models.AuditLog).filter(*in_month).delete(synchronize_session=False)
+    os.replace(partial, path)
+    db.commit()
+    return moved
+
+
+def retention_cutoff(keep_months: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest month kept in the database."""
+    now = now or datetime.utcnow()
+    index = now.year * 12 + now.month - 1 - keep_months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def archive_old_logs(db: Session, keep_months: Optional[int] = None, now: Optional[datetime] = None,
+                     directory=None, progress: Optional[Callable[[int, int, int], None]] = None) -> int:
+    """
+    Archive every month before the last ``keep_months`` (AUDIT_RETENTION_MONTHS
+    by default; 0 archives nothing). Returns the number of entries moved.
+    """
+    if keep_months is None:
+        keep_months = get_settings().audit_retention_months
+    if keep_months <= 0:
+        return 0
+    cutoff = retention_cutoff(keep_months, now)
+    oldest = db.query(models.AuditLog.timestamp).filter(models.AuditLog.timestamp < cutoff) \
+        .order_by(models.AuditLog.timestamp).limit(1).scalar()
+    total = 0
+    year, month = (oldest.year, oldest.month) if oldest else (cutoff.year, cutoff.month)
+    while _month_start(year, month) < cutoff:
+        moved = archive_month(db, year, month, directory)
+        total += moved
+        if progress and moved:
+            progress(year, month, moved)
+        year, month = _next_month(year, month)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old audit log entries into monthly archive files.")
+    parser.add_argument("--keep-months", type=int, help="months kept in the database (default: AUDIT_RETENTION_MONTHS)")
+    args = parser.parse_args()
+
+    from ..db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = archive_old_logs(
+            db, keep_months=args.keep_months,
+            progress=lambda year, month, moved: print(f"{year}-{month:02d}: archived {moved} entries")
+        )
+    finally:
+        db.close()
+    print(f"Archived {total} audit log entries to {archive_dir()}.")
+
+
+if __name__ == "__main__":
+    main()
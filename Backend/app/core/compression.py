@@ -0,0 +1,185 @@
+"""
+gzip / brotli response compression.
+
+`CompressionMiddleware` is pure ASGI. A response that arrives in one piece
+is compressed only if it is at least COMPRESSION_MINIMUM_SIZE bytes. A
+streamed response, such as an NDJSON export, is compressed chunk by chunk and
+flushed after each one, so the client keeps receiving data as it is produced.
+Server-Sent Events and already-encoded responses pass through untouched.
+brotli is used when the `brotli` package is installed and the client accepts
+it. Bytes in/out and CPU time per encoding are recorded in app.core.metrics.
+"""
+import time
+import zlib
+from typing import Optional
+
+from .config import get_settings
+from .metrics import registry
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Lower-cased encodings an Accept-Encoding header allows (q > 0), "*" included."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header: "br", "gzip" or None."""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = None, gzip_level: int = None, brotli_quality: int = None):
+        settings = get_settings()
+        self.app = app
+        self.enabled = settings.compression_enabled
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+        self.gzip_level = settings.compression_gzip_level if gzip_level is None else gzip_level
+        self.brotli_quality = settings.compression_brotli_quality if brotli_quality is None else brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+    def compressor(self, encoding: str):
+        return _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+
+
+class _CompressingSend:
+    """Wraps `send` for one response, deciding on the first body message whether to compress."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def _eligible(self, headers) -> bool:
+        content_type = ""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        if content_type.startswith(EXCLUDED_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        started = time.thread_time()
+        data = self.compressor.compress(body)
+        data += self.compressor.finish() if final else self.compressor.flush()
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(data)
+        if final:
+            registry.record_compression(self.encoding, self.bytes_in, self.bytes_out, self.cpu_seconds)
+        return data
+
+    def _start_compressed(self, content_length: Optional[int]):
+        headers = [(k, v) for k, v in self.start["headers"] if k not in (b"content-length", b"vary")]
+        vary = [v for k, v in self.start["headers"] if k == b"vary"]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return {**self.start, "headers": headers}
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._eligible(message.get("headers", []))
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.compressor = self.middleware.compressor(self.encoding)
+            if not more_body:
+                data = self._compress(body, final=True)
+                await self.send(self._start_compressed(len(data)))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            # Streaming: length unknown up front, flush every chunk
+            await self.send(self._start_compressed(None))
+
+        data = self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
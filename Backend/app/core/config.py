@@ -0,0 +1,129 @@
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Application settings, read once from the environment and `.env`.
+    Field names match the upper-case environment variables in `.env.template`.
+    """
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Auth
+    secret_key: Optional[str] = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    allowed_origins: str = ""
+
+    # Database
+    database_url: str = "sqlite:///./sql_app.db"
+    database_replica_url: Optional[str] = None
+    db_profile: str = "production"
+    read_your_writes_seconds: float = 5.0
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_pool_size: int = 20
+    sqlite_max_overflow: int = 10
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
+    # Workers / shared state
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: Optional[int] = None
+    shared_state_backend: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    log_level: str = "INFO"
+    events_poll_interval: float = 1.0
+    events_heartbeat_seconds: float = 15.0
+    # Lifetime of the single-purpose tickets EventSource clients open the stream with
+    stream_ticket_seconds: int = 60
+
+    # Metrics
+    metrics_dir: Optional[str] = None
+    metrics_token: Optional[str] = None
+    query_debug: bool = False
+    query_repeat_threshold: int = 5
+    # Statements slower than this are logged with their plan (0 turns it off)
+    slow_query_ms: float = 200.0
+    slow_query_log_file: Optional[str] = "./slow_queries.log"
+
+    # Identical concurrent report/dashboard requests share one computation,
+    # and its result is reused for this long
+    coalesce_ttl_seconds: float = 2.0
+
+    # Admission control: per-user cost budgets and concurrent requests by role
+    # ("role=limit,..."), and shedding of expensive routes under database load
+    admission_enabled: bool = True
+    rate_limits: str = "admin=1200,manager=600,viewer=300"
+    rate_limit_window_seconds: int = 60
+    concurrency_limits: str = "admin=8,manager=6,viewer=4"
+    load_shed_latency_ms: float = 250.0
+    load_shed_min_cost: int = 5
+    load_shed_hold_seconds: float = 10.0
+
+    # Background report jobs
+    report_workers: int = 2
+    report_artifact_dir: str = "./report_artifacts"
+    report_job_timeout_seconds: int = 900
+
+    # Audit log retention: whole months older than this many months are moved
+    # to compressed files (0 keeps everything in the database)
+    audit_retention_months: int = 12
+    audit_archive_dir: str = "./audit_archive"
+
+    # Daily inventory snapshot for historical reports, taken by app.serve at
+    # this UTC time ("HH:MM"). Leave empty when cron runs app.core.snapshots.
+    snapshot_time_utc: str = "23:50"
+
+    # Per-request profiling (X-Profile: 1, admins only)
+    profile_dir: str = "./profiles"
+    profile_interval_ms: float = 5.0
+    profile_keep: int = 50
+
+    # Response compression
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # SMTP
+    smtp_server: Optional[str] = None
+    smtp_port: int = 587
+    smtp_username: Optional[str] = None
+    smtp_password: Optional[str] = None
+    alert_receiver_email: Optional[str] = None
+    sender_email: Optional[str] = None
+
+    @property
+    def cors_origins(self) -> List[str]:
+        return [origin.strip() for origin in self.allowed_origins.split(",") if origin.strip()]
+
+    @property
+    def rate_limit_by_role(self) -> Dict[str, int]:
+        return _role_limits(self.rate_limits)
+
+    @property
+    def concurrency_limit_by_role(self) -> Dict[str, int]:
+        return _role_limits(self.concurrency_limits)
+
+
+def _role_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for part in value.split(","):
+        role, _, limit = part.partition("=")
+        if role.strip():
+            limits[role.strip()] = int(limit)
+    return limits
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
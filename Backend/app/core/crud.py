@@ -1,7 +1,85 @@
-from sqlalchemy.orm import Session
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, bindparam, case, func, select, text, tuple_, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.exc import StaleDataError
 from ..db import models
 from ..schemas import item as schemas
 from ..schemas import audit as audit_schemas
+from ..schemas import location as location_schemas
+from . import events
+from .shared_state import get_shared_state
+from .serialization import rows_to_dicts, schema_columns
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_THRESHOLD = 10
+UPDATE_ATTEMPTS = 3
+
+# "Most active items" windows, read from hourly item_activity buckets
+ACTIVITY_WINDOWS = {"24h": timedelta(hours=24), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+ACTIVITY_RETENTION = max(ACTIVITY_WINDOWS.values())
+
+class InsufficientStockError(Exception):
+    """The write would take an item's quantity below zero."""
+
+class VersionMismatchError(Exception):
+    """The item changed after the version the client based its update on."""
+
+class UnknownLocationError(Exception):
+    """No location has the given id."""
+
+def _stock_status(quantity: int):
+    if quantity == 0:
+        return "out_of_stock"
+    if 0 < quantity < LOW_STOCK_THRESHOLD:
+        return "low_stock"
+    return None
+
+def publish_item_change(old_quantity: int = None, new_quantity: int = None):
+    """Publish how an item write moved the dashboard summary counters (None = item absent)."""
+    delta = {"total_items": 0, "low_stock": 0, "out_of_stock": 0}
+    if old_quantity is None:
+        delta["total_items"] += 1
+    if new_quantity is None:
+        delta["total_items"] -= 1
+    for quantity, sign in ((old_quantity, -1), (new_quantity, 1)):
+        status = _stock_status(quantity) if quantity is not None else None
+        if status:
+            delta[status] += sign
+    if any(delta.values()):
+        events.publish("dashboard.delta", delta=delta)
+
+def activity_bucket(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+def record_item_activity(db: Session, item_id: int, at: datetime = None, count: int = 1):
+    """Add to the item's activity counter for the hour of ``at`` (default now). Not committed."""
+    db.execute(
+        text(
+            "INSERT INTO item_activity (item_id, bucket_start, count) VALUES (:item_id, :bucket, :count) "
+            "ON CONFLICT (item_id, bucket_start) DO UPDATE SET count = item_activity.count + :count"
+        ).bindparams(bindparam("bucket", type_=DateTime)),
+        {"item_id": item_id, "bucket": activity_bucket(at or datetime.utcnow()), "count": count},
+    )
+
+def get_most_active_items(db: Session, window: str = "7d", limit: int = 3):
+    """[(item_id, activity count)] over the last ``window`` (a key of ACTIVITY_WINDOWS), busiest first."""
+    since = activity_bucket(datetime.utcnow() - ACTIVITY_WINDOWS[window])
+    total = func.sum(models.ItemActivity.count)
+    return db.query(models.ItemActivity.item_id, total) \
+        .filter(models.ItemActivity.bucket_start >= since) \
+        .group_by(models.ItemActivity.item_id) \
+        .order_by(total.desc(), models.ItemActivity.item_id) \
+        .limit(limit).all()
+
+def prune_item_activity(db: Session, keep: timedelta = ACTIVITY_RETENTION) -> int:
+    """Drop activity buckets older than the longest window. Returns the number removed."""
+    cutoff = activity_bucket(datetime.utcnow() - keep)
+    removed = db.query(models.ItemActivity).filter(models.ItemActivity.bucket_start < cutoff).delete()
+    db.commit()
+    return removed
 
 def create_audit_log(db: Session, log: audit_schemas.AuditLogCreate):
     db_log = models.AuditLog(
@@ -9,9 +87,12 @@ def create_audit_log(db: Session, log: audit_schemas.AuditLogCreate):
         entity_type=log.entity_type,
         entity_id=log.entity_id,
         user_id=log.user_id,
-        details=log.details
+        details=log.details,
+        data=log.data
     )
     db.add(db_log)
+    if log.entity_type == "ITEM" and log.entity_id:
+        record_item_activity(db, log.entity_id)
     db.commit()
     db.refresh(db_log)
     return db_log
@@ -19,14 +100,116 @@ def create_audit_log(db: Session, log: audit_schemas.AuditLogCreate):
 def get_item(db: Session, item_id: int):
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
-def get_items(db: Session, skip: int = 0, limit: int = 100, search: str = None):
-    query = db.query(models.Item)
+STOCK_STATUSES = ("in_stock", "low_stock", "out_of_stock")
+
+ITEM_SORT_KEYS = {
+    "id": models.Item.id,
+    "title": models.Item.title,
+    "category": models.Item.category,
+    "price": models.Item.price,
+    "quantity": models.Item.quantity,
+    "last_updated": models.Item.last_updated,
+}
+
+FACET_CACHE_TTL_SECONDS = 300
+
+def stock_status_filter(stock_status: str):
+    if stock_status == "out_of_stock":
+        return models.Item.quantity == 0
+    if stock_status == "low_stock":
+        return models.Item.quantity.between(1, LOW_STOCK_THRESHOLD - 1)
+    return models.Item.quantity >= LOW_STOCK_THRESHOLD
+
+def item_order_by(sort: str):
+    """ORDER BY clauses for a whitelisted sort key, "-" prefixed for descending. Raises ValueError otherwise."""
+    descending = sort.startswith("-")
+    column = ITEM_SORT_KEYS.get(sort.lstrip("-"))
+    if column is None:
+        raise ValueError(f"Cannot sort by {sort!r}; use one of {', '.join(ITEM_SORT_KEYS)}")
+    # id breaks ties so pages never overlap
+    if descending:
+        return column.desc(), models.Item.id.desc()
+    return column.asc(), models.Item.id.asc()
+
+def get_items(db: Session, skip: int = 0, limit: int = 100, search: str = None, columns: list = None,
+              category: str = None, min_price: int = None, max_price: int = None,
+              min_quantity: int = None, max_quantity: int = None, stock_status: str = None,
+              sort: str = "-last_updated", ids: list = None):
+    """Items page and total. With ``columns``, rows hold only those columns instead of Item objects."""
+    order_by = item_order_by(sort)
+    query = db.query(*columns) if columns else db.query(models.Item)
+    if ids is not None:
+        query = query.filter(models.Item.id.in_(ids))
     if search:
         query = query.filter(models.Item.title.ilike(f"%{search}%"))
+    if category:
+        query = query.filter(models.Item.category == category)
+    if min_price is not None:
+        query = query.filter(models.Item.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Item.price <= max_price)
+    if min_quantity is not None:
+        query = query.filter(models.Item.quantity >= min_quantity)
+    if max_quantity is not None:
+        query = query.filter(models.Item.quantity <= max_quantity)
+    if stock_status:
+        query = query.filter(stock_status_filter(stock_status))
     total = query.count()
-    items = query.order_by(models.Item.last_updated.desc()).offset(skip).limit(limit).all()
+    items = query.order_by(*order_by).offset(skip).limit(limit).all()
     return items, total
 
+def get_items_by_ids(db: Session, ids: list, columns: list) -> dict:
+    """Rows of the given items keyed by id, from one IN query; missing ids are absent."""
+    rows = db.query(*columns).filter(models.Item.id.in_(ids)).all()
+    return {row.id: row for row in rows}
+
+def get_item_facets(db: Session):
+    """
+    Item counts per category and per stock status, from one grouped query.
+    Cached in shared state under the item change sequence, so any item write
+    starts a new cache entry and stale ones simply expire.
+    """
+    version = db.query(models.ChangeSequence.value) \
+        .filter(models.ChangeSequence.name == models.ITEM_CHANGE_SEQUENCE).scalar() or 0
+    state = get_shared_state()
+    key = f"cache:item_facets:{version}"
+    cached = state.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    status = case(
+        (models.Item.quantity == 0, "out_of_stock"),
+        (models.Item.quantity < LOW_STOCK_THRESHOLD, "low_stock"),
+        else_="in_stock",
+    )
+    category = func.coalesce(models.Item.category, "Uncategorized")
+    rows = db.query(category, status, func.count(models.Item.id)).group_by(category, status).all()
+    facets = {"total": 0, "categories": {}, "stock_status": dict.fromkeys(STOCK_STATUSES, 0)}
+    for category_name, status_name, count in rows:
+        facets["total"] += count
+        facets["categories"][category_name] = facets["categories"].get(category_name, 0) + count
+        facets["stock_status"][status_name] += count
+    state.set(key, json.dumps(facets), ttl=FACET_CACHE_TTL_SECONDS)
+    return facets
+
+def get_item_changes(db: Session, since: int = 0, limit: int = 500):
+    """Item upserts and deletes with change_seq > since, oldest first, at most ``limit`` of them."""
+    # One past the limit from each side tells whether another batch follows
+    items = db.query(models.Item).filter(models.Item.change_seq > since) \
+        .order_by(models.Item.change_seq).limit(limit + 1).all()
+    tombstones = db.query(models.ItemTombstone).filter(models.ItemTombstone.change_seq > since) \
+        .order_by(models.ItemTombstone.change_seq).limit(limit + 1).all()
+    changes = [{"seq": item.change_seq, "op": "upsert", "item_id": item.id, "item": item} for item in items]
+    changes += [{"seq": t.change_seq, "op": "delete", "item_id": t.item_id, "item": None} for t in tombstones]
+    changes.sort(key=lambda change: change["seq"])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return {
+        "changes": changes,
+        "next_since": changes[-1]["seq"] if changes else since,
+        "has_more": has_more,
+    }
+
 def create_item(db: Session, item: schemas.ItemCreate):
     db_item = models.Item(
         title=item.title, 
@@ -39,103 +222,403 @@ def create_item(db: Session, item: schemas.ItemCreate):
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    publish_item_change(None, db_item.quantity)
     
     # Check for logs/alerts
     if item.quantity == 0:
-        check_and_create_stock_alert(db, db_item.id, 0)
+        check_and_create_stock_alert(db, db_item.id, 0, title=db_item.title)
         
     return db_item
 
-def create_items_bulk(db: Session, items: list[schemas.ItemCreate]):
-    db_items = []
-    for item in items:
-        db_item = models.Item(
-            title=item.title, 
-            description=item.description, 
-            price=item.price,
-            category=item.category,
-            quantity=item.quantity
-        )
-        db.add(db_item)
-        db_items.append(db_item)
-    
-    db.commit()
-    
-    # Refresh all and check for alerts
-    for db_item in db_items:
-        db.refresh(db_item)
-        if db_item.quantity == 0:
-            check_and_create_stock_alert(db, db_item.id, 0)
-            
-    return db_items
+def create_items_bulk(db: Session, items: list[schemas.ItemCreate], user_id: int):
+    """
+    Insert ``items`` and log one BULK_CREATE entry, in one transaction.
 
-def update_item(db: Session, item_id: int, item_update: schemas.ItemUpdate):
-    db_item = get_item(db, item_id)
-    if not db_item:
-        return None
+    The rows go out as one executemany. The ORM would insert them one at a
+    time here: on SQLite it cannot match RETURNING rows to objects in a batch.
+    Their change_seqs are reserved up front as one consecutive range, which
+    identifies the new rows, so their ids come back with one SELECT and the
+    items with one more after the commit.
+    """
+    if not items:
+        return []
+    last = models.reserve_change_seqs(db.connection(), models.ITEM_CHANGE_SEQUENCE, len(items))
+    first = last - len(items) + 1
+    db.execute(models.Item.__table__.insert(), [
+        {
+            "title": item.title,
+            "description": item.description,
+            "price": item.price,
+            "category": item.category,
+            "quantity": item.quantity,
+            "change_seq": seq,
+        }
+        for seq, item in enumerate(items, first)
+    ])
+    # Nobody else can touch the uncommitted rows, so the range is still theirs
+    ids = db.scalars(
+        select(models.Item.id).where(models.Item.change_seq.between(first, last)).order_by(models.Item.change_seq)
+    ).all()
+
+    # Commits the items along with the entry
+    create_audit_log(db, audit_schemas.AuditLogCreate(
+        action="BULK_CREATE",
+        entity_type="ITEM",
+        entity_id=0,  # not one item
+        user_id=user_id,
+        details=f"Bulk created {len(items)} items"
+    ))
+
+    for item_id, item in zip(ids, items):
+        publish_item_change(None, item.quantity)
+        if item.quantity == 0:
+            check_and_create_stock_alert(db, item_id, 0, title=item.title)
+
+    loaded = {db_item.id: db_item for db_item in db.query(models.Item).filter(models.Item.id.in_(ids))}
+    return [loaded[item_id] for item_id in ids]
+
+def update_item(db: Session, item_id: int, user_id: int, item_update: schemas.ItemUpdate,
+                expected_version: int = None):
+    """
+    Apply a partial update and log it as one UPDATE entry. With
+    ``expected_version`` (from If-Match) the write only succeeds if nobody
+    changed the item since the client read that version.
+    """
     update_data = item_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_item, key, value)
-    db.commit()
+    if update_data.get("quantity") is not None and update_data["quantity"] < 0:
+        raise InsufficientStockError(item_id)
+    for attempt in range(UPDATE_ATTEMPTS):
+        db_item = get_item(db, item_id)
+        if not db_item:
+            return None
+        if expected_version is not None and db_item.version != expected_version:
+            raise VersionMismatchError(item_id)
+        old_quantity = db_item.quantity
+        for key, value in update_data.items():
+            setattr(db_item, key, value)
+        try:
+            if "quantity" in update_data:
+                # Flushing takes the item write lock, so the check below cannot race a transfer
+                db.flush()
+                if allocated_stock(db, item_id) > db_item.quantity:
+                    db.rollback()
+                    raise InsufficientStockError(item_id)
+            db.commit()
+            break
+        except StaleDataError:
+            # Someone else wrote between our read and the version-checked UPDATE.
+            # Without If-Match the client asked for last-writer-wins, so try again.
+            db.rollback()
+            if expected_version is not None or attempt == UPDATE_ATTEMPTS - 1:
+                raise VersionMismatchError(item_id)
     db.refresh(db_item)
+    publish_item_change(old_quantity, db_item.quantity)
     
     if 'quantity' in update_data:
-        check_and_create_stock_alert(db, item_id, update_data['quantity'])
-        
-        # Log quantity update
-        create_audit_log(db, audit_schemas.AuditLogCreate(
-            action="UPDATE",
-            entity_type="ITEM",
-            entity_id=db_item.id,
-            user_id=1, # Default system/admin user for now as we don't have current_user here easily without refactoring
-            details=f"Updated quantity to {update_data['quantity']}"
-        ))
+        check_and_create_stock_alert(db, item_id, update_data['quantity'], title=db_item.title)
+
+    # A quantity change keeps the "Updated quantity to N" details the dashboard history reads
+    if 'quantity' in update_data:
+        details, data = f"Updated quantity to {update_data['quantity']}", {"quantity": update_data['quantity']}
+    else:
+        details, data = f"Updated item {db_item.title}", None
+    create_audit_log(db, audit_schemas.AuditLogCreate(
+        action="UPDATE",
+        entity_type="ITEM",
+        entity_id=item_id,
+        user_id=user_id,
+        details=details,
+        data=data
+    ))
 
     return db_item
 
-def update_item_quantity(db: Session, item_id: int, quantity: int, user_id: int):
-    db_item = get_item(db, item_id)
-    if not db_item:
+def update_item_quantity(db: Session, item_id: int, user_id: int, quantity: int = None, delta: int = None):
+    """
+    Set (``quantity``) or adjust (``delta``) an item's stock with a single
+    UPDATE ... RETURNING, so concurrent pickers never overwrite each other.
+    This changes the stock not assigned to a location. Raises
+    InsufficientStockError if that would become negative.
+    """
+    # Every item write takes the change sequence row lock first, so from here
+    # until commit no other writer can touch the item.
+    change_seq = models.reserve_change_seqs(db.connection(), models.ITEM_CHANGE_SEQUENCE)
+    stmt = update(models.Item).where(models.Item.id == item_id)
+    # The total can never drop below the stock assigned to locations
+    if delta is not None:
+        stmt = stmt.where(models.Item.quantity + delta >= _allocated_stock_subquery()) \
+            .values(quantity=models.Item.quantity + delta)
+    else:
+        if quantity < 0:
+            db.rollback()
+            raise InsufficientStockError(item_id)
+        old_quantity = db.query(models.Item.quantity).filter(models.Item.id == item_id).scalar()
+        stmt = stmt.where(_allocated_stock_subquery() <= quantity).values(quantity=quantity)
+    stmt = stmt.values(version=models.Item.version + 1, change_seq=change_seq).returning(models.Item)
+    db_item = db.execute(stmt).scalars().first()
+    if db_item is None:
+        exists = db.query(models.Item.id).filter(models.Item.id == item_id).first() is not None
+        db.rollback()
+        if exists:
+            raise InsufficientStockError(item_id)
         return None
-    db_item.quantity = quantity
+    new_quantity, title = db_item.quantity, db_item.title
+    if delta is not None:
+        old_quantity = new_quantity - delta
     db.commit()
-    db.refresh(db_item)
+    publish_item_change(old_quantity, new_quantity)
     
     # Check and create alert if quantity is 0
-    check_and_create_stock_alert(db, item_id, quantity)
+    check_and_create_stock_alert(db, item_id, new_quantity, title=title)
     
     # Log quantity update
+    # The dashboard rebuilds quantity history from these entries
+    details = f"Updated quantity to {new_quantity}"
+    data = {"quantity": new_quantity}
+    if delta is not None:
+        details += f" ({delta:+d})"
+        data["delta"] = delta
     create_audit_log(db, audit_schemas.AuditLogCreate(
         action="UPDATE",
         entity_type="ITEM",
-        entity_id=db_item.id,
+        entity_id=item_id,
         user_id=user_id,
-        details=f"Updated quantity to {quantity}"
+        details=details,
+        data=data
     ))
     
     return db_item
 
-def get_audit_logs(db: Session, skip: int = 0, limit: int = 100, user_id: int = None):
-    query = db.query(models.AuditLog)
+def delete_item(db: Session, item_id: int):
+    db_item = get_item(db, item_id)
+    if not db_item:
+        return None
+    quantity = db_item.quantity
+    db.query(models.ItemStock).filter(models.ItemStock.item_id == item_id).delete(synchronize_session=False)
+    db.delete(db_item)
+    db.commit()
+    publish_item_change(quantity, None)
+    return db_item
+
+def _allocated_stock_subquery():
+    """An item's stock assigned to locations, correlated to the items row of the enclosing statement."""
+    return select(func.coalesce(func.sum(models.ItemStock.quantity), 0)) \
+        .where(models.ItemStock.item_id == models.Item.id).scalar_subquery()
+
+def allocated_stock(db: Session, item_id: int) -> int:
+    return db.query(func.coalesce(func.sum(models.ItemStock.quantity), 0)) \
+        .filter(models.ItemStock.item_id == item_id).scalar()
+
+_ADD_STOCK = text(
+    "INSERT INTO item_stock (item_id, location_id, quantity) VALUES (:item_id, :location_id, :delta) "
+    "ON CONFLICT (item_id, location_id) DO UPDATE SET quantity = item_stock.quantity + excluded.quantity "
+    "RETURNING quantity"
+)
+
+def get_locations(db: Session):
+    return db.query(models.Location).order_by(models.Location.code).all()
+
+def get_location_by_code(db: Session, code: str):
+    return db.query(models.Location).filter(models.Location.code == code).first()
+
+def create_location(db: Session, location: location_schemas.LocationCreate):
+    db_location = models.Location(code=location.code, name=location.name)
+    db.add(db_location)
+    db.commit()
+    db.refresh(db_location)
+    return db_location
+
+def get_item_stock(db: Session, item_id: int):
+    """An item's total, its stock per location and the unassigned rest, or None if the item does not exist."""
+    total = db.query(models.Item.quantity).filter(models.Item.id == item_id).scalar()
+    if total is None:
+        return None
+    rows = db.query(
+        models.ItemStock.location_id.label("location_id"),
+        models.Location.code.label("code"),
+        models.Location.name.label("name"),
+        models.ItemStock.quantity.label("quantity"),
+    ).join(models.Location, models.Location.id == models.ItemStock.location_id) \
+        .filter(models.ItemStock.item_id == item_id).order_by(models.Location.code).all()
+    locations = rows_to_dicts(rows)
+    return {
+        "item_id": item_id,
+        "total": total,
+        "unassigned": total - sum(row["quantity"] for row in locations),
+        "locations": locations,
+    }
+
+def adjust_location_stock(db: Session, item_id: int, location_id: int, user_id: int,
+                          quantity: int = None, delta: int = None):
+    """
+    Set (``quantity``) or adjust (``delta``) an item's stock at one location.
+    The item's total moves by the same amount in the same transaction.
+    Raises UnknownLocationError, or InsufficientStockError if the location's
+    stock would become negative. Returns None if the item does not exist.
+    """
+    location = db.get(models.Location, location_id)
+    if location is None:
+        raise UnknownLocationError(location_id)
+    code = location.code
+    # Item write lock first, as in update_item_quantity
+    change_seq = models.reserve_change_seqs(db.connection(), models.ITEM_CHANGE_SEQUENCE)
+    if quantity is not None:
+        if quantity < 0:
+            db.rollback()
+            raise InsufficientStockError(item_id)
+        current = db.query(models.ItemStock.quantity).filter(
+            models.ItemStock.item_id == item_id,
+            models.ItemStock.location_id == location_id,
+        ).scalar() or 0
+        delta = quantity - current
+    row = db.execute(
+        update(models.Item).where(models.Item.id == item_id)
+        .values(quantity=models.Item.quantity + delta, version=models.Item.version + 1, change_seq=change_seq)
+        .returning(models.Item.quantity, models.Item.title)
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+    new_total, title = row
+    level = db.execute(_ADD_STOCK, {"item_id": item_id, "location_id": location_id, "delta": delta}).scalar_one()
+    if level < 0:
+        db.rollback()
+        raise InsufficientStockError(item_id)
+    db.commit()
+    publish_item_change(new_total - delta, new_total)
+    check_and_create_stock_alert(db, item_id, new_total, title=title)
+    # Keeps the "Updated quantity to N" prefix the dashboard history reads
+    create_audit_log(db, audit_schemas.AuditLogCreate(
+        action="UPDATE",
+        entity_type="ITEM",
+        entity_id=item_id,
+        user_id=user_id,
+        details=f"Updated quantity to {new_total} ({delta:+d} at {code})",
+        data={"quantity": new_total, "delta": delta, "location_id": location_id}
+    ))
+    return new_total
+
+def transfer_stock(db: Session, item_id: int, transfer: location_schemas.StockTransfer, user_id: int):
+    """
+    Move stock between two locations, or between a location and the item's
+    unassigned stock (a side left as None). The item's total does not change.
+    Raises UnknownLocationError, or InsufficientStockError if the source has
+    less than the quantity. Returns None if the item does not exist.
+    """
+    ids = {i for i in (transfer.from_location_id, transfer.to_location_id) if i is not None}
+    codes = dict(db.query(models.Location.id, models.Location.code).filter(models.Location.id.in_(ids)).all())
+    missing = ids - set(codes)
+    if missing:
+        raise UnknownLocationError(min(missing))
+    change_seq = models.reserve_change_seqs(db.connection(), models.ITEM_CHANGE_SEQUENCE)
+    total = db.execute(
+        update(models.Item).where(models.Item.id == item_id)
+        .values(change_seq=change_seq).returning(models.Item.quantity)
+    ).scalar()
+    if total is None:
+        db.rollback()
+        return None
+    if transfer.from_location_id is not None:
+        moved = db.execute(
+            update(models.ItemStock).where(
+                models.ItemStock.item_id == item_id,
+                models.ItemStock.location_id == transfer.from_location_id,
+                models.ItemStock.quantity >= transfer.quantity,
+            ).values(quantity=models.ItemStock.quantity - transfer.quantity)
+        ).rowcount
+        if not moved:
+            db.rollback()
+            raise InsufficientStockError(item_id)
+    elif total - allocated_stock(db, item_id) < transfer.quantity:
+        db.rollback()
+        raise InsufficientStockError(item_id)
+    if transfer.to_location_id is not None:
+        db.execute(_ADD_STOCK, {"item_id": item_id, "location_id": transfer.to_location_id, "delta": transfer.quantity})
+    db.commit()
+    source = codes.get(transfer.from_location_id, "unassigned")
+    destination = codes.get(transfer.to_location_id, "unassigned")
+    create_audit_log(db, audit_schemas.AuditLogCreate(
+        action="TRANSFER",
+        entity_type="ITEM",
+        entity_id=item_id,
+        user_id=user_id,
+        details=f"Transferred {transfer.quantity} from {source} to {destination}",
+        data={"quantity": transfer.quantity, "from_location_id": transfer.from_location_id,
+              "to_location_id": transfer.to_location_id}
+    ))
+    return total
+
+def get_location_summary(db: Session) -> dict:
+    """Stock and value per location, and of the stock not assigned to any. Two grouped queries."""
+    stocked = case((models.ItemStock.quantity > 0, 1), else_=0)
+    rows = db.query(
+        models.Location.id.label("location_id"),
+        models.Location.code.label("code"),
+        models.Location.name.label("name"),
+        func.coalesce(func.sum(stocked), 0).label("item_count"),
+        func.coalesce(func.sum(models.ItemStock.quantity), 0).label("total_quantity"),
+        func.coalesce(func.sum(models.ItemStock.quantity * models.Item.price), 0).label("total_value"),
+    ).outerjoin(models.ItemStock, models.ItemStock.location_id == models.Location.id) \
+        .outerjoin(models.Item, models.Item.id == models.ItemStock.item_id) \
+        .group_by(models.Location.id, models.Location.code, models.Location.name) \
+        .order_by(models.Location.code).all()
+
+    unassigned = models.Item.quantity - _allocated_stock_subquery()
+    item_count, total_quantity, total_value = db.query(
+        func.coalesce(func.sum(case((unassigned > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(unassigned), 0),
+        func.coalesce(func.sum(unassigned * models.Item.price), 0),
+    ).one()
+    return {
+        "locations": rows_to_dicts(rows),
+        "unassigned": {"item_count": item_count, "total_quantity": total_quantity, "total_value": total_value},
+    }
+
+def get_audit_logs(db: Session, skip: int = 0, limit: int = 100, user_id: int = None, columns: list = None):
+    query = db.query(*columns) if columns else db.query(models.AuditLog)
     if user_id:
         query = query.filter(models.AuditLog.user_id == user_id)
     total = query.count()
     items = query.order_by(models.AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
     return items, total
 
+def search_audit_logs(db: Session, columns: list, since: datetime = None, until: datetime = None,
+                      actions: list = None, entity_type: str = None, entity_id: int = None,
+                      user_id: int = None, before: tuple = None, limit: int = 100):
+    """
+    Audit logs newest first, filtered, at most ``limit`` of them, and whether
+    more follow. ``before`` is the (timestamp, id) of the last entry of the
+    previous page. Every filter combination is served by one of the
+    timestamp-ordered composite indexes on audit_logs, so no COUNT or OFFSET
+    is needed and a time range only reads its own rows.
+    """
+    query = db.query(*columns)
+    if since is not None:
+        query = query.filter(models.AuditLog.timestamp >= since)
+    if until is not None:
+        query = query.filter(models.AuditLog.timestamp < until)
+    if actions:
+        query = query.filter(models.AuditLog.action.in_(actions))
+    if entity_type is not None:
+        query = query.filter(models.AuditLog.entity_type == entity_type)
+    if entity_id is not None:
+        query = query.filter(models.AuditLog.entity_id == entity_id)
+    if user_id is not None:
+        query = query.filter(models.AuditLog.user_id == user_id)
+    if before is not None:
+        query = query.filter(tuple_(models.AuditLog.timestamp, models.AuditLog.id) < tuple_(*before))
+    # One past the limit tells whether another page follows
+    rows = query.order_by(models.AuditLog.timestamp.desc(), models.AuditLog.id.desc()).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
 def get_audit_logs_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    query = db.query(models.AuditLog).filter(models.AuditLog.user_id == user_id)
-    total = query.count()
-    items = query.order_by(models.AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
-    return items, total
+    return db.query(models.AuditLog).filter(models.AuditLog.user_id == user_id) \
+        .order_by(models.AuditLog.timestamp.desc(), models.AuditLog.id.desc()).offset(skip).limit(limit).all()
 
 def get_audit_logs_by_item(db: Session, item_id: int, skip: int = 0, limit: int = 100):
-    # Note: entity_id is generic, but here we assume entity_type='ITEM' could be filtered if needed.
-    # For now, just filtering by entity_id and entity_type="ITEM" is safer to avoid collisions if user_ids and item_ids overlap.
-    query = db.query(models.AuditLog).filter(models.AuditLog.entity_id == item_id, models.AuditLog.entity_type == "ITEM")
-    total = query.count()
-    items = query.order_by(models.AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
-    return items, total
+    # entity_id alone is ambiguous: user and item ids overlap
+    return db.query(models.AuditLog).filter(models.AuditLog.entity_type == "ITEM", models.AuditLog.entity_id == item_id) \
+        .order_by(models.AuditLog.timestamp.desc(), models.AuditLog.id.desc()).offset(skip).limit(limit).all()
 
 # Alert CRUD operations
 from ..schemas import alerts as alert_schemas
@@ -143,6 +626,17 @@ from datetime import datetime
 
 from .email import send_email
 
+def count_active_alerts(db: Session) -> int:
+    return db.query(models.Alert).filter(models.Alert.status == models.AlertStatus.ACTIVE).count()
+
+def publish_alert_change(db: Session, event_type: str, alert_data: dict):
+    # The count is a query; with no stream open anywhere nobody would read it
+    if events.has_listeners():
+        events.publish(event_type, alert=alert_data, active_alerts=count_active_alerts(db))
+
+def _alert_data(db_alert: models.Alert) -> dict:
+    return alert_schemas.Alert.model_validate(db_alert).model_dump(mode="json")
+
 def create_alert(db: Session, alert: alert_schemas.AlertCreate, created_by: int = None):
     db_alert = models.Alert(
         item_id=alert.item_id,
@@ -153,6 +647,7 @@ def create_alert(db: Session, alert: alert_schemas.AlertCreate, created_by: int
     db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
+    publish_alert_change(db, "alert.created", _alert_data(db_alert))
 
     # Log create action
     if created_by:
@@ -170,7 +665,7 @@ def create_alert(db: Session, alert: alert_schemas.AlertCreate, created_by: int
         body = f"A new alert has been created:\n\nType: {alert.alert_type}\nMessage: {alert.message}\nItem ID: {alert.item_id}"
         send_email(subject, body)
     except Exception as e:
-        print(f"Failed to send email alert: {e}")
+        logger.warning("Failed to send email alert: %s", e)
 
     return db_alert
 
@@ -187,6 +682,34 @@ def get_alerts(db: Session, skip: int = 0, limit: int = 100, status: str = None,
     items = query.order_by(models.Alert.created_at.desc()).offset(skip).limit(limit).all()
     return items, total
 
+def get_alerts_with_details(db: Session, skip: int = 0, limit: int = 100, status: str = None, search: str = None):
+    """
+    Like get_alerts, but as plain dicts of the alert columns plus the item title
+    and creator/resolver emails, from one column-only query.
+    """
+    creator = aliased(models.User)
+    resolver = aliased(models.User)
+    query = db.query(
+        *schema_columns(models.Alert, alert_schemas.Alert),
+        models.Item.title.label("item_title"),
+        creator.email.label("created_by_email"),
+        resolver.email.label("resolved_by_email"),
+    ).select_from(models.Alert)
+    if status:
+        query = query.filter(models.Alert.status == status)
+
+    if search:
+        query = query.join(models.Item, models.Alert.item_id == models.Item.id).filter(models.Item.title.ilike(f"%{search}%"))
+    else:
+        query = query.outerjoin(models.Item, models.Alert.item_id == models.Item.id)
+
+    total = query.with_entities(models.Alert.id).count()
+
+    rows = query.outerjoin(creator, models.Alert.created_by == creator.id) \
+        .outerjoin(resolver, models.Alert.resolved_by == resolver.id) \
+        .order_by(models.Alert.created_at.desc()).offset(skip).limit(limit).all()
+    return rows_to_dicts(rows), total
+
 def get_alert(db: Session, alert_id: int):
     return db.query(models.Alert).filter(models.Alert.id == alert_id).first()
 
@@ -199,6 +722,7 @@ def resolve_alert(db: Session, alert_id: int, resolved_by: int):
     db_alert.resolved_by = resolved_by
     db.commit()
     db.refresh(db_alert)
+    publish_alert_change(db, "alert.resolved", _alert_data(db_alert))
     
     # Log resolve action
     create_audit_log(db, audit_schemas.AuditLogCreate(
@@ -215,15 +739,19 @@ def delete_alert(db: Session, alert_id: int):
     db_alert = get_alert(db, alert_id)
     if not db_alert:
         return None
+    alert_data = _alert_data(db_alert)
     db.delete(db_alert)
     db.commit()
+    publish_alert_change(db, "alert.deleted", alert_data)
     return db_alert
 
-def check_and_create_stock_alert(db: Session, item_id: int, quantity: int):
-    """Auto-create alert if quantity is 0"""
+def check_and_create_stock_alert(db: Session, item_id: int, quantity: int, title: str = None):
+    """Auto-create alert if quantity is 0. Pass ``title`` when the caller already has it to skip reloading the item."""
     if quantity == 0:
-        item = get_item(db, item_id)
-        if item:
+        if title is None:
+            item = get_item(db, item_id)
+            title = item.title if item else None
+        if title is not None:
             # Check if there's already an active out-of-stock alert for this item
             existing_alert = db.query(models.Alert).filter(
                 models.Alert.item_id == item_id,
@@ -235,7 +763,7 @@ def check_and_create_stock_alert(db: Session, item_id: int, quantity: int):
                 alert = alert_schemas.AlertCreate(
                     item_id=item_id,
                     alert_type=models.AlertType.OUT_OF_STOCK,
-                    message=f"Item '{item.title}' is out of stock (quantity: 0)"
+                    message=f"Item '{title}' is out of stock (quantity: 0)"
                 )
                 alert_obj = create_alert(db, alert)
                 
@@ -245,5 +773,5 @@ def check_and_create_stock_alert(db: Session, item_id: int, quantity: int):
                     entity_type="ALERT",
                     entity_id=alert_obj.id,
                     user_id=1, # Assigning to admin/system user
-                    details=f"System auto-alert: Item '{item.title}' is out of stock"
+                    details=f"System auto-alert: Item '{title}' is out of stock"
                 ))
@@ -1,26 +1,27 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
 import logging
+import threading
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from .config import get_settings
 
-import threading
+logger = logging.getLogger(__name__)
 
 def send_email_sync(subject: str, body: str):
     """
-    Sends an email using SMTP configuration from environment variables.
+    Sends an email using the SMTP settings.
     Blocking function.
     """
-    smtp_server = os.getenv("SMTP_SERVER")
-    smtp_port = os.getenv("SMTP_PORT", 587)
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    receiver_email = os.getenv("ALERT_RECEIVER_EMAIL")
-    sender_email = os.getenv("SENDER_EMAIL", smtp_username)
+    # Imported here so the mail stack is only loaded when an email is sent
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    settings = get_settings()
+    smtp_server = settings.smtp_server
+    smtp_port = settings.smtp_port
+    smtp_username = settings.smtp_username
+    smtp_password = settings.smtp_password
+    receiver_email = settings.alert_receiver_email
+    sender_email = settings.sender_email or smtp_username
 
     if not all([smtp_server, smtp_username, smtp_password, receiver_email]):
         logger.warning("SMTP configuration is incomplete. Email not sent.")
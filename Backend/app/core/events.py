@@ -0,0 +1,240 @@
+"""
+In-process event broadcaster for the Server-Sent Events stream.
+
+crud write paths call `publish()` after committing. Each worker fans events
+out to its own subscribers from a single `Broadcaster`; a relay carries them
+to the other workers, chosen with SHARED_STATE_BACKEND:
+
+  memory   - no relay (single worker)
+  database - events are appended to the event_log table and each worker
+             polls it, only while it has subscribers. Pollers keep a
+             shared_state entry alive, and events are only written while
+             some worker has one
+  redis    - Redis pub/sub on the "ims:events" channel
+
+An idle subscriber is one queue and one suspended coroutine.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Optional, Set
+
+from sqlalchemy import text
+
+from .config import get_settings
+from .shared_state import DatabaseState
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+EVENT_LOG_RETENTION_SECONDS = 300
+LISTENERS_KEY = "events:listeners"
+REDIS_CHANNEL = "ims:events"
+
+# Identifies this worker so relays do not deliver its own events twice
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.relay = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self.relay is not None:
+            self.relay.start(self)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def has_listeners(self) -> bool:
+        """Whether an event published now would reach any stream, in this worker or another."""
+        if self._subscribers:
+            return True
+        try:
+            return self.relay is not None and self.relay.has_listeners()
+        except Exception:
+            logger.exception("Failed to check for event listeners")
+            return True
+
+    def publish(self, event: dict):
+        """Deliver to local subscribers and relay to other workers. Safe to call from any thread."""
+        self.deliver(event)
+        if self.relay is not None:
+            try:
+                self.relay.publish(event)
+            except Exception:
+                logger.exception("Failed to relay event %s", event.get("type"))
+
+    def deliver(self, event: dict):
+        """Deliver to this worker's subscribers only."""
+        if not self._subscribers or self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._fanout, event)
+
+    def _fanout(self, event: dict):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # A slow client loses its oldest event rather than blocking everyone
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class DatabaseRelay:
+    """Cross-worker delivery through the event_log table."""
+
+    def __init__(self, engine, poll_interval: float):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.state = DatabaseState(engine)
+        # How long a poller's listeners entry outlives its last renewal
+        self.listeners_ttl = max(poll_interval * 5, 5.0)
+        self._listeners_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def has_listeners(self) -> bool:
+        """Whether any worker is polling. A positive answer is cached until the entry it read expires."""
+        now = time.time()
+        if now < self._listeners_until:
+            return True
+        value = self.state.get(LISTENERS_KEY)
+        if value is None:
+            return False
+        self._listeners_until = float(value)
+        return now < self._listeners_until
+
+    def mark_listening(self):
+        expires_at = time.time() + self.listeners_ttl
+        self.state.set(LISTENERS_KEY, str(expires_at), ttl=self.listeners_ttl)
+        return expires_at
+
+    def publish(self, event: dict):
+        # Nobody would read the row: most writes happen with no dashboard open
+        if not self.has_listeners():
+            return
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO event_log (created_at, origin, payload) VALUES (:created_at, :origin, :payload)"),
+                {"created_at": now, "origin": ORIGIN, "payload": json.dumps(event, default=str)},
+            )
+
+    def start(self, broadcaster: Broadcaster):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll(broadcaster))
+
+    def _latest_id(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM event_log")).scalar()
+
+    def _fetch(self, after_id: int):
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, origin, payload FROM event_log WHERE id > :after_id ORDER BY id"),
+                {"after_id": after_id},
+            ).all()
+            conn.execute(
+                text("DELETE FROM event_log WHERE created_at < :cutoff"),
+                {"cutoff": time.time() - EVENT_LOG_RETENTION_SECONDS},
+            )
+        return rows
+
+    async def _poll(self, broadcaster: Broadcaster):
+        # Announce the listener before taking the starting point, so no event in between is skipped
+        listening_until = await asyncio.to_thread(self.mark_listening)
+        last_id = await asyncio.to_thread(self._latest_id)
+        # Poll only while someone in this worker is listening
+        while broadcaster.subscriber_count:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if listening_until - time.time() < self.listeners_ttl / 2:
+                    listening_until = await asyncio.to_thread(self.mark_listening)
+                rows = await asyncio.to_thread(self._fetch, last_id)
+            except Exception:
+                logger.exception("Failed to poll event_log")
+                continue
+            for row_id, origin, payload in rows:
+                last_id = row_id
+                if origin != ORIGIN:
+                    broadcaster.deliver(json.loads(payload))
+
+
+class RedisRelay:
+    """Cross-worker delivery through Redis pub/sub."""
+
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._thread: Optional[threading.Thread] = None
+
+    def has_listeners(self) -> bool:
+        # Every worker with subscribers listens on the channel
+        return any(count for _, count in self.client.pubsub_numsub(REDIS_CHANNEL))
+
+    def publish(self, event: dict):
+        self.client.publish(REDIS_CHANNEL, json.dumps({"origin": ORIGIN, "event": event}, default=str))
+
+    def start(self, broadcaster: Broadcaster):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen, args=(broadcaster,), daemon=True)
+            self._thread.start()
+
+    def _listen(self, broadcaster: Broadcaster):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(REDIS_CHANNEL)
+        for message in pubsub.listen():
+            data = json.loads(message["data"])
+            if data["origin"] != ORIGIN:
+                broadcaster.deliver(data["event"])
+
+
+def create_relay(backend: str):
+    if backend == "database":
+        from ..db.database import engine
+
+        return DatabaseRelay(engine, get_settings().events_poll_interval)
+    if backend == "redis":
+        return RedisRelay(get_settings().redis_url)
+    return None
+
+
+_broadcaster: Optional[Broadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster() -> Broadcaster:
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                broadcaster = Broadcaster()
+                broadcaster.relay = create_relay(get_settings().shared_state_backend)
+                _broadcaster = broadcaster
+    return _broadcaster
+
+
+def has_listeners() -> bool:
+    """Whether anyone would receive a published event; skip work that only feeds events otherwise."""
+    return get_broadcaster().has_listeners()
+
+
+def publish(event_type: str, **data):
+    get_broadcaster().publish({"type": event_type, "ts": time.time(), **data})
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
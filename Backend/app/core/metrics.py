@@ -0,0 +1,346 @@
+"""
+Request and SQL instrumentation exposed in Prometheus text format.
+
+`MetricsMiddleware` times every request by route template and counts status
+codes and in-flight requests. `instrument_engine` hooks SQLAlchemy cursor
+events so each request also records how many statements it issued and how
+long they took. With several workers, set METRICS_DIR to a directory shared
+by them: each worker writes its snapshot there and `/metrics` merges them.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import event
+
+from .config import get_settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+SNAPSHOT_INTERVAL_SECONDS = 1.0
+
+
+class RequestStats:
+    """SQL activity of the request being handled, shared with the threadpool via a contextvar."""
+
+    __slots__ = ("method", "route", "scope", "statements", "sql_seconds", "query_budget", "statement_log")
+
+    def __init__(self, method: str, scope=None):
+        self.method = method
+        self.route = "unmatched"
+        # The route template is only known once routing has run; see current_route()
+        self.scope = scope
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # Set by app.core.query_budget: the route's declared budget and, in
+        # debug mode, the text of every statement issued
+        self.query_budget = None
+        self.statement_log = None
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """All metrics of this process. Label tuples are kept small: method, route template, status."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+        self._last_snapshot = 0.0
+
+    def _clear(self):
+        self.requests_total = defaultdict(int)  # (method, route, status) -> count
+        self.request_duration = {}  # (method, route) -> Histogram
+        self.request_statements = {}  # (method, route) -> Histogram
+        self.sql_seconds_total = defaultdict(float)  # (method, route) -> seconds
+        self.sql_statements_total = defaultdict(int)  # (method, route) -> count
+        self.in_progress = 0
+        self.compression = {}  # encoding -> [responses, bytes in, bytes out, CPU seconds]
+
+    def start_request(self):
+        with self._lock:
+            self.in_progress += 1
+
+    def finish_request(self, stats: RequestStats, status: int, duration: float):
+        key = (stats.method, stats.route)
+        with self._lock:
+            self.in_progress -= 1
+            self.requests_total[(stats.method, stats.route, str(status))] += 1
+            self.request_duration.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.request_statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self.sql_seconds_total[key] += stats.sql_seconds
+            self.sql_statements_total[key] += stats.statements
+
+    def record_compression(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        with self._lock:
+            entry = self.compression.setdefault(encoding, [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += bytes_in
+            entry[2] += bytes_out
+            entry[3] += cpu_seconds
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    # Snapshots are plain JSON so other worker processes can merge them
+
+    def snapshot(self) -> dict:
+        def histograms(source):
+            return [[list(k), h.counts, h.sum, h.count] for k, h in source.items()]
+
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "requests_total": [[list(k), v] for k, v in self.requests_total.items()],
+                "request_duration": histograms(self.request_duration),
+                "request_statements": histograms(self.request_statements),
+                "sql_seconds_total": [[list(k), v] for k, v in self.sql_seconds_total.items()],
+                "sql_statements_total": [[list(k), v] for k, v in self.sql_statements_total.items()],
+                "in_progress": self.in_progress,
+                "compression": [[encoding, *values] for encoding, values in self.compression.items()],
+            }
+
+    def maybe_write_snapshot(self, directory: Optional[str], force: bool = False):
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_snapshot < SNAPSHOT_INTERVAL_SECONDS:
+            return
+        self._last_snapshot = now
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+
+registry = Registry()
+
+
+def instrument_engine(engine):
+    """Attribute every statement executed on ``engine`` to the current request."""
+    if getattr(engine, "_ims_metrics", False):
+        return
+    engine._ims_metrics = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+            if stats.statement_log is not None:
+                stats.statement_log.append(statement)
+
+
+def route_template(scope) -> Optional[str]:
+    """The matched route's path template (e.g. "/items/{item_id}"), or None if nothing matched."""
+    # Newer FastAPI versions keep the prefixed path on the effective route
+    # context; older ones put fully prefixed routes in scope["route"].
+    fastapi_scope = scope.get("fastapi")
+    if isinstance(fastapi_scope, dict):
+        path = getattr(fastapi_scope.get("effective_route_context"), "path", None)
+        if path:
+            return path
+    return getattr(scope.get("route"), "path", None)
+
+
+def current_route() -> Optional[str]:
+    """The request being handled as "METHOD /route/template", or None outside a request."""
+    stats = current_request.get()
+    if stats is None:
+        return None
+    route = (route_template(stats.scope) if stats.scope is not None else None) or stats.route
+    return f"{stats.method} {route}"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+        self.metrics_dir = get_settings().metrics_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["method"], scope)
+        token = current_request.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.start_request()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stats.route = route_template(scope) or stats.route
+            registry.finish_request(stats, status_code, time.perf_counter() - start)
+            current_request.reset(token)
+            registry.maybe_write_snapshot(self.metrics_dir)
+
+
+def _merge_snapshots(snapshots: list) -> dict:
+    merged = {
+        "requests_total": defaultdict(int),
+        "request_duration": {},
+        "request_statements": {},
+        "sql_seconds_total": defaultdict(float),
+        "sql_statements_total": defaultdict(int),
+        "in_progress": 0,
+        "compression": {},
+    }
+    for snap in snapshots:
+        for name in ("requests_total", "sql_seconds_total", "sql_statements_total"):
+            for labels, value in snap[name]:
+                merged[name][tuple(labels)] += value
+        for name in ("request_duration", "request_statements"):
+            for labels, counts, total, count in snap[name]:
+                key = tuple(labels)
+                if key not in merged[name]:
+                    merged[name][key] = [[0] * len(counts), 0.0, 0]
+                entry = merged[name][key]
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+        merged["in_progress"] += snap["in_progress"]
+        for encoding, *values in snap.get("compression", []):
+            entry = merged["compression"].setdefault(encoding, [0, 0, 0, 0.0])
+            for i, value in enumerate(values):
+                entry[i] += value
+    return merged
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def collect(metrics_dir: Optional[str] = None) -> dict:
+    """This process's metrics, merged with other workers' snapshots when METRICS_DIR is set."""
+    if not metrics_dir:
+        return _merge_snapshots([registry.snapshot()])
+    registry.maybe_write_snapshot(metrics_dir, force=True)
+    snapshots = []
+    for name in os.listdir(metrics_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name)) as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # Counters of exited workers still count; their in-flight gauge does not
+        if not _pid_alive(snap["pid"]):
+            snap["in_progress"] = 0
+        snapshots.append(snap)
+    return _merge_snapshots(snapshots)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _render_histogram(lines, name, help_text, buckets, data, label_names):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key in sorted(data):
+        counts, total, count = data[key]
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(label_names + ('le',), key + (bound,))} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(label_names + ('le',), key + ('+Inf',))} {count}")
+        lines.append(f"{name}_sum{_labels(label_names, key)} {total}")
+        lines.append(f"{name}_count{_labels(label_names, key)} {count}")
+
+
+def render(metrics_dir: Optional[str] = None) -> str:
+    data = collect(metrics_dir)
+    route_labels = ("method", "route")
+    lines = [
+        "# HELP http_requests_total HTTP requests by route template and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    for key in sorted(data["requests_total"]):
+        lines.append(f"http_requests_total{_labels(route_labels + ('status',), key)} {data['requests_total'][key]}")
+
+    lines.append("# HELP http_requests_in_progress HTTP requests currently being handled.")
+    lines.append("# TYPE http_requests_in_progress gauge")
+    lines.append(f"http_requests_in_progress {data['in_progress']}")
+
+    _render_histogram(lines, "http_request_duration_seconds", "HTTP request latency.",
+                      LATENCY_BUCKETS, data["request_duration"], route_labels)
+    _render_histogram(lines, "db_statements_per_request", "SQL statements issued per HTTP request.",
+                      STATEMENT_BUCKETS, data["request_statements"], route_labels)
+
+    lines.append("# HELP db_statements_total SQL statements issued, by route.")
+    lines.append("# TYPE db_statements_total counter")
+    for key in sorted(data["sql_statements_total"]):
+        lines.append(f"db_statements_total{_labels(route_labels, key)} {data['sql_statements_total'][key]}")
+
+    lines.append("# HELP db_statement_seconds_total Time spent executing SQL, by route.")
+    lines.append("# TYPE db_statement_seconds_total counter")
+    for key in sorted(data["sql_seconds_total"]):
+        lines.append(f"db_statement_seconds_total{_labels(route_labels, key)} {data['sql_seconds_total'][key]:.6f}")
+
+    compression_series = (
+        ("http_responses_compressed_total", "Responses compressed, by encoding.", "{}"),
+        ("http_response_uncompressed_bytes_total", "Response body bytes before compression.", "{}"),
+        ("http_response_compressed_bytes_total", "Response body bytes after compression.", "{}"),
+        ("http_response_compression_cpu_seconds_total", "CPU time spent compressing responses.", "{:.6f}"),
+    )
+    for i, (name, help_text, fmt) in enumerate(compression_series):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for encoding in sorted(data["compression"]):
+            value = fmt.format(data["compression"][encoding][i])
+            lines.append(f"{name}{_labels(('encoding',), (encoding,))} {value}")
+
+    return "\n".join(lines) + "\n"
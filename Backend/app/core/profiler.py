@@ -0,0 +1,281 @@
+"""
+Per-request profiling for admins.
+
+Send `X-Profile: 1` (or add `?profile=1`) to any authenticated request as an
+admin. While the route's endpoint function runs, a background thread samples
+its stack every PROFILE_INTERVAL_MS via sys._current_frames(). Every SQL
+statement the request issues is recorded too, with its duration. The report
+is written to PROFILE_DIR as JSON, only the newest PROFILE_KEEP are kept, and
+its id is returned in the X-Profile-Id response header. Fetch reports from
+GET /profiles/{id}.
+
+The sampler starts only once get_current_user has confirmed an admin, so
+other users cannot trigger it. An unflagged request costs one header check,
+and each of its statements one context variable lookup.
+"""
+import contextvars
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+import anyio
+from sqlalchemy import event
+
+from ..db import models
+from .config import get_settings
+from .metrics import route_template
+from .serialization import dumps
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Start time to the microsecond, so ids sort oldest first
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+TOP_FUNCTIONS = 50
+
+_APP_DIR = str(Path(__file__).resolve().parents[1])
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_APP_DIR):
+        filename = "app" + filename[len(_APP_DIR):]
+    else:
+        filename = os.path.join(*Path(filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Profiling state of one flagged request, shared with its threads via ``current_profile``."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.user_id = None
+        self.sampler: Optional["Sampler"] = None
+        self.statements: List[dict] = []
+        self._lock = threading.Lock()
+
+    def endpoint_code(self):
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        return getattr(endpoint, "__code__", None)
+
+    def start(self, user_id: int, interval: float):
+        self.user_id = user_id
+        self.sampler = Sampler(self, interval)
+        self.sampler.start()
+
+    def record_statement(self, statement: str, started: float, seconds: float):
+        with self._lock:
+            self.statements.append({
+                "statement": statement,
+                "offset_ms": round((started - self.started) * 1000, 3),
+                "duration_ms": round(seconds * 1000, 3),
+            })
+
+    def report(self, status: int) -> dict:
+        self.sampler.stop()
+        stacks = self.sampler.stacks
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+        functions = [
+            {"function": label, "total": count, "self": self_counts[label]}
+            for label, count in total_counts.most_common(TOP_FUNCTIONS)
+        ]
+        return {
+            "method": self.scope["method"],
+            "path": self.scope["path"],
+            "route": route_template(self.scope),
+            "status": status,
+            "user_id": self.user_id,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "interval_ms": self.sampler.interval * 1000,
+            "samples": sum(stacks.values()),
+            "functions": functions,
+            # Collapsed stacks, root first: the input format of flamegraph tools
+            "stacks": [f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()],
+            "sql": {
+                "statements": len(self.statements),
+                "total_ms": round(sum(s["duration_ms"] for s in self.statements), 3),
+                "log": self.statements,
+            },
+        }
+
+
+current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+class Sampler(threading.Thread):
+    """Samples the stack of the thread running the request's endpoint, from the endpoint frame down."""
+
+    def __init__(self, profile: RequestProfile, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = None
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self, wait: bool = True):
+        self._stopped.set()
+        if wait and self.is_alive() and self is not threading.current_thread():
+            self.join()
+
+    def sample(self):
+        code = self.profile.endpoint_code()
+        if code is None:
+            return
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            candidates = [(self.thread_id, frames.get(self.thread_id))]
+        else:
+            candidates = [(ident, frame) for ident, frame in frames.items() if ident != self.ident]
+        for ident, frame in candidates:
+            stack = _handler_stack(frame, code)
+            if stack:
+                # Once found, the endpoint's thread is the only one sampled
+                self.thread_id = ident
+                self.stacks[stack] += 1
+                return
+
+
+def _handler_stack(frame, code) -> Optional[tuple]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        if frame.f_code is code:
+            return tuple(reversed(labels))
+        frame = frame.f_back
+    return None
+
+
+def profile_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.strip() not in (b"", b"0", b"false")
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        return parse_qs(query.decode("latin-1")).get("profile", ["0"])[-1] not in ("", "0", "false")
+    return False
+
+
+def start_if_requested(user):
+    """Called by get_current_user: start sampling a flagged request once its user is known to be an admin."""
+    profile = current_profile.get()
+    if profile is None or profile.sampler is not None or user.role != models.Role.ADMIN:
+        return
+    profile.start(user.id, get_settings().profile_interval_ms / 1000)
+
+
+def profile_dir() -> Path:
+    return Path(get_settings().profile_dir)
+
+
+def save_report(report: dict) -> str:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{report['started_at']:%Y%m%dT%H%M%S%f}-{secrets.token_hex(4)}"
+    report = {"id": profile_id, **report}
+    path = directory / f"{profile_id}.json"
+    partial = path.with_name(path.name + ".partial")
+    partial.write_bytes(dumps(report))
+    os.replace(partial, path)
+    _prune(directory, get_settings().profile_keep)
+    return profile_id
+
+
+def _prune(directory: Path, keep: int):
+    reports = sorted(directory.glob("*.json"))
+    for path in reports[:max(0, len(reports) - keep)]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def report_path(profile_id: str) -> Optional[Path]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.json"
+    return path if path.exists() else None
+
+
+def list_reports() -> List[str]:
+    """Ids of the stored reports, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    return sorted((path.stem for path in directory.glob("*.json") if PROFILE_ID.match(path.stem)), reverse=True)
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware: sets up profiling for flagged requests and saves the report."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = current_profile.set(profile)
+
+        def finish(status: int) -> str:
+            return save_report(profile.report(status))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and profile.sampler is not None:
+                # The endpoint has returned: stop sampling and attach the report's id. Joining the
+                # sampler and writing the report block, so they run in a worker thread.
+                profile_id = await anyio.to_thread.run_sync(finish, message["status"])
+                message = {**message, "headers": [*message.get("headers", []),
+                                                   (PROFILE_ID_HEADER, profile_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile.sampler is not None:
+                # Already stopped unless the request failed; the thread exits within one interval
+                profile.sampler.stop(wait=False)
+            current_profile.reset(token)
+
+
+def profile_engine(engine):
+    """Record every statement on ``engine`` in the profile of the request issuing it, if any."""
+    if getattr(engine, "_ims_profiling", False):
+        return
+    engine._ims_profiling = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        starts = conn.info.get("profile_start")
+        if profile is not None and starts:
+            started = starts.pop()
+            profile.record_statement(statement, started, time.perf_counter() - started)
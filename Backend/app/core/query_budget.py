@@ -0,0 +1,147 @@
+"""
+Query budgets and N+1 detection.
+
+Routes declare how many SQL statements they are expected to issue:
+
+    @router.get("/", dependencies=[Depends(QueryBudget(3))])
+
+`QueryBudgetMiddleware` compares each request's statement count (recorded by
+app.core.metrics) against its budget and logs a warning when it is exceeded.
+With QUERY_DEBUG on, it also keeps every statement and reports those repeated
+with different parameters, the signature of a query issued in a loop.
+Violations are kept in `violations` so the test suite can fail on them.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .config import get_settings
+from .metrics import current_request, route_template
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise(statement: str) -> str:
+    """Statement text with bind-parameter lists and whitespace collapsed."""
+    statement = _POSTCOMPILE.sub("(...)", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def repeated_statements(statements: List[str], threshold: int) -> List[Tuple[str, int]]:
+    """Statements issued at least ``threshold`` times, most repeated first."""
+    counts = Counter(normalise(s) for s in statements)
+    return [(s, n) for s, n in counts.most_common() if n >= threshold]
+
+
+@dataclass
+class Violation:
+    method: str
+    route: str
+    statements: int
+    budget: Optional[int]
+    repeated: List[Tuple[str, int]] = field(default_factory=list)
+
+    def __str__(self):
+        message = f"{self.method} {self.route} issued {self.statements} SQL statements"
+        if self.budget is not None and self.statements > self.budget:
+            message += f" (budget {self.budget})"
+        for statement, count in self.repeated:
+            message += f"\n  repeated {count}x: {statement[:200]}"
+        return message
+
+
+violations: List[Violation] = []
+_violations_lock = threading.Lock()
+
+
+class QueryBudget:
+    """Route dependency declaring the maximum number of SQL statements per request."""
+
+    def __init__(self, max_statements: int):
+        self.max_statements = max_statements
+
+    async def __call__(self):
+        stats = current_request.get()
+        if stats is not None:
+            stats.query_budget = self.max_statements
+
+
+class QueryBudgetMiddleware:
+    """Checks each request against its query budget. Must sit inside MetricsMiddleware."""
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.debug = settings.query_debug
+        self.repeat_threshold = settings.query_repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        stats = current_request.get() if scope["type"] == "http" else None
+        if stats is None:
+            await self.app(scope, receive, send)
+            return
+        if self.debug:
+            stats.statement_log = []
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.check(stats, scope)
+
+    def check(self, stats, scope):
+        over_budget = stats.query_budget is not None and stats.statements > stats.query_budget
+        repeated = []
+        if stats.statement_log:
+            repeated = repeated_statements(stats.statement_log, self.repeat_threshold)
+        if not over_budget and not repeated:
+            return
+        violation = Violation(
+            method=stats.method,
+            route=route_template(scope) or stats.route,
+            statements=stats.statements,
+            budget=stats.query_budget,
+            repeated=repeated,
+        )
+        logger.warning("Query budget violation: %s", violation)
+        with _violations_lock:
+            violations.append(violation)
+
+
+class QueryCounter:
+    """
+    Context manager counting statements executed on an engine, for tests:
+
+        with QueryCounter(engine) as queries:
+            client.get("/items/")
+        assert queries.count == 3
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "after_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "after_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        return repeated_statements(self.statements, threshold)
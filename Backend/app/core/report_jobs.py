@@ -0,0 +1,183 @@
+"""
+Monthly reports computed in the background.
+
+POST /reports/jobs records a report_jobs row and hands it to a thread pool of
+REPORT_WORKERS threads. The worker builds the report with
+snapshots.build_monthly_report and stores it gzip-compressed under
+REPORT_ARTIFACT_DIR, as JSON or CSV. Clients poll the job and download the
+artifact once it is done.
+
+An identical job that is still queued or running is returned instead of a new
+one. A closed month's report no longer changes, so its finished artifact is
+reused for as long as the file exists; the current month is always
+recomputed. A job still queued or running after REPORT_JOB_TIMEOUT_SECONDS
+(for example, one lost in a restart) is marked failed and is not reused.
+"""
+import csv
+import gzip
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..db.database import SessionLocal
+from . import snapshots
+from .config import get_settings
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ("json", "csv")
+MEDIA_TYPES = {"json": "application/json", "csv": "text/csv"}
+IN_FLIGHT = (models.ReportJobStatus.QUEUED, models.ReportJobStatus.RUNNING)
+
+
+def job_key(year: int, month: int, fmt: str) -> str:
+    return f"monthly:{year}-{month:02d}:{fmt}"
+
+
+def is_closed_month(year: int, month: int, today: Optional[datetime] = None) -> bool:
+    today = today or datetime.utcnow()
+    return (year, month) < (today.year, today.month)
+
+
+def write_csv(report: dict, out):
+    """The category breakdown of a report plus a total row; the JSON artifact has the full report."""
+    writer = csv.writer(out)
+    writer.writerow(["category", "item_count", "value"])
+    for row in report["category_breakdown"]:
+        writer.writerow([row["category"], row["item_count"], row["value"]])
+    writer.writerow(["Total", report["stats"]["total_items"], report["stats"]["total_inventory_value"]])
+
+
+class ReportJobQueue:
+    def __init__(self, session_factory, artifact_dir: str, workers: int = 2, timeout_seconds: float = 900):
+        self.session_factory = session_factory
+        self.artifact_dir = Path(artifact_dir)
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+
+    def submit(self, db: Session, year: int, month: int, fmt: str,
+               user_id: Optional[int] = None) -> Tuple[models.ReportJob, bool]:
+        """The job that serves this report, and whether it was newly queued."""
+        key = job_key(year, month, fmt)
+        job_model = models.ReportJob
+        now = datetime.utcnow()
+
+        # Give up on jobs nobody is working on any more
+        db.query(job_model).filter(
+            job_model.job_key == key,
+            job_model.status.in_(IN_FLIGHT),
+            job_model.created_at < now - timedelta(seconds=self.timeout_seconds),
+        ).update({"status": models.ReportJobStatus.FAILED, "error": "Timed out", "finished_at": now},
+                 synchronize_session=False)
+
+        reusable = IN_FLIGHT + (models.ReportJobStatus.DONE,) if is_closed_month(year, month, now) else IN_FLIGHT
+        job = self._reusable_job(db, key, reusable)
+        if job is not None:
+            db.commit()
+            return job, False
+
+        job = job_model(job_key=key, year=year, month=month, format=fmt, created_by=user_id, created_at=now)
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request queued the same job since the lookup (uq_report_jobs_key_in_flight); reuse it
+            db.rollback()
+            return self.submit(db, year, month, fmt, user_id)
+        db.refresh(job)
+        self._executor.submit(self.run, job.id)
+        return job, True
+
+    def _reusable_job(self, db: Session, key: str, statuses) -> Optional[models.ReportJob]:
+        candidates = db.query(models.ReportJob).filter(
+            models.ReportJob.job_key == key,
+            models.ReportJob.status.in_(statuses),
+        ).order_by(models.ReportJob.id.desc()).all()
+        for job in candidates:
+            if job.status != models.ReportJobStatus.DONE or self.artifact_exists(job):
+                return job
+        return None
+
+    def run(self, job_id: int):
+        """Compute one job and store its artifact. Runs on a worker thread with its own session."""
+        db = self.session_factory()
+        try:
+            job = db.get(models.ReportJob, job_id)
+            if job is None or job.status != models.ReportJobStatus.QUEUED:
+                return
+            job.status = models.ReportJobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+            db.commit()
+            try:
+                report = snapshots.build_monthly_report(db, job.year, job.month)
+                path = self.write_artifact(job, report)
+            except Exception as e:
+                logger.exception("Report job %s failed", job_id)
+                db.rollback()
+                job.status = models.ReportJobStatus.FAILED
+                job.error = str(e)
+            else:
+                job.status = models.ReportJobStatus.DONE
+                job.artifact_path = str(path)
+                job.artifact_size = path.stat().st_size
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def write_artifact(self, job: models.ReportJob, report: dict) -> Path:
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        path = self.artifact_dir / f"report-{job.id}-{job.year}-{job.month:02d}.{job.format}.gz"
+        # Written aside and renamed, so a download never sees a partial file
+        partial = path.with_name(path.name + ".partial")
+        if job.format == "csv":
+            with gzip.open(partial, "wt", encoding="utf-8", newline="") as out:
+                write_csv(report, out)
+        else:
+            with gzip.open(partial, "wb") as out:
+                out.write(dumps(report))
+        os.replace(partial, path)
+        return path
+
+    @staticmethod
+    def artifact_exists(job: models.ReportJob) -> bool:
+        return bool(job.artifact_path) and os.path.exists(job.artifact_path)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; with ``wait``, return once the running and queued ones are done."""
+        self._executor.shutdown(wait=wait)
+
+
+_queue: Optional[ReportJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_report_queue() -> ReportJobQueue:
+    """Process-wide report job queue, created on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                settings = get_settings()
+                _queue = ReportJobQueue(
+                    SessionLocal,
+                    settings.report_artifact_dir,
+                    workers=settings.report_workers,
+                    timeout_seconds=settings.report_job_timeout_seconds,
+                )
+    return _queue
+
+
+def set_report_queue(queue: Optional[ReportJobQueue]):
+    """Replace the queue (used by tests)."""
+    global _queue
+    _queue = queue
@@ -2,14 +2,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
 from passlib.context import CryptContext
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+from .config import get_settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,11 +13,26 @@ def get_password_hash(password):
     return pwd_context.hash(password[:72])
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    settings = get_settings()
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
+
+# The only purpose a token may carry; tokens with a purpose are not API credentials
+STREAM_TICKET_PURPOSE = "events"
+
+def create_stream_ticket(email: str, session_expires: int) -> str:
+    """
+    Short-lived token that only opens the event stream, for clients that must
+    put it in the URL. ``session_expires`` (the access token's exp) is when
+    the stream is closed.
+    """
+    settings = get_settings()
+    expire = datetime.utcnow() + timedelta(seconds=settings.stream_ticket_seconds)
+    claims = {"sub": email, "purpose": STREAM_TICKET_PURPOSE, "session_exp": session_expires, "exp": expire}
+    return jwt.encode(claims, settings.secret_key, algorithm=settings.algorithm)
@@ -0,0 +1,190 @@
+"""
+State shared between worker processes: counters, flags with a TTL and
+version numbers used to invalidate per-process caches.
+
+The backend is chosen with the SHARED_STATE_BACKEND setting:
+  memory   - a dict in this process (single worker, tests)
+  database - the shared_state table on the primary database
+  redis    - a Redis server at REDIS_URL (requires the redis package)
+"""
+import random
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from .config import get_settings
+
+
+class MemoryState:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._live(key, time.time())
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                value, expires_at = amount, (now + ttl if ttl else None)
+            else:
+                value, expires_at = int(entry[0]) + amount, entry[1]
+            self._data[key] = (str(value), expires_at)
+        return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DatabaseState:
+    """Stores entries in the shared_state table, so every worker sees the same values."""
+
+    PURGE_PROBABILITY = 0.01
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get(self, key: str) -> Optional[str]:
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text("SELECT value FROM shared_state WHERE key = :key AND (expires_at IS NULL OR expires_at > :now)"),
+                {"key": key, "now": time.time()},
+            ).scalar()
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO shared_state (key, value, expires_at) VALUES (:key, :value, :expires_at) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+                ),
+                {"key": key, "value": value, "expires_at": now + ttl if ttl else None},
+            )
+            self._maybe_purge(conn, now)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self.engine.begin() as conn:
+            value = conn.execute(
+                text(
+                    "INSERT INTO shared_state (key, value, expires_at) VALUES (:key, :amount, :expires_at) "
+                    "ON CONFLICT (key) DO UPDATE SET "
+                    "value = CASE WHEN shared_state.expires_at IS NOT NULL AND shared_state.expires_at <= :now "
+                    "THEN excluded.value "
+                    "ELSE CAST(CAST(shared_state.value AS INTEGER) + CAST(excluded.value AS INTEGER) AS TEXT) END, "
+                    "expires_at = CASE WHEN shared_state.expires_at IS NOT NULL AND shared_state.expires_at <= :now "
+                    "THEN excluded.expires_at ELSE shared_state.expires_at END "
+                    "RETURNING value"
+                ),
+                {"key": key, "amount": str(amount), "expires_at": now + ttl if ttl else None, "now": now},
+            ).scalar()
+            self._maybe_purge(conn, now)
+        return int(value)
+
+    def delete(self, key: str):
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM shared_state WHERE key = :key"), {"key": key})
+
+    def clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM shared_state"))
+
+    def _maybe_purge(self, conn, now: float):
+        if random.random() < self.PURGE_PROBABILITY:
+            conn.execute(text("DELETE FROM shared_state WHERE expires_at <= :now"), {"now": now})
+
+
+class RedisState:
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        pipe = self.client.pipeline()
+        pipe.incrby(key, amount)
+        if ttl:
+            pipe.pexpire(key, int(ttl * 1000), nx=True)
+        return int(pipe.execute()[0])
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def clear(self):
+        self.client.flushdb()
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def create_shared_state(backend: str):
+    if backend == "memory":
+        return MemoryState()
+    if backend == "database":
+        from ..db.database import engine
+
+        return DatabaseState(engine)
+    if backend == "redis":
+        return RedisState(get_settings().redis_url)
+    raise ValueError(f"Unknown SHARED_STATE_BACKEND: {backend}")
+
+
+def get_shared_state():
+    """Process-wide shared state backend, created on first use."""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = create_shared_state(get_settings().shared_state_backend)
+    return _state
+
+
+def set_shared_state(state):
+    """Replace the backend (used by tests)."""
+    global _state
+    _state = state
+
+
+def get_version(name: str) -> int:
+    """Current version of a named data set; caches compare it to detect invalidation."""
+    value = get_shared_state().get(f"version:{name}")
+    return int(value) if value is not None else 0
+
+
+def bump_version(name: str) -> int:
+    """Invalidate every worker's cache of a named data set."""
+    return get_shared_state().incr(f"version:{name}")
@@ -0,0 +1,119 @@
+"""
+Single-flight coalescing for expensive read endpoints.
+
+Concurrent calls with the same key share one computation: the first caller
+runs it and the others wait for its result (or its exception). A finished
+result is kept for ``ttl`` seconds (COALESCE_TTL_SECONDS by default), so
+requests arriving just after it also reuse it. Sync handlers running in the
+threadpool use `do()`; async handlers use `do_async()`, which waits without
+blocking the event loop. Both can wait on the same in-flight call.
+
+Coalescing is per worker process; with N workers at most N computations of
+the same key run at once.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from .config import get_settings
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.waiters = []  # (loop, future) of async callers
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}  # key -> (expires_at, value)
+
+    def _join(self, key: Hashable):
+        """(cached value, None, False), or (None, call, is_leader)."""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    return cached[1], None, False
+                del self._results[key]
+            call = self._calls.get(key)
+            if call is not None:
+                return None, call, False
+            call = self._calls[key] = _Call()
+            return None, call, True
+
+    def _finish(self, key: Hashable, call: _Call, ttl: float):
+        with self._lock:
+            del self._calls[key]
+            if call.error is None and ttl > 0:
+                self._results[key] = (time.monotonic() + ttl, call.value)
+            waiters, call.waiters = call.waiters, []
+            call.done.set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], ttl: Optional[float] = None):
+        """Run ``fn()`` unless an identical call is in flight or freshly cached, and return its result."""
+        cached, call, leader = self._join(key)
+        if call is None:
+            return cached
+        if not leader:
+            call.done.wait()
+            return call.result()
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+        self._finish(key, call, _ttl(ttl))
+        return call.result()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]], ttl: Optional[float] = None):
+        """Like `do()`, for a coroutine function."""
+        cached, call, leader = self._join(key)
+        if call is None:
+            return cached
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                finished = call.done.is_set()
+                if not finished:
+                    call.waiters.append((loop, future))
+            if finished:
+                return call.result()
+            await future
+            return call.result()
+        try:
+            call.value = await fn()
+        except BaseException as e:
+            call.error = e
+        self._finish(key, call, _ttl(ttl))
+        return call.result()
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+def _ttl(ttl: Optional[float]) -> float:
+    return get_settings().coalesce_ttl_seconds if ttl is None else ttl
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,216 @@
+"""
+Slow-query log.
+
+Every statement slower than SLOW_QUERY_MS is recorded under its fingerprint:
+the statement with literals and bind-parameter lists collapsed, so the same
+crud query with different values counts as one. The first time a SELECT's
+fingerprint is seen, its plan is captured with EXPLAIN (EXPLAIN QUERY PLAN on
+SQLite). The plan query runs on a raw DB-API cursor, so it does not count
+against query budgets or metrics, inside a savepoint, so a failed EXPLAIN
+cannot abort the caller's transaction.
+
+Each occurrence is also logged as one JSON line to SLOW_QUERY_LOG_FILE. The
+log has the statement, redacted parameters, duration and calling route.
+Strings and bytes are replaced by their type and length, and numbers, dates
+and NULLs are kept. `GET /slow-queries` shows the fingerprints ranked by
+total time. The aggregate covers this worker since it started; the log file
+covers every worker.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from .config import get_settings
+from .metrics import current_route
+from .query_budget import normalise
+
+logger = logging.getLogger(__name__)
+
+# Fingerprints kept per worker; past this the one with the least total time is dropped
+MAX_FINGERPRINTS = 500
+SORT_KEYS = ("total_ms", "count", "mean_ms", "max_ms")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    """The statement with literals replaced by ? and bind-parameter lists and whitespace collapsed."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    return normalise(statement)
+
+
+def fingerprint_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def redact(value):
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, str):
+        return f"<str:{len(value)}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes:{len(value)}>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return f"<{type(value).__name__}>"
+
+
+def explain(cursor, dialect_name: str, statement: str, parameters) -> Optional[str]:
+    """
+    The plan of ``statement``, from a fresh cursor on the same DB-API
+    connection. It runs inside a savepoint: on Postgres a failed statement
+    aborts the whole transaction, and the caller's transaction must survive.
+    """
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute("SAVEPOINT ims_explain")
+        try:
+            plan_cursor.execute(prefix + statement, parameters)
+            rows = plan_cursor.fetchall()
+        except Exception as e:  # a plan is a bonus; never fail the query over it
+            plan_cursor.execute("ROLLBACK TO SAVEPOINT ims_explain")
+            return f"EXPLAIN failed: {e}"
+        finally:
+            plan_cursor.execute("RELEASE SAVEPOINT ims_explain")
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        plan_cursor.close()
+    # SQLite: (id, parent, notused, detail); others: one text column per line
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: Optional[float] = None, log_file: Optional[str] = None):
+        settings = get_settings()
+        self.threshold = (settings.slow_query_ms if threshold_ms is None else threshold_ms) / 1000
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._file_logger = None
+        log_file = settings.slow_query_log_file if log_file is None else log_file
+        if log_file:
+            # A logger of its own, so the file gets only slow-query lines
+            self._file_logger = logging.getLogger(f"{__name__}.file.{id(self)}")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            handler = logging.FileHandler(log_file, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger.addHandler(handler)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def observe(self, cursor, dialect_name: str, statement: str, parameters, seconds: float, executemany: bool):
+        if seconds < self.threshold:
+            return
+        text = fingerprint(statement)
+        key = fingerprint_id(text)
+        route = current_route() or "background"
+        duration_ms = seconds * 1000
+        with self._lock:
+            entry = self._entries.get(key)
+            first = entry is None
+            if first:
+                entry = self._new_entry(key, text)
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = datetime.utcnow()
+            entry["routes"][route] = entry["routes"].get(route, 0) + 1
+        plan = None
+        if first and not executemany and _EXPLAINABLE.match(statement):
+            # Outside the lock: EXPLAIN is a round trip to the database
+            plan = explain(cursor, dialect_name, statement, parameters)
+            with self._lock:
+                entry["plan"] = plan
+        record = {
+            "fingerprint": key,
+            "duration_ms": round(duration_ms, 3),
+            "route": route,
+            "statement": statement,
+            "parameters": redact(parameters),
+        }
+        if first:
+            record["plan"] = plan
+        logger.warning("Slow query (%.1f ms, %s): %s", duration_ms, route, text[:200])
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps({"time": datetime.utcnow().isoformat(), **record}, default=str))
+
+    def _new_entry(self, key: str, text: str) -> dict:
+        if len(self._entries) >= MAX_FINGERPRINTS:
+            del self._entries[min(self._entries, key=lambda k: self._entries[k]["total_ms"])]
+        entry = {"fingerprint": key, "statement": text, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                 "last_seen": None, "routes": {}, "plan": None}
+        self._entries[key] = entry
+        return entry
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[dict]:
+        with self._lock:
+            entries = [{**entry, "routes": dict(entry["routes"]),
+                        "mean_ms": entry["total_ms"] / entry["count"]} for entry in self._entries.values()]
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        if self._file_logger is not None:
+            for handler in list(self._file_logger.handlers):
+                handler.close()
+                self._file_logger.removeHandler(handler)
+
+
+_log: Optional[SlowQueryLog] = None
+_log_lock = threading.Lock()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """Process-wide slow-query log, created on first use."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = SlowQueryLog()
+    return _log
+
+
+def set_slow_query_log(log: Optional[SlowQueryLog]):
+    """Replace the log (used by tests)."""
+    global _log
+    _log = log
+
+
+def log_slow_queries(engine):
+    """Time every statement on ``engine`` and record the slow ones."""
+    if getattr(engine, "_ims_slow_queries", False):
+        return
+    engine._ims_slow_queries = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["slow_query_start"].pop()
+        log = get_slow_query_log()
+        if log.enabled:
+            log.observe(cursor, conn.dialect.name, statement, parameters, seconds, executemany)
@@ -0,0 +1,271 @@
+"""
+Daily inventory rollups for historical reports.
+
+`python -m app.serve` takes one every day at SNAPSHOT_TIME_UTC, and
+`app.db.migrate` takes today's. Deployments that do not run app.serve can
+run the job from cron instead, shortly before midnight UTC:
+
+    python -m app.core.snapshots
+    python -m app.core.snapshots --date 2026-01-31
+
+Each run replaces that day's rows, so re-running it is safe. A past month's
+report reads the last snapshot taken in that month; the current month is
+rolled up live from the items table.
+"""
+import argparse
+import calendar
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..schemas import report as report_schema
+from . import audit_archive
+from .config import get_settings
+from .crud import LOW_STOCK_THRESHOLD, prune_item_activity
+from .serialization import rows_to_dicts, schema_columns
+
+logger = logging.getLogger(__name__)
+
+ALL_CATEGORIES = models.InventorySnapshot.ALL_CATEGORIES
+ROLLUP_FIELDS = ("item_count", "total_quantity", "total_value", "low_stock_count")
+
+
+def live_rollup(db: Session) -> dict:
+    """Per-category totals of the items table, keyed by category, plus ALL_CATEGORIES. One query."""
+    category = func.coalesce(func.nullif(models.Item.category, ""), "Uncategorized")
+    rows = db.query(
+        category,
+        func.count(models.Item.id),
+        func.coalesce(func.sum(models.Item.quantity), 0),
+        func.coalesce(func.sum(models.Item.quantity * models.Item.price), 0),
+        func.sum(case((models.Item.quantity < LOW_STOCK_THRESHOLD, 1), else_=0)),
+    ).group_by(category).all()
+
+    rollup = {}
+    total = dict.fromkeys(ROLLUP_FIELDS, 0)
+    for name, *values in rows:
+        rollup[name] = dict(zip(ROLLUP_FIELDS, values))
+        for field, value in zip(ROLLUP_FIELDS, values):
+            total[field] += value or 0
+    rollup[ALL_CATEGORIES] = total
+    return rollup
+
+
+def month_end_rollup(db: Session, year: int, month: int):
+    """(as_of, rollup) from the last snapshot taken in the month, or (None, {}) if there is none."""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    snapshot = models.InventorySnapshot
+    latest = db.query(func.max(snapshot.snapshot_date)) \
+        .filter(snapshot.snapshot_date.between(first, last)).scalar_subquery()
+    rows = db.query(snapshot).filter(snapshot.snapshot_date == latest).all()
+    if not rows:
+        return None, {}
+    rollup = {row.category: {field: getattr(row, field) for field in ROLLUP_FIELDS} for row in rows}
+    return rows[0].snapshot_date, rollup
+
+
+def take_snapshot(db: Session, day: Optional[date] = None) -> int:
+    """Store today's (or ``day``'s) rollup, replacing any earlier run for that day. Returns the row count."""
+    day = day or datetime.utcnow().date()
+    rollup = live_rollup(db)
+    db.query(models.InventorySnapshot).filter(models.InventorySnapshot.snapshot_date == day).delete()
+    db.add_all([
+        models.InventorySnapshot(snapshot_date=day, category=category, **values)
+        for category, values in rollup.items()
+    ])
+    db.commit()
+    return len(rollup)
+
+
+def previous_month(year: int, month: int):
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+def monthly_totals(db: Session, months: int = 12) -> list:
+    """Closing totals of each of the last ``months`` months that has a snapshot, oldest first."""
+    today = datetime.utcnow().date()
+    year, month = today.year, today.month
+    for _ in range(months - 1):
+        year, month = previous_month(year, month)
+    snapshot = models.InventorySnapshot
+    rows = db.query(snapshot).filter(
+        snapshot.category == ALL_CATEGORIES,
+        snapshot.snapshot_date >= date(year, month, 1),
+    ).order_by(snapshot.snapshot_date).all()
+    closing = {}
+    for row in rows:
+        # Later days overwrite earlier ones, leaving the last snapshot of each month
+        closing[(row.snapshot_date.year, row.snapshot_date.month)] = row
+    return [
+        report_schema.MonthlyValue(
+            year=row.snapshot_date.year,
+            month=row.snapshot_date.month,
+            as_of=row.snapshot_date,
+            total_items=row.total_quantity,
+            total_inventory_value=row.total_value,
+        )
+        for row in closing.values()
+    ]
+
+
+def report_sections(rollup: dict):
+    """The ReportStats and CategoryBreakdown list of a monthly report, from a rollup."""
+    total = rollup.get(ALL_CATEGORIES) or dict.fromkeys(ROLLUP_FIELDS, 0)
+    stats = report_schema.ReportStats(
+        total_items=total["total_quantity"],
+        total_inventory_value=total["total_value"],
+        low_stock_count=total["low_stock_count"],
+    )
+    breakdown = [
+        report_schema.CategoryBreakdown(category=category, item_count=values["total_quantity"], value=values["total_value"])
+        for category, values in sorted(rollup.items())
+        if category != ALL_CATEGORIES
+    ]
+    return stats, breakdown
+
+
+def month_over_month(stats: report_schema.ReportStats, previous: dict, year: int, month: int):
+    """Change against the previous month's closing snapshot, or None if there is no such snapshot."""
+    total = previous.get(ALL_CATEGORIES)
+    if total is None:
+        return None
+    value_change = stats.total_inventory_value - total["total_value"]
+    return report_schema.MonthOverMonth(
+        previous_year=year,
+        previous_month=month,
+        previous_total_items=total["total_quantity"],
+        previous_total_inventory_value=total["total_value"],
+        total_items_change=stats.total_items - total["total_quantity"],
+        total_inventory_value_change=value_change,
+        total_inventory_value_change_pct=(value_change / total["total_value"] * 100) if total["total_value"] else None,
+    )
+
+
+class MissingSnapshotError(LookupError):
+    """A past month's report was requested but no snapshot was taken in that month."""
+
+
+def build_monthly_report(db: Session, year: int, month: int, now: Optional[datetime] = None) -> dict:
+    """
+    The monthly report as plain JSON-ready data. Stats are live for the current
+    month and come from the month's closing snapshot before that. Four queries,
+    plus the month's audit archive file if it has been archived.
+    """
+    now = now or datetime.utcnow()
+    if (year, month) >= (now.year, now.month):
+        stats_as_of, rollup = now.date(), live_rollup(db)
+    else:
+        stats_as_of, rollup = month_end_rollup(db, year, month)
+        if not rollup:
+            raise MissingSnapshotError(f"No inventory snapshot was taken in {year}-{month:02d}")
+    stats, category_breakdown = report_sections(rollup)
+
+    prev_year, prev_month = previous_month(year, month)
+    _, previous_rollup = month_end_rollup(db, prev_year, prev_month)
+    trend = month_over_month(stats, previous_rollup, prev_year, prev_month)
+
+    # Activity Summary (Audit Logs for the month), as plain rows for the lean JSON path
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    activities = db.query(*schema_columns(models.AuditLog, report_schema.AuditLogMixin)).filter(
+        models.AuditLog.timestamp >= datetime(year, month, 1),
+        models.AuditLog.timestamp < datetime(next_year, next_month, 1)
+    ).order_by(models.AuditLog.timestamp.desc()).all()
+    activities = rows_to_dicts(activities)
+    archived = audit_archive.read_month(year, month)
+    if archived:
+        # The month is past retention: its entries are in the archive
+        ids = {row["id"] for row in activities}
+        fields = list(report_schema.AuditLogMixin.model_fields)
+        activities += [{name: row.get(name) for name in fields} for row in archived if row["id"] not in ids]
+        activities.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+
+    return {
+        "report_date": now,
+        "month": month,
+        "year": year,
+        "stats": stats.model_dump(),
+        "stats_as_of": stats_as_of,
+        "trend": trend.model_dump() if trend else None,
+        "category_breakdown": [category.model_dump() for category in category_breakdown],
+        "activities": activities
+    }
+
+
+def run_daily_job(day: Optional[date] = None, session_factory=None) -> Tuple[int, int]:
+    """Take ``day``'s snapshot and prune old activity counters. Returns (snapshot rows, pruned buckets)."""
+    if session_factory is None:
+        from ..db.database import SessionLocal as session_factory
+
+    db = session_factory()
+    try:
+        return take_snapshot(db, day), prune_item_activity(db)
+    finally:
+        db.close()
+
+
+def _time_of_day(at: str) -> Tuple[int, int]:
+    hour, minute = (int(part) for part in at.split(":"))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Not a time of day: {at!r}")
+    return hour, minute
+
+
+def next_run(now: datetime, at: str) -> datetime:
+    """The first ``at`` ("HH:MM", UTC) after ``now``."""
+    hour, minute = _time_of_day(at)
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+
+class SnapshotScheduler(threading.Thread):
+    """Runs the daily job at ``at`` every day until stopped. A failed run is logged and retried the next day."""
+
+    def __init__(self, at: str, session_factory=None):
+        super().__init__(name="snapshot-scheduler", daemon=True)
+        _time_of_day(at)  # reject a malformed time up front
+        self.at = at
+        self.session_factory = session_factory
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait((next_run(datetime.utcnow(), self.at) - datetime.utcnow()).total_seconds()):
+            try:
+                rows, pruned = run_daily_job(session_factory=self.session_factory)
+                logger.info("Stored %d inventory snapshot rows; pruned %d old activity buckets", rows, pruned)
+            except Exception:
+                logger.exception("Daily inventory snapshot failed")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_scheduler() -> Optional[SnapshotScheduler]:
+    """Start the daily snapshot thread, unless SNAPSHOT_TIME_UTC is empty."""
+    at = get_settings().snapshot_time_utc
+    if not at:
+        return None
+    scheduler = SnapshotScheduler(at)
+    scheduler.start()
+    return scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Store the daily inventory rollup used by historical reports, and prune old activity counters."
+    )
+    parser.add_argument("--date", type=date.fromisoformat, help="snapshot date (default: today)")
+    args = parser.parse_args()
+
+    day = args.date or datetime.utcnow().date()
+    rows, pruned = run_daily_job(day)
+    print(f"Stored {rows} inventory snapshot rows for {day}; pruned {pruned} old activity buckets.")
+
+
+if __name__ == "__main__":
+    main()
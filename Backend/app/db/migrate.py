@@ -0,0 +1,139 @@
+"""
+Schema management. Nothing creates or alters tables at import time; run this
+once per deployment, before any worker starts:
+
+    python -m app.db.migrate
+
+New tables and indexes are created, and columns added to existing models are
+added to existing tables, so older databases such as the bundled demo
+`sql_app.db` keep working as the models grow. Today's inventory snapshot is
+taken too, so historical reports have data from the first day.
+"""
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import String, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from . import models
+from .database import engine
+
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.server_default
+    if default is not None:
+        arg = default.arg
+        ddl += f" DEFAULT {arg.text if hasattr(arg, 'text') else repr(arg)}"
+    return ddl
+
+
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, conn.dialect)}"))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _code_case(column: str, codes: dict) -> str:
+    whens = " ".join(f"WHEN '{name}' THEN {code}" for name, code in codes.items())
+    return f"CASE {column} {whens} END"
+
+
+def compact_audit_log(conn):
+    """
+    Convert audit_logs from string actions and entity types to their small-int
+    codes (models.AUDIT_ACTION_CODES, AUDIT_ENTITY_CODES). Runs once: it does
+    nothing when the table is missing or already uses codes.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table("audit_logs"):
+        return
+    columns = {column["name"]: column["type"] for column in inspector.get_columns("audit_logs")}
+    if not isinstance(columns.get("action"), String):
+        return
+    for column, codes in (("action", models.AUDIT_ACTION_CODES), ("entity_type", models.AUDIT_ENTITY_CODES)):
+        unknown = [row[0] for row in conn.execute(text(f"SELECT DISTINCT {column} FROM audit_logs"))
+                   if row[0] is not None and row[0] not in codes]
+        if unknown:
+            raise RuntimeError(f"audit_logs.{column} has values without a code: {', '.join(map(str, unknown))}. "
+                               f"Add them to models.AUDIT_{'ACTION' if column == 'action' else 'ENTITY'}_CODES first.")
+    action = _code_case("action", models.AUDIT_ACTION_CODES)
+    entity_type = _code_case("entity_type", models.AUDIT_ENTITY_CODES)
+    if conn.dialect.name == "sqlite":
+        # SQLite cannot change a column's type: rebuild the table
+        for index in inspector.get_indexes("audit_logs"):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+        conn.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_legacy"))
+        models.AuditLog.__table__.create(conn)
+        conn.execute(text(
+            "INSERT INTO audit_logs (id, action, entity_type, entity_id, user_id, timestamp, details) "
+            f"SELECT id, {action}, {entity_type}, entity_id, user_id, timestamp, details FROM audit_logs_legacy"
+        ))
+        conn.execute(text("DROP TABLE audit_logs_legacy"))
+    else:
+        conn.execute(text(f"ALTER TABLE audit_logs ALTER COLUMN action TYPE SMALLINT USING {action}"))
+        conn.execute(text(f"ALTER TABLE audit_logs ALTER COLUMN entity_type TYPE SMALLINT USING {entity_type}"))
+
+
+def init_schema(bind=engine):
+    models.Base.metadata.create_all(bind=bind)
+
+
+def backfill_change_seq(conn):
+    """Put items written before the change feed existed into it, and keep the counter ahead of them."""
+    conn.execute(text("UPDATE items SET change_seq = id WHERE change_seq IS NULL"))
+    latest = conn.execute(text("SELECT COALESCE(MAX(change_seq), 0) FROM items")).scalar()
+    current = conn.execute(
+        text("SELECT value FROM change_sequences WHERE name = :name"), {"name": models.ITEM_CHANGE_SEQUENCE}
+    ).scalar()
+    if current is None or current < latest:
+        models.reserve_change_seqs(conn, models.ITEM_CHANGE_SEQUENCE, latest - (current or 0))
+
+
+def backfill_item_activity(conn):
+    """Build the hourly activity counters from recent audit logs the first time the table exists."""
+    from ..core.crud import ACTIVITY_RETENTION, activity_bucket
+
+    if conn.execute(text("SELECT 1 FROM item_activity LIMIT 1")).first():
+        return
+    audit = models.AuditLog.__table__
+    rows = conn.execute(
+        audit.select().with_only_columns(audit.c.entity_id, audit.c.timestamp).where(
+            audit.c.entity_type == "ITEM",
+            audit.c.entity_id > 0,
+            audit.c.timestamp >= datetime.utcnow() - ACTIVITY_RETENTION,
+        )
+    )
+    counts = Counter((entity_id, activity_bucket(timestamp)) for entity_id, timestamp in rows)
+    if counts:
+        conn.execute(models.ItemActivity.__table__.insert(), [
+            {"item_id": item_id, "bucket_start": bucket, "count": count}
+            for (item_id, bucket), count in counts.items()
+        ])
+
+
+def migrate(bind=engine):
+    """Bring the database schema up to date with the models."""
+    with bind.begin() as conn:
+        compact_audit_log(conn)
+        add_missing_columns(conn)
+    init_schema(bind)
+    with bind.begin() as conn:
+        backfill_change_seq(conn)
+        backfill_item_activity(conn)
+    # Historical reports need snapshots; today's starts the trend on the first day
+    from ..core.snapshots import run_daily_job
+
+    run_daily_job(session_factory=sessionmaker(bind=bind))
+
+
+if __name__ == "__main__":
+    migrate()
+    print("Database schema is up to date.")
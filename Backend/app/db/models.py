@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Date, DateTime, Float, Index, JSON, SmallInteger, event, text
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import relationship, Session
 import enum
 from datetime import datetime
 from .database import Base
@@ -27,25 +28,84 @@ class Item(Base):
     title = Column(String, index=True)
     description = Column(String, index=True)
     # owner_id = Column(Integer, ForeignKey("users.id"))
-    quantity = Column(Integer, default=0)
-    price = Column(Integer, default=0)
+    quantity = Column(Integer, default=0, index=True)
+    price = Column(Integer, default=0, index=True)
     category = Column(String, index=True, default="Uncategorized")
-    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Position in the item change feed, reassigned on every write (see _track_item_changes)
+    change_seq = Column(Integer, index=True, nullable=True)
+    # Optimistic locking: ORM updates check and bump it, and it is the item's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # owner = relationship("User", back_populates="items")
 
 
 
+# Stored codes of audit log actions and entity types. Append only: the numbers
+# are in the database and in archived months.
+AUDIT_ACTION_CODES = {
+    "CREATE": 1,
+    "UPDATE": 2,
+    "DELETE": 3,
+    "BULK_CREATE": 4,
+    "UPDATE_QUANTITY": 5,
+    "UPDATE_ROLE": 6,
+    "TRANSFER": 7,
+}
+AUDIT_ENTITY_CODES = {
+    "ITEM": 1,
+    "USER": 2,
+    "ALERT": 3,
+    "LOCATION": 4,
+}
+
+class CodedString(TypeDecorator):
+    """
+    A string from a fixed vocabulary, stored as its small-int code. Queries
+    and results still use the strings, so ``AuditLog.action == "UPDATE"`` works.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, codes: dict):
+        super().__init__()
+        # A tuple, as it is part of the statement cache key
+        self.codes = tuple(codes.items())
+        self._code = dict(codes)
+        self._name = {code: name for name, code in codes.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._code[value]
+        except KeyError:
+            raise ValueError(f"{value!r} has no code; use one of {', '.join(self._code)}")
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self._name[value]
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Newest-first scans of a time range, alone or for one user, entity or action
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_audit_logs_entity_timestamp", "entity_type", "entity_id", "timestamp", "id"),
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    action = Column(String, index=True) # CREATE, UPDATE, DELETE
-    entity_type = Column(String, index=True) # ITEM, USER
+    action = Column(CodedString(AUDIT_ACTION_CODES))
+    entity_type = Column(CodedString(AUDIT_ENTITY_CODES))
     entity_id = Column(Integer)
     user_id = Column(Integer, ForeignKey("users.id"))
     timestamp = Column(DateTime, default=datetime.utcnow)
     details = Column(String, nullable=True)
+    # Structured details, e.g. {"quantity": 12, "delta": -2} for quantity changes
+    data = Column(JSON, nullable=True)
 
 class AlertType(str, enum.Enum):
     LOW_STOCK = "low_stock"
@@ -68,3 +128,168 @@ class Alert(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     resolved_at = Column(DateTime, nullable=True)
     resolved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class SharedStateEntry(Base):
+    """Key/value rows used to share counters and invalidation state between workers."""
+    __tablename__ = "shared_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+    expires_at = Column(Float, nullable=True, index=True)
+
+class EventLog(Base):
+    """Short-lived log of published events, polled by other workers to relay SSE events."""
+    __tablename__ = "event_log"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(Float, index=True)
+    origin = Column(String)
+    payload = Column(String)
+
+class ChangeSequence(Base):
+    """Named counters for change feeds."""
+    __tablename__ = "change_sequences"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class ItemTombstone(Base):
+    """Records a deleted item so change feed clients can drop it."""
+    __tablename__ = "item_tombstones"
+
+    item_id = Column(Integer, primary_key=True)
+    change_seq = Column(Integer, index=True, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+class InventorySnapshot(Base):
+    """
+    End-of-day inventory totals per category, written by app.core.snapshots.
+    The row with category ALL_CATEGORIES holds the totals across every category.
+    """
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        Index("ix_inventory_snapshots_date_category", "snapshot_date", "category", unique=True),
+    )
+
+    ALL_CATEGORIES = "*"
+
+    id = Column(Integer, primary_key=True)
+    snapshot_date = Column(Date, nullable=False)
+    category = Column(String, nullable=False)
+    item_count = Column(Integer, default=0)  # distinct items
+    total_quantity = Column(Integer, default=0)
+    total_value = Column(Float, default=0.0)
+    low_stock_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ItemActivity(Base):
+    """Audit log entries per item per hour, for "most active items" over a recent window."""
+    __tablename__ = "item_activity"
+    __table_args__ = (
+        # Covers the top-N query: range on bucket_start, sum count per item_id
+        Index("ix_item_activity_bucket_item", "bucket_start", "item_id", "count"),
+    )
+
+    item_id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class Location(Base):
+    """A warehouse or other place where stock is kept."""
+    __tablename__ = "locations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ItemStock(Base):
+    """
+    Stock of one item at one location. Item.quantity stays the item's total:
+    the sum of these rows plus any stock not assigned to a location. crud
+    updates both in the same transaction.
+    """
+    __tablename__ = "item_stock"
+    __table_args__ = (
+        # Covers per-location totals: group by location_id, join items, sum quantity
+        Index("ix_item_stock_location_item", "location_id", "item_id", "quantity"),
+    )
+
+    item_id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+class ReportJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class ReportJob(Base):
+    """A monthly report computed in the background by app.core.report_jobs, and its stored artifact."""
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        # Finds an identical queued, running or finished job to reuse
+        Index("ix_report_jobs_key_status", "job_key", "status"),
+        # At most one queued or running job per key, however many requests race to submit it
+        Index("uq_report_jobs_key_in_flight", "job_key", unique=True,
+              sqlite_where=text("status IN ('QUEUED', 'RUNNING')"),
+              postgresql_where=text("status IN ('QUEUED', 'RUNNING')")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_key = Column(String, nullable=False)  # e.g. "monthly:2025-02:csv"
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    format = Column(String, nullable=False)
+    status = Column(Enum(ReportJobStatus), nullable=False, default=ReportJobStatus.QUEUED)
+    artifact_path = Column(String, nullable=True)
+    artifact_size = Column(Integer, nullable=True)  # compressed bytes
+    error = Column(String, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+ITEM_CHANGE_SEQUENCE = "items"
+
+def reserve_change_seqs(connection, name: str, count: int = 1) -> int:
+    """Advance the ``name`` counter by ``count`` and return its new value.
+
+    The counter row stays locked until the transaction ends, so writers take
+    sequence numbers in commit order and a reader never sees a gap fill in later.
+
+    The cost is that item writes are serialized: every transaction that
+    writes an item queues on this one row from its reservation until commit,
+    even when the items differ. On SQLite that adds nothing, since the
+    database has a single writer anyway. On Postgres it caps item write
+    throughput at one transaction at a time.
+    A database sequence would not contend, but its numbers are handed out
+    in start order, not commit order. A feed reader could then skip a change
+    that commits late with a lower number. Measure the cost with
+    ``python -m benchmarks.bench_quantity_updates --items N --threads N``.
+    """
+    return connection.execute(
+        text(
+            "INSERT INTO change_sequences (name, value) VALUES (:name, :count) "
+            "ON CONFLICT (name) DO UPDATE SET value = change_sequences.value + :count "
+            "RETURNING value"
+        ),
+        {"name": name, "count": count},
+    ).scalar_one()
+
+@event.listens_for(Session, "before_flush")
+def _track_item_changes(session, flush_context, instances):
+    """Stamp written items with a new change_seq and leave a tombstone for deleted ones."""
+    changed = [obj for obj in session.new if isinstance(obj, Item)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Item) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Item)]
+    count = len(changed) + len(deleted)
+    if not count:
+        return
+    last = reserve_change_seqs(session.connection(), ITEM_CHANGE_SEQUENCE, count)
+    seqs = iter(range(last - count + 1, last + 1))
+    for obj in changed:
+        obj.change_seq = next(seqs)
+    for obj in deleted:
+        session.merge(ItemTombstone(item_id=obj.id, change_seq=next(seqs), deleted_at=datetime.utcnow()))
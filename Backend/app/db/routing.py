@@ -0,0 +1,44 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request
+
+from ..core.config import get_settings
+from ..core.shared_state import get_shared_state
+
+# How long after a write a client keeps reading from the primary, so that it
+# sees its own changes even if the replica is lagging behind.
+READ_YOUR_WRITES_SECONDS = get_settings().read_your_writes_seconds
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Identify the caller by a digest of its bearer token (never the token itself)."""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()[:32]
+
+
+class StickyWrites:
+    """
+    Remembers which clients wrote recently and should read from the primary.
+    Marks live in the shared state backend so they hold across workers.
+    """
+
+    def __init__(self, window_seconds: float = READ_YOUR_WRITES_SECONDS):
+        self.window_seconds = window_seconds
+
+    def mark(self, key: Optional[str]):
+        if key is None:
+            return
+        get_shared_state().set(f"rw:{key}", "1", ttl=self.window_seconds)
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        return get_shared_state().get(f"rw:{key}") is not None
+
+
+sticky_writes = StickyWrites()
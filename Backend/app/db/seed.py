@@ -0,0 +1,279 @@
+"""
+Synthetic data at production scale, for reproducing performance problems.
+
+Rows are generated from a seed, so the same arguments always give the same
+database. They are inserted in chunks with Core executemany, one
+transaction per chunk, so memory use stays flat however many rows are
+requested. A table is only seeded while it is empty. Its secondary indexes
+are dropped for the load and rebuilt afterwards, which is much faster than
+maintaining them row by row. Distributions:
+
+  items       categories follow a Zipf curve. Prices are log-normal. A fixed
+              share of items is out of stock or low on stock.
+  audit logs  spread evenly over the last ``days``, in id order. A few hot
+              items, and a few busy users, account for most of the activity.
+              Most entries are quantity changes, logged as UPDATE with the
+              details the dashboard history reads.
+  alerts      mostly low/out-of-stock alerts on hot items. Most are resolved.
+
+The item change feed counter and the hourly item_activity counters are
+kept consistent with the generated rows. Usage: see init_db.py.
+"""
+import itertools
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, literal, select
+
+from . import models
+from .migrate import backfill_change_seq
+from ..core.crud import ACTIVITY_RETENTION, LOW_STOCK_THRESHOLD, activity_bucket
+
+CHUNK_SIZE = 10_000
+
+# Zipf weights: the first category is the most common
+CATEGORIES = ["Electronics", "Home", "Clothing", "Grocery", "Sports", "Books",
+              "Toys", "Beauty", "Garden", "Automotive", "Office", "Health"]
+ADJECTIVES = ["Compact", "Deluxe", "Classic", "Portable", "Heavy-duty", "Eco", "Smart", "Mini", "Pro", "Basic"]
+NOUNS = ["Widget", "Gadget", "Kit", "Organizer", "Lamp", "Bottle", "Charger", "Jacket", "Brush", "Tool", "Case", "Mat"]
+
+# How often each action appears on item audit entries
+ITEM_ACTIONS = {"UPDATE": 85, "CREATE": 7, "TRANSFER": 5, "DELETE": 1, "BULK_CREATE": 2}
+# Share of item UPDATEs that are quantity changes, logged as crud.update_item_quantity does
+QUANTITY_UPDATE_SHARE = 70 / 85
+ALERT_TYPES = {models.AlertType.LOW_STOCK: 60, models.AlertType.OUT_OF_STOCK: 30, models.AlertType.MANUAL: 10}
+
+# rng.random() ** SKEW concentrates picks: with 3, the busiest 10% of items get about half the activity
+SKEW = 3.0
+# Scatters skewed picks so the hot items are not simply the lowest ids
+_SCATTER = 1_000_003
+
+
+def _cum_weights(weights: dict) -> List[float]:
+    return list(itertools.accumulate(weights.values()))
+
+
+def _skewed(rng: random.Random, n: int) -> int:
+    """A number in 1..n, with a few values much more likely than the rest."""
+    index = int(n * rng.random() ** SKEW)
+    multiplier = _SCATTER if math.gcd(_SCATTER, n) == 1 else 1
+    return 1 + (index * multiplier) % n
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_items(rng: random.Random, count: int, now: datetime, days: int,
+                   zero_stock_rate: float = 0.05, low_stock_rate: float = 0.10) -> Iterator[dict]:
+    cum_categories = list(itertools.accumulate(1 / rank for rank in range(1, len(CATEGORIES) + 1)))
+    span = days * 86400
+    for item_id in range(1, count + 1):
+        category = rng.choices(CATEGORIES, cum_weights=cum_categories)[0]
+        adjective, noun = rng.choice(ADJECTIVES), rng.choice(NOUNS)
+        r = rng.random()
+        if r < zero_stock_rate:
+            quantity = 0
+        elif r < zero_stock_rate + low_stock_rate:
+            quantity = rng.randint(1, LOW_STOCK_THRESHOLD - 1)
+        else:
+            quantity = LOW_STOCK_THRESHOLD + int(rng.lognormvariate(3.5, 1.0))
+        yield {
+            "id": item_id,
+            "title": f"{adjective} {noun} {item_id}",
+            "description": f"{adjective} {noun.lower()} from the {category.lower()} range",
+            "quantity": quantity,
+            "price": max(1, int(rng.lognormvariate(3.5, 1.2))),
+            "category": category,
+            "last_updated": now - timedelta(seconds=rng.random() * span),
+            "change_seq": item_id,
+            "version": 1,
+        }
+
+
+def generate_audit_logs(rng: random.Random, count: int, now: datetime, days: int,
+                        item_count: int, user_ids: List[int]) -> Iterator[dict]:
+    actions, cum_actions = list(ITEM_ACTIONS), _cum_weights(ITEM_ACTIONS)
+    start = now - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    for n in range(count):
+        # Increasing timestamps, so id order is time order as in a live log
+        timestamp = start + timedelta(seconds=(n + rng.random()) * step)
+        user_id = user_ids[_skewed(rng, len(user_ids)) - 1]
+        r = rng.random()
+        if r < 0.96 and item_count:
+            entity_type, entity_id = "ITEM", _skewed(rng, item_count)
+            action = rng.choices(actions, cum_weights=cum_actions)[0]
+        elif r < 0.99:
+            entity_type, entity_id = "USER", rng.choice(user_ids)
+            action = rng.choice(("CREATE", "UPDATE_ROLE"))
+        else:
+            entity_type, entity_id = "ALERT", rng.randint(1, max(count // 500, 1))
+            action = rng.choice(("CREATE", "UPDATE"))
+        data = None
+        if action == "UPDATE" and entity_type == "ITEM" and rng.random() < QUANTITY_UPDATE_SHARE:
+            quantity, delta = rng.randint(0, 500), rng.randint(-20, 20) or 1
+            details, data = f"Updated quantity to {quantity} ({delta:+d})", {"quantity": quantity, "delta": delta}
+        elif action == "UPDATE" and entity_type == "ITEM":
+            details = f"Updated item {entity_id}"
+        else:
+            details = f"{action.replace('_', ' ').capitalize()} {entity_type.lower()} {entity_id}"
+        yield {
+            "id": n + 1,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "user_id": user_id,
+            "timestamp": timestamp,
+            "details": details,
+            "data": data,
+        }
+
+
+def generate_alerts(rng: random.Random, count: int, now: datetime, days: int,
+                    item_count: int, user_ids: List[int]) -> Iterator[dict]:
+    types, cum_types = list(ALERT_TYPES), _cum_weights(ALERT_TYPES)
+    start = now - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    for n in range(count):
+        created_at = start + timedelta(seconds=(n + rng.random()) * step)
+        alert_type = rng.choices(types, cum_weights=cum_types)[0]
+        item_id = _skewed(rng, item_count) if item_count else None
+        resolved = rng.random() < 0.85 and created_at < now - timedelta(hours=1)
+        resolved_at = min(created_at + timedelta(hours=rng.expovariate(1 / 24)), now) if resolved else None
+        if alert_type == models.AlertType.MANUAL:
+            message = f"Check item {item_id}"
+        else:
+            message = f"Item {item_id} is {'out of' if alert_type == models.AlertType.OUT_OF_STOCK else 'low on'} stock"
+        yield {
+            "id": n + 1,
+            "item_id": item_id,
+            "alert_type": alert_type,
+            "status": models.AlertStatus.RESOLVED if resolved else models.AlertStatus.ACTIVE,
+            "message": message,
+            "created_by": rng.choice(user_ids) if alert_type == models.AlertType.MANUAL else None,
+            "created_at": created_at,
+            "resolved_at": resolved_at,
+            "resolved_by": rng.choice(user_ids) if resolved else None,
+        }
+
+
+class _ActivityCounter:
+    """Hourly item_activity counts of generated audit logs, written as each hour completes."""
+
+    def __init__(self, now: datetime):
+        self.since = now - ACTIVITY_RETENTION
+        self.counts = Counter()
+
+    def add(self, rows: List[dict]):
+        for row in rows:
+            if row["entity_type"] == "ITEM" and row["timestamp"] >= self.since:
+                self.counts[(row["entity_id"], activity_bucket(row["timestamp"]))] += 1
+
+    def flush(self, conn, before: Optional[datetime] = None):
+        # Rows arrive in time order, so hours before ``before`` are complete
+        done = [key for key in self.counts if before is None or key[1] < before]
+        if done:
+            conn.execute(models.ItemActivity.__table__.insert(), [
+                {"item_id": item_id, "bucket_start": bucket, "count": self.counts.pop((item_id, bucket))}
+                for item_id, bucket in done
+            ])
+
+
+def _is_empty(conn, table) -> bool:
+    with conn.begin():
+        return conn.execute(select(literal(1)).select_from(table).limit(1)).first() is None
+
+
+def _load(conn, table, rows: Iterable[dict], total: int, chunk_size: int,
+          progress: Optional[Callable[[str, int, int], None]], after_chunk=None) -> int:
+    """Insert ``rows`` in chunks, with the table's secondary indexes dropped until the end."""
+    indexes = list(table.indexes)
+    with conn.begin():
+        for index in indexes:
+            index.drop(conn, checkfirst=True)
+    done = 0
+    if progress:
+        progress(table.name, done, total)
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            with conn.begin():
+                conn.execute(table.insert(), chunk)
+                if after_chunk:
+                    after_chunk(chunk)
+            done += len(chunk)
+            if progress:
+                progress(table.name, done, total)
+    finally:
+        with conn.begin():
+            for index in indexes:
+                index.create(conn, checkfirst=True)
+    return done
+
+
+def seed(bind, items: int = 0, audit_logs: int = 0, alerts: int = 0, seed: int = 0, days: int = 365,
+         zero_stock_rate: float = 0.05, low_stock_rate: float = 0.10, chunk_size: int = CHUNK_SIZE,
+         now: Optional[datetime] = None, progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
+    """
+    Fill the empty ones of items, audit_logs and alerts with generated rows.
+    Audit logs and alerts refer to the existing items and users. Returns the
+    number of rows inserted per table; a table that already had rows gets 0.
+    """
+    now = now or datetime.utcnow()
+    inserted = {"items": 0, "audit_logs": 0, "alerts": 0}
+    with bind.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # Only this connection, and only while seeding: a crash mid-seed just means seeding again
+            synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.commit()
+
+        items_table = models.Item.__table__
+        if items and _is_empty(conn, items_table):
+            rows = generate_items(random.Random(f"{seed}:items"), items, now, days, zero_stock_rate, low_stock_rate)
+            inserted["items"] = _load(conn, items_table, rows, items, chunk_size, progress)
+            with conn.begin():
+                backfill_change_seq(conn)
+
+        with conn.begin():
+            item_count = conn.execute(select(func.coalesce(func.max(items_table.c.id), 0))).scalar()
+            user_ids = list(conn.execute(select(models.User.id).order_by(models.User.id)).scalars()) or [None]
+
+        audit_table = models.AuditLog.__table__
+        if audit_logs and _is_empty(conn, audit_table):
+            rows = generate_audit_logs(random.Random(f"{seed}:audit_logs"), audit_logs, now, days,
+                                       item_count, user_ids)
+            activity = _ActivityCounter(now) if _is_empty(conn, models.ItemActivity.__table__) else None
+
+            def after_chunk(chunk):
+                if activity is not None:
+                    activity.add(chunk)
+                    activity.flush(conn, before=activity_bucket(chunk[-1]["timestamp"]))
+
+            inserted["audit_logs"] = _load(conn, audit_table, rows, audit_logs, chunk_size, progress, after_chunk)
+            if activity is not None:
+                with conn.begin():
+                    activity.flush(conn)
+
+        alerts_table = models.Alert.__table__
+        if alerts and _is_empty(conn, alerts_table):
+            rows = generate_alerts(random.Random(f"{seed}:alerts"), alerts, now, days, item_count, user_ids)
+            inserted["alerts"] = _load(conn, alerts_table, rows, alerts, chunk_size, progress)
+
+        if any(inserted.values()):
+            # Fresh planner statistics for the new volumes
+            with conn.begin():
+                conn.exec_driver_sql("ANALYZE")
+        if sqlite:
+            conn.exec_driver_sql(f"PRAGMA synchronous={synchronous}")
+            conn.commit()
+    return inserted
@@ -1,42 +1,138 @@
-from fastapi import Depends, HTTPException, status
+import time
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from .db.database import SessionLocal
-from .core.security import SECRET_KEY, ALGORITHM
+from .db.database import SessionLocal, ReplicaSessionLocal
+from .db.routing import SAFE_METHODS, client_key, sticky_writes
+from .core import security
+from .core.config import get_settings
+from .core.admission import AdmissionRejected, get_admission_controller, route_cost
+from .core.profiler import start_if_requested
 from .schemas import user as schemas
 from .db import models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_db():
+def get_db(request: Request):
+    """
+    Session on the primary database, used for writes. With a replica, a
+    writing client is marked sticky before the handler runs: this teardown
+    only runs after the response has been sent, and the client's next read
+    may already be on its way. The mark is renewed here only if the handler
+    used up most of the window, so that it still counts from the end of the
+    write. Without a replica every read is on the primary and nothing is
+    marked: each mark is a write to the shared state.
+    """
+    key = None
+    if request.method not in SAFE_METHODS and ReplicaSessionLocal is not SessionLocal:
+        key = client_key(request)
+        sticky_writes.mark(key)
+        marked = time.monotonic()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        if key is not None and time.monotonic() - marked > sticky_writes.window_seconds / 2:
+            sticky_writes.mark(key)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_read_db(request: Request):
+    """
+    Session for read-only handlers. Uses the replica unless none is configured
+    or the caller wrote recently (read-your-writes), in which case it uses the primary.
+    """
+    if ReplicaSessionLocal is SessionLocal or sticky_writes.is_sticky(client_key(request)):
+        db = SessionLocal()
+    else:
+        db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def decode_token(token: Optional[str], purpose: Optional[str] = None) -> dict:
+    """The token's claims. A token meant for ``purpose`` (None: an access token) is accepted, nothing else."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
+        settings = get_settings()
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None or payload.get("purpose") != purpose:
+        raise credentials_exception
+    return payload
+
+def user_for_token(payload: dict, db: Session) -> models.User:
+    token_data = schemas.TokenData(email=payload["sub"])
     user = db.query(models.User).filter(models.User.email == token_data.email).first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
+def authenticate_token(token: Optional[str], db: Session) -> models.User:
+    return user_for_token(decode_token(token), db)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    user = authenticate_token(token, db)
+    # Requests flagged with X-Profile are profiled for admins only
+    start_if_requested(user)
+    return user
+
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+async def get_stream_session(
+    ticket: Optional[str] = None,
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    db: Session = Depends(get_db)
+) -> Tuple[models.User, float]:
+    """
+    For the event stream: the user, and when their session ends. EventSource
+    cannot send headers, so browsers pass a ticket from POST /events/ticket as
+    ?ticket=. A ticket expires within a minute and only opens the stream, so
+    one that ends up in an access log is soon useless and never grants API
+    access. Other clients can send the access token as a header.
+    """
+    if header_token:
+        payload = decode_token(header_token)
+        expires = payload["exp"]
+    else:
+        payload = decode_token(ticket, purpose=security.STREAM_TICKET_PURPOSE)
+        expires = payload["session_exp"]
+    return user_for_token(payload, db), float(expires)
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     # if not current_user.is_active:
     #     raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+
+def admission_control(request: Request, current_user: models.User = Depends(get_current_user)):
+    """
+    Charges the request's route cost to the user and holds a concurrency slot
+    until the response is done. Over the limits: 429 (or 503 while shedding load).
+    """
+    if not get_settings().admission_enabled:
+        yield
+        return
+    controller = get_admission_controller()
+    user_key, role = str(current_user.id), current_user.role.value
+    try:
+        controller.admit(user_key, role, route_cost(request.scope))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+    try:
+        yield
+    finally:
+        controller.release(user_key, role)
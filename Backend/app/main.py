@@ -1,35 +1,53 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-from .db import models
-from .db.database import engine
-from .routers import items, auth, users, audit, alerts, dashboard, reports
-
-models.Base.metadata.create_all(bind=engine)
+from .core.admission import monitor_engine
+from .core.compression import CompressionMiddleware
+from .core.config import get_settings
+from .core.metrics import MetricsMiddleware, instrument_engine
+from .core.profiler import ProfilerMiddleware, profile_engine
+from .core.query_budget import QueryBudgetMiddleware
+from .core.slow_queries import log_slow_queries
+from .db.database import engine, replica_engine
+from .dependencies import admission_control
+from .routers import items, auth, users, audit, alerts, dashboard, reports, metrics, events, locations, profiles, slow_queries
 
 app = FastAPI()
 
-# Configure CORS
-origins = []
-allowed_origins_env = os.getenv("ALLOWED_ORIGINS")
-if allowed_origins_env:
-    origins = [origin.strip() for origin in allowed_origins_env.split(",") if origin.strip()]
+instrument_engine(engine)
+instrument_engine(replica_engine)
+# Writer latency drives load shedding
+monitor_engine(engine)
+profile_engine(engine)
+profile_engine(replica_engine)
+log_slow_queries(engine)
+log_slow_queries(replica_engine)
 
+# Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,
+    allow_origins=get_settings().cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read item versions for If-Match, and profile ids
+    expose_headers=["ETag", "X-Profile-Id"],
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, tags=["auth"])
-app.include_router(users.router, prefix="/users", tags=["users"])
-app.include_router(items.router, prefix="/items", tags=["items"])
-app.include_router(audit.router, prefix="/audit-logs", tags=["audit"])
-app.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
-app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
-app.include_router(reports.router, prefix="/reports", tags=["reports"])
+# Rate and concurrency limits for authenticated API routes (not the long-lived event stream)
+admitted = [Depends(admission_control)]
+app.include_router(users.router, prefix="/users", tags=["users"], dependencies=admitted)
+app.include_router(items.router, prefix="/items", tags=["items"], dependencies=admitted)
+app.include_router(locations.router, prefix="/locations", tags=["locations"], dependencies=admitted)
+app.include_router(audit.router, prefix="/audit-logs", tags=["audit"], dependencies=admitted)
+app.include_router(alerts.router, prefix="/alerts", tags=["alerts"], dependencies=admitted)
+app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"], dependencies=admitted)
+app.include_router(reports.router, prefix="/reports", tags=["reports"], dependencies=admitted)
+app.include_router(profiles.router, prefix="/profiles", tags=["profiles"], dependencies=admitted)
+app.include_router(slow_queries.router, prefix="/slow-queries", tags=["slow-queries"], dependencies=admitted)
+app.include_router(events.router, prefix="/events", tags=["events"])
+app.include_router(metrics.router, tags=["metrics"])
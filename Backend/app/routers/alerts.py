@@ -1,62 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ..dependencies import get_db, get_current_active_user
+from ..dependencies import get_db, get_read_db, get_current_active_user
 from ..db import models
 from ..schemas import alerts as schemas
 from ..core import crud
+from ..core.query_budget import QueryBudget
+from ..core.serialization import FastJSONResponse
 from ..schemas.common import PaginatedResponse
 import math
 
 router = APIRouter()
 
-@router.get("/", response_model=PaginatedResponse[schemas.AlertWithDetails])
+@router.get("/", response_model=PaginatedResponse[schemas.AlertWithDetails], dependencies=[Depends(QueryBudget(3))])
 def read_alerts(
     status: Optional[str] = None,
     search: Optional[str] = None,
     page: int = 1,
     size: int = 10,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     # if current_user.role not in [models.Role.ADMIN, models.Role.MANAGER]:
     #     raise HTTPException(status_code=403, detail="Not authorized")
     
     skip = (page - 1) * size
-    db_alerts, total = crud.get_alerts(db, skip=skip, limit=size, status=status, search=search)
-    
-    # Enhance alerts with details
-    results = []
-    for alert in db_alerts:
-        item_title = None
-        if alert.item_id:
-            item = crud.get_item(db, alert.item_id)
-            item_title = item.title if item else "Unknown Item"
-        
-        created_by_email = None
-        if alert.created_by:
-            user = db.query(models.User).filter(models.User.id == alert.created_by).first()
-            created_by_email = user.email if user else None
-            
-        resolved_by_email = None
-        if alert.resolved_by:
-            user = db.query(models.User).filter(models.User.id == alert.resolved_by).first()
-            resolved_by_email = user.email if user else None
-            
-        results.append(schemas.AlertWithDetails(
-            **alert.__dict__,
-            item_title=item_title,
-            created_by_email=created_by_email,
-            resolved_by_email=resolved_by_email
-        ))
+    rows, total = crud.get_alerts_with_details(db, skip=skip, limit=size, status=status, search=search)
+    for row in rows:
+        if row["item_id"] and row["item_title"] is None:
+            row["item_title"] = "Unknown Item"
     
-    return {
-        "items": results,
+    return FastJSONResponse({
+        "items": rows,
         "total": total,
         "page": page,
         "size": size,
         "pages": math.ceil(total / size) if size > 0 else 0
-    }
+    })
 
 @router.post("/", response_model=schemas.Alert)
 def create_manual_alert(
@@ -1,47 +1,198 @@
+import base64
+from datetime import datetime
+from itertools import chain
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..schemas.common import PaginatedResponse
 import math
 
-from ..core import crud
+from ..core import audit_archive, crud
 from ..schemas import audit as schemas
-from ..dependencies import get_db, get_current_active_user
+from ..dependencies import get_read_db, get_current_active_user
+from ..core.query_budget import QueryBudget
+from ..core.serialization import EXPORT_BATCH_SIZE, FastJSONResponse, ndjson_chunks, parse_fields, rows_to_dicts, schema_columns
 from ..db import models
 
 router = APIRouter()
 
-@router.get("/", response_model=PaginatedResponse[schemas.AuditLog])
+def _audit_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Field names for a `fields=` parameter; 400 for unknown field names."""
+    try:
+        return parse_fields(schemas.AuditLog, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/", response_model=PaginatedResponse[schemas.AuditLog], dependencies=[Depends(QueryBudget(3))])
 def read_audit_logs(
     page: int = 1, 
     size: int = 20, 
     user_id: int = None,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    """
+    Audit logs, newest first. Entries past the retention period are only
+    included with `include_archived=true`, which reads every archive file.
+    """
     if current_user.role != models.Role.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin access required"
         )
     skip = (page - 1) * size
-    logs, total = crud.get_audit_logs(db, skip=skip, limit=size, user_id=user_id)
-    return {
-        "items": logs,
+    selected = _audit_fields(fields)
+    rows, total = crud.get_audit_logs(db, skip=skip, limit=size, user_id=user_id,
+                                      columns=schema_columns(models.AuditLog, schemas.AuditLog, selected))
+    items = rows_to_dicts(rows)
+    if include_archived:
+        # Archived entries are all older than those in the database, so they follow them
+        start = max(0, skip - total)
+        end = start + size - len(items)
+        for index, row in enumerate(audit_archive.archived_logs(user_id=user_id, fields=selected)):
+            if start <= index < end:
+                items.append(row)
+            total += 1
+    return FastJSONResponse({
+        "items": items,
         "total": total,
         "page": page,
         "size": size,
         "pages": math.ceil(total / size) if size > 0 else 0
-    }
+    })
+
+@router.get("/export", dependencies=[Depends(QueryBudget(2))])
+def export_audit_logs(
+    user_id: int = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Audit logs, newest first, as newline-delimited JSON streamed in batches;
+    archived entries follow with `include_archived=true`.
+    """
+    if current_user.role != models.Role.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Admin access required"
+        )
+    selected = _audit_fields(fields)
+    query = db.query(*schema_columns(models.AuditLog, schemas.AuditLog, selected))
+    if user_id:
+        query = query.filter(models.AuditLog.user_id == user_id)
+    query = query.order_by(models.AuditLog.timestamp.desc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    chunks = ndjson_chunks(query)
+    if include_archived:
+        chunks = chain(chunks, ndjson_chunks(audit_archive.archived_logs(user_id=user_id, fields=selected)))
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="audit-logs.ndjson"'}
+    )
+
+AUDIT_SEARCH_MAX_LIMIT = 1000
+
+def _encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(f"{row['timestamp'].isoformat()}|{row['id']}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(entry_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _split_codes(value: Optional[str], codes: dict, name: str) -> Optional[List[str]]:
+    if not value:
+        return None
+    names = [part.strip().upper() for part in value.split(",") if part.strip()]
+    unknown = [n for n in names if n not in codes]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {name}: {', '.join(unknown)}; choose from {', '.join(codes)}"
+        )
+    return names
+
+# 1 user lookup + 1 page
+@router.get("/search", response_model=schemas.AuditLogPage, dependencies=[Depends(QueryBudget(2))])
+def search_audit_logs(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Audit logs newest first, within [`since`, `until`) and matching every
+    filter given. `action` takes a comma-separated list. Repeat with
+    `cursor=next_cursor` while `has_more`. No total is counted, so a page
+    costs the same however deep it is.
+    """
+    if current_user.role != models.Role.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Admin access required"
+        )
+    limit = max(1, min(limit, AUDIT_SEARCH_MAX_LIMIT))
+    actions = _split_codes(action, models.AUDIT_ACTION_CODES, "action")
+    entity_types = _split_codes(entity_type, models.AUDIT_ENTITY_CODES, "entity_type")
+    if entity_types and len(entity_types) > 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give a single entity_type")
+    entity_type = entity_types[0] if entity_types else None
+    before = _decode_cursor(cursor) if cursor else None
+    # The cursor is built from the last entry's timestamp and id
+    try:
+        selected = parse_fields(schemas.AuditLog, fields, required=("id", "timestamp"))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    rows, has_more = crud.search_audit_logs(
+        db, columns=schema_columns(models.AuditLog, schemas.AuditLog, selected),
+        since=since, until=until, actions=actions, entity_type=entity_type, entity_id=entity_id,
+        user_id=user_id, before=before, limit=limit
+    )
+    items = rows_to_dicts(rows)
+    if include_archived and not has_more:
+        # Archived entries are older than those in the database, so they follow them
+        def match(row):
+            return ((not actions or row["action"] in actions)
+                    and (entity_type is None or row["entity_type"] == entity_type)
+                    and (entity_id is None or row["entity_id"] == entity_id)
+                    and (before is None or (row["timestamp"], row["id"]) < before))
+        archived = audit_archive.archived_logs(user_id=user_id, fields=selected, since=since, until=until, match=match)
+        for row in archived:
+            if len(items) == limit:
+                has_more = True
+                break
+            items.append(row)
+    return FastJSONResponse({
+        "items": items,
+        "next_cursor": _encode_cursor(items[-1]) if has_more else None,
+        "has_more": has_more,
+    })
 
-@router.get("/user/{user_id}", response_model=List[schemas.AuditLog])
+@router.get("/user/{user_id}", response_model=List[schemas.AuditLog], dependencies=[Depends(QueryBudget(2))])
 def read_audit_logs_by_user(
     user_id: int, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    """The user's audit logs, newest first. /audit-logs/search pages deep histories without an offset."""
     if current_user.role != models.Role.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
@@ -49,14 +200,15 @@ def read_audit_logs_by_user(
         )
     return crud.get_audit_logs_by_user(db, user_id=user_id, skip=skip, limit=limit)
 
-@router.get("/item/{item_id}", response_model=List[schemas.AuditLog])
+@router.get("/item/{item_id}", response_model=List[schemas.AuditLog], dependencies=[Depends(QueryBudget(2))])
 def read_audit_logs_by_item(
     item_id: int, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    """The item's audit logs, newest first. /audit-logs/search pages deep histories without an offset."""
     if current_user.role != models.Role.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
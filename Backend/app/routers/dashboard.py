@@ -1,34 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict, Any
-from ..dependencies import get_db, get_current_user
+from typing import Dict, Any, Literal
+from ..dependencies import get_read_db, get_current_user
 from ..db import models
 from ..core import crud
-from datetime import datetime, timedelta
+from ..core.query_budget import QueryBudget
+from ..core.singleflight import single_flight
+from datetime import datetime
 import re
 
 router = APIRouter()
 
-@router.get("/stats")
+# 1 user lookup + 1 top-items query + 2 per top item + 4 summary counts (+ 2 for by_location)
+@router.get("/stats", dependencies=[Depends(QueryBudget(14))])
 def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    window: Literal["24h", "7d", "30d"] = "7d",
+    by_location: bool = False,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # 1. Get Top 3 Active Items (most audit logs)
-    # Filter for ITEM entity logs
-    top_items_query = db.query(
-        models.AuditLog.entity_id,
-        func.count(models.AuditLog.id).label('count')
-    ).filter(
-        models.AuditLog.entity_type == "ITEM"
-    ).group_by(
-        models.AuditLog.entity_id
-    ).order_by(
-        func.count(models.AuditLog.id).desc()
-    ).limit(3).all()
+    # The stats are the same for every user: concurrent requests share one computation
+    return single_flight.do(("dashboard_stats", window, by_location), lambda: _dashboard_stats(db, window, by_location))
+
+def _dashboard_stats(db: Session, window: str, by_location: bool = False) -> Dict[str, Any]:
+    # 1. Get Top 3 Active Items over the window, from the hourly activity counters
+    top_items_query = crud.get_most_active_items(db, window=window, limit=3)
     
-    top_item_ids = [item.entity_id for item in top_items_query]
+    activity = dict(top_items_query)
+    top_item_ids = list(activity)
     
     # 2. Reconstruct History for these items
     # We want to show quantity trends.
@@ -77,9 +76,13 @@ def get_dashboard_stats(
             # But what about before T0? We don't know the initial state unless we find a CREATE log.
             # For this simple chart, we'll just plot these points.
             
-            match = re.search(r"Updated quantity to (\d+)", log.details)
-            if match:
-                qty = int(match.group(1))
+            # Older entries only have the quantity in their text
+            if log.data and "quantity" in log.data:
+                qty = log.data["quantity"]
+            else:
+                match = re.search(r"Updated quantity to (\d+)", log.details)
+                qty = int(match.group(1)) if match else None
+            if qty is not None:
                 history.append({
                     "timestamp": log.timestamp.isoformat(),
                     "quantity": qty
@@ -92,6 +95,7 @@ def get_dashboard_stats(
             "item_id": item.id,
             "title": item.title,
             "current_quantity": item.quantity,
+            "activity": activity[item_id],
             "history": history
         })
         
@@ -101,7 +105,8 @@ def get_dashboard_stats(
     total_items = db.query(models.Item).count()
     active_alerts = db.query(models.Alert).filter(models.Alert.status == models.AlertStatus.ACTIVE).count()
         
-    return {
+    result = {
+        "window": window,
         "item_stats": stats,
         "summary": {
             "total_items": total_items,
@@ -110,3 +115,7 @@ def get_dashboard_stats(
             "active_alerts": active_alerts
         }
     }
+    if by_location:
+        # The cards above read item totals; this breakdown is grouped queries over item_stock
+        result["locations"] = crud.get_location_summary(db)
+    return result
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from typing import Tuple
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from ..core import crud, security
+from ..core.config import get_settings
+from ..core.events import get_broadcaster, format_sse
+from ..dependencies import decode_token, get_current_user, get_db, get_stream_session, oauth2_scheme
+from ..db import models
+from ..schemas import user as schemas
+
+router = APIRouter()
+
+@router.post("/ticket", response_model=schemas.StreamTicket)
+def create_stream_ticket(token: str = Depends(oauth2_scheme), current_user: models.User = Depends(get_current_user)):
+    """A short-lived ticket for `GET /events/stream?ticket=`, for clients that cannot send headers."""
+    ticket = security.create_stream_ticket(current_user.email, decode_token(token)["exp"])
+    return {"ticket": ticket, "expires_in": get_settings().stream_ticket_seconds}
+
+@router.get("/stream")
+async def stream_events(
+    db: Session = Depends(get_db),
+    session: Tuple[models.User, float] = Depends(get_stream_session)
+):
+    """
+    Server-Sent Events stream of alert and dashboard changes.
+    Starts with the current active-alert count, then sends
+    alert.created / alert.resolved / alert.deleted and dashboard.delta events.
+    Ends with stream.expired when the caller's session does.
+    """
+    _, session_expires = session
+    active_alerts = crud.count_active_alerts(db)
+    # Release the connection now; the stream may stay open for hours
+    db.close()
+
+    heartbeat = get_settings().events_heartbeat_seconds
+    broadcaster = get_broadcaster()
+    queue = broadcaster.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            yield format_sse({"type": "alerts.count", "active_alerts": active_alerts})
+            while True:
+                remaining = session_expires - time.time()
+                if remaining <= 0:
+                    yield format_sse({"type": "stream.expired"})
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from ..core import crud
 from ..schemas import item as schemas
 from ..schemas import audit as audit_schemas
-from ..dependencies import get_db, get_current_active_user
+from ..schemas import location as location_schemas
+from ..dependencies import get_db, get_read_db, get_current_active_user
+from ..core.query_budget import QueryBudget
+from ..core.serialization import EXPORT_BATCH_SIZE, FastJSONResponse, ndjson_chunks, parse_fields, rows_to_dicts, schema_columns
 from ..db import models
 
 router = APIRouter()
 
+def _etag(item: models.Item) -> str:
+    return f'"{item.version}"'
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """The item version named by an If-Match header, or None when any version will do."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Invalid If-Match header")
+
 @router.post("/", response_model=schemas.Item)
 def create_item(
     item: schemas.ItemCreate, 
@@ -46,56 +63,147 @@ def create_items_bulk(
             detail="Manager or Admin access required"
         )
         
-    db_items = crud.create_items_bulk(db=db, items=items)
-    
-    # Log the action
-    audit_log = audit_schemas.AuditLogCreate(
-        action="BULK_CREATE",
-        entity_type="ITEM",
-        entity_id=0, # Generic ID for bulk action or maybe 0?
-        user_id=current_user.id,
-        details=f"Bulk created {len(db_items)} items"
-    )
-    crud.create_audit_log(db, audit_log)
-    
-    return db_items
+    # Also logs the BULK_CREATE entry
+    return crud.create_items_bulk(db=db, items=items, user_id=current_user.id)
 
 from ..schemas.common import PaginatedResponse
 import math
 
-@router.get("/", response_model=PaginatedResponse[schemas.Item])
+def _parse_ids(ids: str) -> list:
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be comma-separated integers")
+    if len(parsed) > schemas.MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {schemas.MAX_BATCH_IDS} ids per request; use POST /items/batch in chunks"
+        )
+    return parsed
+
+def _item_columns(fields: Optional[str]) -> list:
+    """Columns for a `fields=` parameter; 400 for unknown field names."""
+    try:
+        return schema_columns(models.Item, schemas.Item, parse_fields(schemas.Item, fields))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/", response_model=PaginatedResponse[schemas.Item], dependencies=[Depends(QueryBudget(3))])
 def read_items(
     page: int = 1, 
-    size: int = 10, 
+    size: Optional[int] = None,
+    ids: Optional[str] = None,
+    fields: Optional[str] = None,
     search: str = None,
-    db: Session = Depends(get_db),
+    category: str = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_quantity: Optional[int] = None,
+    max_quantity: Optional[int] = None,
+    stock_status: Optional[schemas.StockStatus] = None,
+    sort: str = "-last_updated",
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    """
+    Items page. Filters combine with AND; `sort` is one of id, title, category,
+    price, quantity or last_updated, prefixed with "-" for descending.
+    `ids=1,2,3` restricts the page to those items (all of them on one page
+    unless `size` is given). `fields=id,title,quantity` returns only those fields.
+    """
+    id_list = _parse_ids(ids) if ids is not None else None
+    if size is None:
+        size = len(id_list) if id_list else 10
     skip = (page - 1) * size
-    items, total = crud.get_items(db, skip=skip, limit=size, search=search)
-    return {
-        "items": items,
+    columns = _item_columns(fields)
+    try:
+        rows, total = crud.get_items(
+            db, skip=skip, limit=size, search=search, columns=columns,
+            category=category, min_price=min_price, max_price=max_price,
+            min_quantity=min_quantity, max_quantity=max_quantity,
+            stock_status=stock_status, sort=sort, ids=id_list
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return FastJSONResponse({
+        "items": rows_to_dicts(rows),
         "total": total,
         "page": page,
         "size": size,
         "pages": math.ceil(total / size) if size > 0 else 0
-    }
+    })
 
-@router.get("/{item_id}", response_model=schemas.Item)
+@router.get("/facets", response_model=schemas.ItemFacets, dependencies=[Depends(QueryBudget(3))])
+def read_item_facets(
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Item counts per category and per stock status."""
+    return crud.get_item_facets(db)
+
+# 1 user lookup + 1 IN query
+@router.post("/batch", response_model=schemas.ItemBatch, dependencies=[Depends(QueryBudget(2))])
+def read_items_batch(
+    batch: schemas.ItemBatchRequest,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Items by id, for id sets too large for `GET /items/?ids=`. Unknown ids are listed in `missing`."""
+    columns = _item_columns(",".join(batch.fields) if batch.fields else None)
+    ids = list(dict.fromkeys(batch.ids))
+    rows = crud.get_items_by_ids(db, ids, columns) if ids else {}
+    return FastJSONResponse({
+        "items": rows_to_dicts(rows[item_id] for item_id in ids if item_id in rows),
+        "missing": [item_id for item_id in ids if item_id not in rows],
+    })
+
+@router.get("/export", dependencies=[Depends(QueryBudget(2))])
+def export_items(
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """The whole catalogue as newline-delimited JSON, streamed in batches."""
+    query = db.query(*_item_columns(fields)).order_by(models.Item.id) \
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        ndjson_chunks(query),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="items.ndjson"'}
+    )
+
+CHANGE_FEED_MAX_LIMIT = 1000
+
+@router.get("/changes", response_model=schemas.ItemChangeFeed, dependencies=[Depends(QueryBudget(3))])
+def read_item_changes(
+    since: int = 0,
+    limit: int = 500,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Upserts and deletes after change sequence `since`. Repeat with `next_since` while `has_more`."""
+    limit = max(1, min(limit, CHANGE_FEED_MAX_LIMIT))
+    return crud.get_item_changes(db, since=since, limit=limit)
+
+@router.get("/{item_id}", response_model=schemas.Item, dependencies=[Depends(QueryBudget(2))])
 def read_item(
     item_id: int, 
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     db_item = crud.get_item(db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    response.headers["ETag"] = _etag(db_item)
     return db_item
 
 @router.put("/{item_id}", response_model=schemas.Item)
 def update_item(
     item_id: int,
     item_update: schemas.ItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
@@ -104,25 +212,27 @@ def update_item(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin access required"
         )
-    db_item = crud.update_item(db, item_id=item_id, item_update=item_update)
+    try:
+        db_item = crud.update_item(db, item_id=item_id, user_id=current_user.id, item_update=item_update,
+                                   expected_version=_parse_if_match(if_match))
+    except crud.VersionMismatchError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Item was modified by someone else; reload it and try again"
+        )
+    except crud.InsufficientStockError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Quantity cannot be negative")
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
-        
-    audit_log = audit_schemas.AuditLogCreate(
-        action="UPDATE",
-        entity_type="ITEM",
-        entity_id=db_item.id,
-        user_id=current_user.id,
-        details=f"Updated item {db_item.title}"
-    )
-    crud.create_audit_log(db, audit_log)
-    
+    response.headers["ETag"] = _etag(db_item)
+    # crud.update_item has written the audit entry
     return db_item
 
 @router.patch("/{item_id}/quantity", response_model=schemas.Item)
 def update_quantity(
     item_id: int,
     quantity_update: schemas.ItemQuantityUpdate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
@@ -131,21 +241,78 @@ def update_quantity(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Manager or Admin access required"
         )
-    db_item = crud.update_item_quantity(db, item_id=item_id, quantity=quantity_update.quantity, user_id=current_user.id)
+    try:
+        db_item = crud.update_item_quantity(db, item_id=item_id, user_id=current_user.id,
+                                            quantity=quantity_update.quantity, delta=quantity_update.delta)
+    except crud.InsufficientStockError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Insufficient stock")
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
-        
-    audit_log = audit_schemas.AuditLogCreate(
-        action="UPDATE_QUANTITY",
-        entity_type="ITEM",
-        entity_id=db_item.id,
-        user_id=current_user.id,
-        details=f"Updated quantity to {quantity_update.quantity}"
-    )
-    crud.create_audit_log(db, audit_log)
-    
+    response.headers["ETag"] = _etag(db_item)
+    # crud.update_item_quantity has written the audit entry
     return db_item
 
+# 1 user lookup + 1 total + 1 per-location rows
+@router.get("/{item_id}/stock", response_model=location_schemas.ItemStock, dependencies=[Depends(QueryBudget(3))])
+def read_item_stock(
+    item_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """The item's total quantity, its stock at each location and the unassigned rest."""
+    stock = crud.get_item_stock(db, item_id)
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return stock
+
+@router.patch("/{item_id}/stock/{location_id}", response_model=location_schemas.ItemStock)
+def update_location_stock(
+    item_id: int,
+    location_id: int,
+    quantity_update: schemas.ItemQuantityUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Set or adjust the stock at one location; the item's total quantity moves with it."""
+    if current_user.role not in [models.Role.MANAGER, models.Role.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Manager or Admin access required"
+        )
+    try:
+        total = crud.adjust_location_stock(db, item_id=item_id, location_id=location_id, user_id=current_user.id,
+                                           quantity=quantity_update.quantity, delta=quantity_update.delta)
+    except crud.UnknownLocationError:
+        raise HTTPException(status_code=404, detail="Location not found")
+    except crud.InsufficientStockError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Insufficient stock at this location")
+    if total is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return crud.get_item_stock(db, item_id)
+
+@router.post("/{item_id}/transfers", response_model=location_schemas.ItemStock)
+def transfer_item_stock(
+    item_id: int,
+    transfer: location_schemas.StockTransfer,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Move stock between locations, or between a location and the unassigned stock. The total is unchanged."""
+    if current_user.role not in [models.Role.MANAGER, models.Role.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Manager or Admin access required"
+        )
+    try:
+        total = crud.transfer_stock(db, item_id=item_id, transfer=transfer, user_id=current_user.id)
+    except crud.UnknownLocationError:
+        raise HTTPException(status_code=404, detail="Location not found")
+    except crud.InsufficientStockError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Insufficient stock to transfer")
+    if total is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return crud.get_item_stock(db, item_id)
+
 @router.delete("/{item_id}", status_code=204)
 def delete_item(
     item_id: int, 
@@ -158,12 +325,9 @@ def delete_item(
             detail="Admin access required"
         )
     
-    db_item = crud.get_item(db, item_id=item_id)
+    db_item = crud.delete_item(db, item_id=item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
-        
-    db.delete(db_item)
-    db.commit()
     
     audit_log = audit_schemas.AuditLogCreate(
         action="DELETE",
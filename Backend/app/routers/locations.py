@@ -0,0 +1,47 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from ..core import crud
+from ..core.query_budget import QueryBudget
+from ..dependencies import get_db, get_read_db, get_current_active_user
+from ..schemas import audit as audit_schemas
+from ..schemas import location as schemas
+from ..db import models
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.Location], dependencies=[Depends(QueryBudget(2))])
+def read_locations(
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    return crud.get_locations(db)
+
+@router.post("/", response_model=schemas.Location, status_code=status.HTTP_201_CREATED)
+def create_location(
+    location: schemas.LocationCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    if current_user.role != models.Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    if crud.get_location_by_code(db, location.code):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A location with this code already exists")
+    db_location = crud.create_location(db, location)
+    crud.create_audit_log(db, audit_schemas.AuditLogCreate(
+        action="CREATE",
+        entity_type="LOCATION",
+        entity_id=db_location.id,
+        user_id=current_user.id,
+        details=f"Created location {db_location.code}"
+    ))
+    return db_location
+
+# 1 user lookup + 1 per-location totals + 1 unassigned totals
+@router.get("/summary", response_model=schemas.LocationSummary, dependencies=[Depends(QueryBudget(3))])
+def read_location_summary(
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Item count, quantity and value per location, and of the stock not yet assigned to a location."""
+    return crud.get_location_summary(db)
@@ -0,0 +1,21 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from ..core import metrics
+from ..core.config import get_settings
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Prometheus scrape endpoint.
+    Protected by a static bearer token when METRICS_TOKEN is set.
+    """
+    settings = get_settings()
+    if settings.metrics_token and authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(
+        metrics.render(settings.metrics_dir),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
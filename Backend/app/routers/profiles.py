@@ -0,0 +1,27 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from ..core import profiler
+from ..dependencies import get_current_active_user
+from ..db import models
+
+router = APIRouter()
+
+def _require_admin(current_user: models.User):
+    if current_user.role != models.Role.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+@router.get("/", response_model=List[str])
+def read_profiles(current_user: models.User = Depends(get_current_active_user)):
+    """Ids of the stored request profiles, newest first. Profile a request by sending `X-Profile: 1`."""
+    _require_admin(current_user)
+    return profiler.list_reports()
+
+@router.get("/{profile_id}")
+def read_profile(profile_id: str, current_user: models.User = Depends(get_current_active_user)):
+    """A stored profile: sampled handler stacks, top functions and the request's SQL statements."""
+    _require_admin(current_user)
+    path = profiler.report_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
@@ -1,19 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import gzip
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
 from typing import List, Optional
 from datetime import datetime
 from ..db import models
-from ..dependencies import get_db, get_current_active_user
+from ..dependencies import get_db, get_read_db, get_current_active_user
 from ..schemas import report as report_schema
+from ..core.query_budget import QueryBudget
+from ..core import snapshots
+from ..core.singleflight import single_flight
+from ..core.compression import accepted_encodings
+from ..core.report_jobs import MEDIA_TYPES, get_report_queue
+from ..core.serialization import FastJSONResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-@router.get("/monthly", response_model=report_schema.MonthlyReport)
-async def get_monthly_report(
-    month: Optional[int] = None,
-    year: Optional[int] = None,
-    db: Session = Depends(get_db),
+# 1 user lookup + 1 rollup + 1 previous month snapshot + 1 audit log query
+@router.get("/monthly", response_model=report_schema.MonthlyReport, dependencies=[Depends(QueryBudget(4))])
+def get_monthly_report(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=2000, le=9999),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
@@ -26,89 +36,117 @@ async def get_monthly_report(
             detail="You do not have permission to access reports"
         )
 
-    import traceback
-    try:
-        # Default to current month/year if not provided
-        now = datetime.utcnow()
-        if month is None:
-            month = now.month
-        if year is None:
-            year = now.year
+    # Default to current month/year if not provided
+    now = datetime.utcnow()
+    if month is None:
+        month = now.month
+    if year is None:
+        year = now.year
 
-        # 1. Inventory Stats (Snapshot of current state)
-        items = db.query(models.Item).all()
-        
-        total_items = 0
-        total_value = 0.0
-        low_stock_count = 0
-        
-        category_map = {}
+    try:
+        # Identical concurrent requests share one computation
+        report = single_flight.do(("monthly_report", year, month), lambda: snapshots.build_monthly_report(db, year, month, now))
+        return FastJSONResponse(report)
+    except snapshots.MissingSnapshotError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.exception("Error generating monthly report")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
 
-        for item in items:
-            # Global Stats
-            total_items += item.quantity
-            item_value = item.quantity * item.price
-            total_value += item_value
-            
-            if item.quantity < 10: # Assuming 10 is low stock threshold
-                low_stock_count += 1
-                
-            # Category Breakdown
-            cat = item.category or "Uncategorized"
-            if cat not in category_map:
-                category_map[cat] = {"count": 0, "value": 0.0}
-            
-            category_map[cat]["count"] += item.quantity
-            category_map[cat]["value"] += item_value
+@router.get("/trend", response_model=List[report_schema.MonthlyValue], dependencies=[Depends(QueryBudget(2))])
+def get_inventory_trend(
+    months: int = 12,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Closing inventory totals of the last `months` months, from the daily snapshots."""
+    if current_user.role != models.Role.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access reports"
+        )
+    return snapshots.monthly_totals(db, months=max(1, min(months, 120)))
 
-        stats = report_schema.ReportStats(
-            total_items=total_items,
-            total_inventory_value=total_value,
-            low_stock_count=low_stock_count
+def _require_admin(user: models.User):
+    if user.role != models.Role.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access reports"
         )
 
-        category_breakdown = [
-            report_schema.CategoryBreakdown(
-                category=cat,
-                item_count=data["count"],
-                value=data["value"]
-            ) for cat, data in category_map.items()
-        ]
+def _get_job(db: Session, job_id: int) -> models.ReportJob:
+    job = db.get(models.ReportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report job not found")
+    return job
 
-        # 2. Activity Summary (Audit Logs for the month)
-        # Filter audit logs by month and year
-        audit_logs = db.query(models.AuditLog).filter(
-            extract('month', models.AuditLog.timestamp) == month,
-            extract('year', models.AuditLog.timestamp) == year
-        ).order_by(models.AuditLog.timestamp.desc()).all()
-        
-        # Explicitly validate to catch errors
-        activities_data = []
-        for log in audit_logs:
-            try:
-                activities_data.append(report_schema.AuditLogMixin.model_validate(log))
-            except Exception as log_err:
-                # Get more details from the log object for debugging
-                log_details = {
-                    "id": getattr(log, 'id', 'unknown'),
-                    "action": getattr(log, 'action', 'unknown'),
-                    "timestamp": getattr(log, 'timestamp', 'unknown')
-                }
-                print(f"FAILED TO SERIALIZE LOG: {log_details} - ERROR: {log_err}")
-                continue
+# 1 user lookup + 1 expire stale jobs + 1 reusable jobs + insert and reload of a new job
+@router.post("/jobs", response_model=report_schema.ReportJob, status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(QueryBudget(5))])
+def create_report_job(
+    job_in: report_schema.ReportJobCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Queue a monthly report to be computed in the background.
+    Returns an identical queued or running job instead of queuing another,
+    and a closed month's finished job (200) instead of recomputing it.
+    """
+    _require_admin(current_user)
+    now = datetime.utcnow()
+    year = job_in.year or now.year
+    month = job_in.month or now.month
+    job, _ = get_report_queue().submit(db, year, month, job_in.format, user_id=current_user.id)
+    if job.status == models.ReportJobStatus.DONE:
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = request.url_for("get_report_job", job_id=job.id).path
+    return job
 
-        return report_schema.MonthlyReport(
-            report_date=now,
-            month=month,
-            year=year,
-            stats=stats,
-            category_breakdown=category_breakdown,
-            activities=activities_data
-        )
-    except Exception as e:
-        print(f"ERROR GENERATING REPORT: {e}")
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+# 1 user lookup + 1 job
+@router.get("/jobs/{job_id}", response_model=report_schema.ReportJob, dependencies=[Depends(QueryBudget(2))])
+def get_report_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    _require_admin(current_user)
+    return _get_job(db, job_id)
+
+# 1 user lookup + 1 job
+@router.get("/jobs/{job_id}/download", dependencies=[Depends(QueryBudget(2))])
+def download_report_job(
+    job_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    The finished report. The stored gzip file is sent as is to clients that
+    accept gzip, and decompressed on the fly for the others.
+    """
+    _require_admin(current_user)
+    job = _get_job(db, job_id)
+    if job.status != models.ReportJobStatus.DONE:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Report job is {job.status.value}")
+    if not get_report_queue().artifact_exists(job):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Report artifact no longer exists; create a new job")
+
+    filename = f"report-{job.year}-{job.month:02d}.{job.format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    media_type = MEDIA_TYPES[job.format]
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    if "gzip" in accepted or "*" in accepted:
+        return FileResponse(job.artifact_path, media_type=media_type, headers={**headers, "Content-Encoding": "gzip"})
+
+    def decompressed(path=job.artifact_path, chunk_size=64 * 1024):
+        with gzip.open(path, "rb") as artifact:
+            while chunk := artifact.read(chunk_size):
+                yield chunk
+
+    return StreamingResponse(decompressed(), media_type=media_type, headers=headers)
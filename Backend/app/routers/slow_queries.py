@@ -0,0 +1,31 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from ..core import slow_queries
+from ..dependencies import get_current_active_user
+from ..db import models
+from ..schemas import slow_query as schemas
+
+router = APIRouter()
+
+def _require_admin(current_user: models.User):
+    if current_user.role != models.Role.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+@router.get("/", response_model=List[schemas.SlowQuery])
+def read_slow_queries(
+    sort: str = "total_ms",
+    limit: int = 20,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Slow statements seen by this worker, grouped by fingerprint and ranked by `sort`."""
+    _require_admin(current_user)
+    if sort not in slow_queries.SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(slow_queries.SORT_KEYS)}")
+    limit = max(1, min(limit, slow_queries.MAX_FINGERPRINTS))
+    return slow_queries.get_slow_query_log().top(limit, sort)
+
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+def reset_slow_queries(current_user: models.User = Depends(get_current_active_user)):
+    """Forget the aggregated slow queries, e.g. after adding an index. The log file is kept."""
+    _require_admin(current_user)
+    slow_queries.get_slow_query_log().clear()
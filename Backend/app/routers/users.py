@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..core import security, crud
-from ..dependencies import get_db, get_current_active_user
+from ..dependencies import get_db, get_read_db, get_current_active_user
 from ..schemas import user as schemas
 from ..schemas import audit as audit_schemas
 from ..db import models
+from ..core.query_budget import QueryBudget
 
 router = APIRouter()
 
@@ -28,12 +29,12 @@ async def read_users_me(current_user: models.User = Depends(get_current_active_u
 from ..schemas.common import PaginatedResponse
 import math
 
-@router.get("/", response_model=PaginatedResponse[schemas.User])
+@router.get("/", response_model=PaginatedResponse[schemas.User], dependencies=[Depends(QueryBudget(3))])
 def read_users(
     page: int = 1, 
     size: int = 10, 
     search: str = None,
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user: models.User = Depends(get_current_active_user)
 ):
     if current_user.role != models.Role.ADMIN:
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class AuditLogBase(BaseModel):
     action: str
@@ -8,6 +8,7 @@ class AuditLogBase(BaseModel):
     entity_id: int
     user_id: int
     details: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
 
 class AuditLogCreate(AuditLogBase):
     pass
@@ -18,3 +19,9 @@ class AuditLog(AuditLogBase):
 
     class Config:
         from_attributes = True
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLog]
+    # Pass as `cursor` to get the next, older page
+    next_cursor: Optional[str] = None
+    has_more: bool
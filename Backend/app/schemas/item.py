@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 
 class ItemBase(BaseModel):
@@ -19,13 +19,61 @@ class ItemUpdate(BaseModel):
     category: Optional[str] = None
     quantity: Optional[int] = None
 
+    @model_validator(mode="after")
+    def check_quantity_not_null(self):
+        # Leaving quantity out keeps it; null would clear the stock count
+        if "quantity" in self.model_fields_set and self.quantity is None:
+            raise ValueError("quantity cannot be null")
+        return self
+
 class ItemQuantityUpdate(BaseModel):
-    quantity: int
+    # Exactly one of: an absolute count, or a relative change such as -3 for a pick
+    quantity: Optional[int] = None
+    delta: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_one_of(self):
+        if (self.quantity is None) == (self.delta is None):
+            raise ValueError("Provide exactly one of quantity or delta")
+        return self
 
 class Item(ItemBase):
     id: int
     quantity: int
     last_updated: datetime
+    change_seq: Optional[int] = None
+    version: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+MAX_BATCH_IDS = 1000
+
+class ItemBatchRequest(BaseModel):
+    ids: List[int] = Field(max_length=MAX_BATCH_IDS)
+    # Item fields to return (id is always included); all of them when omitted
+    fields: Optional[List[str]] = None
+
+class ItemBatch(BaseModel):
+    # In the order requested
+    items: List[Item]
+    missing: List[int]
+
+class ItemChange(BaseModel):
+    seq: int
+    op: Literal["upsert", "delete"]
+    item_id: int
+    item: Optional[Item] = None
+
+class ItemChangeFeed(BaseModel):
+    changes: list[ItemChange]
+    # Pass as `since` on the next call
+    next_since: int
+    has_more: bool
+
+StockStatus = Literal["in_stock", "low_stock", "out_of_stock"]
+
+class ItemFacets(BaseModel):
+    total: int
+    categories: Dict[str, int]
+    stock_status: Dict[str, int]
@@ -0,0 +1,51 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+
+class LocationCreate(BaseModel):
+    code: str = Field(min_length=1)
+    name: str
+
+class Location(LocationCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class StockLevel(BaseModel):
+    location_id: int
+    code: str
+    name: str
+    quantity: int
+
+class ItemStock(BaseModel):
+    item_id: int
+    # Item.quantity: the locations plus stock not assigned to any location
+    total: int
+    unassigned: int
+    locations: List[StockLevel]
+
+class StockTransfer(BaseModel):
+    # Omit a side to move stock out of, or into, the unassigned pool
+    from_location_id: Optional[int] = None
+    to_location_id: Optional[int] = None
+    quantity: int = Field(gt=0)
+
+    @model_validator(mode="after")
+    def check_locations(self):
+        if self.from_location_id == self.to_location_id:
+            raise ValueError("from_location_id and to_location_id must differ")
+        return self
+
+class LocationTotals(BaseModel):
+    item_count: int
+    total_quantity: int
+    total_value: float
+
+class LocationSummaryRow(LocationTotals):
+    location_id: int
+    code: str
+    name: str
+
+class LocationSummary(BaseModel):
+    locations: List[LocationSummaryRow]
+    unassigned: LocationTotals
@@ -1,6 +1,7 @@
-from typing import List, Optional, Any
-from pydantic import BaseModel
-from datetime import datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from ..db.models import ReportJobStatus
 
 class ReportStats(BaseModel):
     total_items: int
@@ -12,6 +13,22 @@ class CategoryBreakdown(BaseModel):
     item_count: int
     value: float
 
+class MonthOverMonth(BaseModel):
+    previous_year: int
+    previous_month: int
+    previous_total_items: int
+    previous_total_inventory_value: float
+    total_items_change: int
+    total_inventory_value_change: float
+    total_inventory_value_change_pct: Optional[float] = None
+
+class MonthlyValue(BaseModel):
+    year: int
+    month: int
+    as_of: date
+    total_items: int
+    total_inventory_value: float
+
 class AuditLogMixin(BaseModel):
     id: int
     action: str
@@ -29,8 +46,33 @@ class MonthlyReport(BaseModel):
     month: int
     year: int
     stats: ReportStats
+    # Date of the snapshot the stats come from; today for the current month
+    stats_as_of: Optional[date] = None
+    trend: Optional[MonthOverMonth] = None
     category_breakdown: List[CategoryBreakdown]
     activities: List[AuditLogMixin]
 
     class Config:
         from_attributes = True
+
+class ReportJobCreate(BaseModel):
+    # Default to the current month
+    year: Optional[int] = Field(default=None, ge=2000, le=9999)
+    month: Optional[int] = Field(default=None, ge=1, le=12)
+    format: Literal["json", "csv"] = "json"
+
+class ReportJob(BaseModel):
+    id: int
+    year: int
+    month: int
+    format: str
+    status: ReportJobStatus
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Compressed size of the stored artifact
+    artifact_size: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
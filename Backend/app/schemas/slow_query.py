@@ -0,0 +1,15 @@
+from typing import Dict, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+class SlowQuery(BaseModel):
+    fingerprint: str
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    last_seen: Optional[datetime] = None
+    # "METHOD /route" (or "background") -> occurrences
+    routes: Dict[str, int]
+    plan: Optional[str] = None
@@ -23,6 +23,10 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int  # seconds
+
 class TokenData(BaseModel):
     email: Optional[str] = None
     role: Optional[Role] = None
@@ -0,0 +1,66 @@
+"""
+Production entry point. Brings the schema up to date once, starts the daily
+inventory snapshot schedule, then starts N uvicorn worker processes that
+share the listening socket:
+
+    python -m app.serve --workers 4
+"""
+import argparse
+import copy
+import os
+import tempfile
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from .core.config import get_settings
+
+
+def logging_config(level: str) -> dict:
+    """uvicorn's logging config plus a handler for our own `app.*` loggers."""
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["loggers"]["app"] = {"handlers": ["default"], "level": level, "propagate": False}
+    return config
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run the API with multiple workers")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency or os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # Workers are separate processes, so caches and counters must go through
+    # a backend they all see.
+    if args.workers > 1 and "SHARED_STATE_BACKEND" not in os.environ and settings.shared_state_backend == "memory":
+        os.environ["SHARED_STATE_BACKEND"] = "database"
+    # Workers split per-worker limits (e.g. admission rate limits) by this
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    # Each worker writes its metrics snapshot here; /metrics merges them all
+    if args.workers > 1 and not settings.metrics_dir:
+        os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="ims-metrics-")
+
+    # Run migrations here, in the parent, so workers never race on them.
+    from .db.database import engine
+    from .db.migrate import migrate
+
+    migrate()
+    engine.dispose()
+    # In this parent process only: one snapshot a day, however many workers there are
+    from .core.snapshots import start_scheduler
+
+    start_scheduler()
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        proxy_headers=True,
+        log_config=logging_config(settings.log_level),
+    )
+
+
+if __name__ == "__main__":
+    main()
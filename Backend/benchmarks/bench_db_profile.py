@@ -0,0 +1,115 @@
+"""
+Concurrent read/write throughput of the "default" vs "production" DB profile.
+
+Runs reader and writer threads against a throwaway SQLite file for each
+profile and prints operations per second. Usage (from Backend/):
+
+    python -m benchmarks.bench_db_profile --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db.database import create_db_engine
+
+
+def _seed(engine, rows: int):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, title TEXT, category TEXT, quantity INTEGER, price INTEGER)"
+        ))
+        conn.execute(text("CREATE INDEX ix_items_category ON items (category)"))
+        conn.execute(
+            text("INSERT INTO items (title, category, quantity, price) VALUES (:t, :c, :q, :p)"),
+            [
+                {"t": f"Product {i}", "c": f"cat-{i % 20}", "q": random.randint(0, 100), "p": random.randint(10, 1000)}
+                for i in range(rows)
+            ],
+        )
+
+
+def run_profile(profile: str, readers: int, writers: int, seconds: float, rows: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"bench_{profile}_")
+    url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    engine = create_db_engine(url, profile=profile)
+    _seed(engine, rows)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def reader():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT category, SUM(quantity * price) FROM items WHERE category = :c GROUP BY category"),
+                        {"c": f"cat-{random.randint(0, 19)}"},
+                    ).all()
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["reads"] += done
+            counts["errors"] += errors
+
+    def writer():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("UPDATE items SET quantity = quantity + 1 WHERE id = :id"),
+                        {"id": random.randint(1, rows)},
+                    )
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads_per_sec": counts["reads"] / seconds,
+        "writes_per_sec": counts["writes"] / seconds,
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = [
+        run_profile(profile, args.readers, args.writers, args.seconds, args.rows)
+        for profile in ("default", "production")
+    ]
+    print(f"{'profile':<12}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+    for r in results:
+        print(f"{r['profile']:<12}{r['reads_per_sec']:>12.1f}{r['writes_per_sec']:>12.1f}{r['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
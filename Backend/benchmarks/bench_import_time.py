@@ -0,0 +1,64 @@
+"""
+Import-time budget for the API. Runs `python -X importtime -c "import app.main"`
+in a fresh interpreter several times and checks the best run against budgets:
+
+  total - cumulative time to import app.main, third-party packages included
+  app   - self time of our own `app.*` modules (catches work done at import)
+
+Usage (from Backend/):
+
+    python -m benchmarks.bench_import_time --total-budget-ms 2000 --app-budget-ms 150
+
+Exits non-zero when a budget is exceeded.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def measure(target: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        check=True,
+    )
+    total_us = app_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # header line
+        name = name.strip()
+        if name == target:
+            total_us = cumulative_us
+        if name == "app" or name.startswith("app."):
+            app_us += self_us
+    return {"total_ms": total_us / 1000, "app_ms": app_us / 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--total-budget-ms", type=float, default=2000)
+    parser.add_argument("--app-budget-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    runs = [measure(args.target) for _ in range(args.runs)]
+    best = {key: min(run[key] for run in runs) for key in ("total_ms", "app_ms")}
+    print(f"import {args.target}: total {best['total_ms']:.1f} ms (budget {args.total_budget_ms:.0f}), "
+          f"app modules {best['app_ms']:.1f} ms (budget {args.app_budget_ms:.0f})")
+
+    if best["total_ms"] > args.total_budget_ms or best["app_ms"] > args.app_budget_ms:
+        print("Import-time budget exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
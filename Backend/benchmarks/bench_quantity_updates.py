@@ -0,0 +1,111 @@
+"""
+Concurrent stock decrements through crud.update_item_quantity.
+
+Worker threads each open a session and call the shipped write path with
+``delta=-1`` in a loop. That path is the conditional UPDATE with the
+allocated-stock subquery, the change sequence reservation, the commit and
+the audit entry. By default the threads share a few hot items. With --items
+at least --threads, every thread has an item of its own. What the writers
+still share then is the change sequence row that orders the item change
+feed, so the throughput shows what that global ordering costs.
+
+It reports throughput, failed writes and lost updates: successful writes
+that did not show up in the final quantity. Usage (from Backend/):
+
+    python -m benchmarks.bench_quantity_updates --threads 8 --seconds 5
+    python -m benchmarks.bench_quantity_updates --threads 8 --items 8
+
+Pass --url to run against another database, e.g. Postgres.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import crud
+from app.db import models
+from app.db.database import create_db_engine
+
+START_QUANTITY = 10_000_000
+
+
+def _seed(engine, items: int):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"email": "bench@example.com", "role": models.Role.ADMIN}])
+        conn.execute(models.Item.__table__.insert(), [
+            {"id": i, "title": f"Hot item {i}", "quantity": START_QUANTITY, "price": 0, "change_seq": i, "version": 1}
+            for i in range(1, items + 1)
+        ])
+        models.reserve_change_seqs(conn, models.ITEM_CHANGE_SEQUENCE, items)
+
+
+def run(url: str, threads: int, seconds: float, items: int) -> dict:
+    engine = create_db_engine(url, profile="production")
+    _seed(engine, items)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    counts = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker(index: int):
+        ok = errors = 0
+        item_id = index % items + 1
+        while not stop.is_set():
+            db = Session()
+            try:
+                crud.update_item_quantity(db, item_id, user_id=1, delta=-1)
+                ok += 1
+            except (OperationalError, crud.InsufficientStockError):
+                db.rollback()
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            counts["ok"] += ok
+            counts["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+
+    with engine.connect() as conn:
+        applied = conn.execute(text("SELECT SUM(:start - quantity) FROM items"), {"start": START_QUANTITY}).scalar()
+        audited = conn.execute(text("SELECT COUNT(*) FROM audit_logs")).scalar()
+    engine.dispose()
+
+    return {
+        "writes_per_sec": counts["ok"] / seconds,
+        "failed": counts["errors"],
+        "lost": counts["ok"] - applied,
+        "audited": audited,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--items", type=int, default=2, help="number of items the threads share")
+    parser.add_argument("--url", help="database URL (default: a throwaway SQLite file)")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_quantity_'), 'bench.db')}"
+    r = run(url, args.threads, args.seconds, args.items)
+    print(f"{'threads':>8}{'items':>8}{'writes/s':>12}{'failed':>10}{'lost':>8}{'audited':>10}")
+    print(f"{args.threads:>8}{args.items:>8}{r['writes_per_sec']:>12.1f}{r['failed']:>10}{r['lost']:>8}{r['audited']:>10}")
+
+
+if __name__ == "__main__":
+    main()
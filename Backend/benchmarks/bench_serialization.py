@@ -0,0 +1,87 @@
+"""
+Cost of producing one large list response: the response_model path vs the lean path.
+
+  response_model - ORM query, Pydantic validation of PaginatedResponse[Item]
+                   and JSON encoding of the validated model (what FastAPI does
+                   for a route returning ORM objects)
+  lean           - column-only query, plain dicts and app.core.serialization.dumps
+
+Both run against an in-memory SQLite database and report milliseconds per
+response, query included. Usage (from Backend/):
+
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import serialization
+from app.core.serialization import dumps, rows_to_dicts, schema_columns
+from app.db import models
+from app.schemas import item as schemas
+from app.schemas.common import PaginatedResponse
+
+
+def _session(rows: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        models.Item(title=f"Product {i}", description="x" * 40, quantity=i % 50, price=i % 500,
+                    category=f"cat-{i % 20}", change_seq=i, version=1)
+        for i in range(rows)
+    ])
+    db.commit()
+    return db
+
+
+def response_model_path(db, rows: int, adapter) -> bytes:
+    items = db.query(models.Item).limit(rows).all()
+    page = adapter.validate_python({"items": items, "total": rows, "page": 1, "size": rows, "pages": 1})
+    body = json.dumps(adapter.dump_python(page, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+    db.expunge_all()
+    return body
+
+
+def lean_path(db, rows: int, columns) -> bytes:
+    result = db.query(*columns).limit(rows).all()
+    return dumps({"items": rows_to_dicts(result), "total": rows, "page": 1, "size": rows, "pages": 1})
+
+
+def _time(fn, repeat: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db = _session(args.rows)
+    adapter = TypeAdapter(PaginatedResponse[schemas.Item])
+    columns = schema_columns(models.Item, schemas.Item)
+
+    assert json.loads(response_model_path(db, args.rows, adapter)) == json.loads(lean_path(db, args.rows, columns))
+
+    baseline = _time(lambda: response_model_path(db, args.rows, adapter), args.repeat)
+    lean = _time(lambda: lean_path(db, args.rows, columns), args.repeat)
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"{args.rows} items per response, lean path encoder: {encoder}")
+    print(f"{'path':<16}{'ms/response':>14}")
+    print(f"{'response_model':<16}{baseline:>14.2f}")
+    print(f"{'lean':<16}{lean:>14.2f}")
+    print(f"speed-up: {baseline / lean:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Timings of the hot crud functions and API routes against seeded databases,
+saved as JSON baselines and compared against them.
+
+Each size seeds a SQLite database with app.db.seed: ``size`` items, as many
+audit log entries and a tenth as many alerts. Seeded databases are kept in
+--data-dir and reused; every run works on a fresh copy, so the write cases
+always start from the same data. Every case runs once to count its SQL
+statements, then is timed for --repeat rounds (at most --max-seconds each).
+Usage (from Backend/):
+
+    python -m benchmarks.bench_suite --sizes 10000,100000 --save baseline.json
+    python -m benchmarks.bench_suite --sizes 10000,100000 --compare baseline.json --threshold 0.25
+
+--compare exits with status 1 when a case got slower than its baseline by
+more than the threshold, or issues more SQL statements than it did. A
+statement increase usually means a new N+1 loop. Pass
+--case-threshold NAME=FRACTION for noisy cases. Baselines only compare
+meaningfully on the same machine. Every run, with or without a baseline,
+also exits with status 1 when a case issues more statements than its
+ceiling in MAX_STATEMENTS.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Tokens are issued and checked in this process, so any key will do
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+# Measure the work itself: no result reuse, rate limits or slow-query logging
+os.environ.setdefault("COALESCE_TTL_SECONDS", "0")
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+os.environ.setdefault("SHARED_STATE_BACKEND", "memory")
+os.environ.setdefault("QUERY_DEBUG", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.core import crud, security
+from app.core.query_budget import QueryCounter
+from app.db import models
+from app.db.database import create_db_engine
+from app.db.migrate import migrate
+from app.db.seed import NOUNS, seed
+from app.dependencies import get_db, get_read_db
+from app.main import app
+from app.schemas import item as item_schemas
+
+DEFAULT_SIZES = "10000,100000,1000000"
+DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+BULK_SIZE = 100
+
+# Statement counts no case may exceed, whatever the data size: they do not grow with the rows read or written
+MAX_STATEMENTS = {
+    "crud.get_items": 2,
+    "crud.get_items.search": 2,
+    "crud.get_alerts": 2,
+    "crud.get_audit_logs": 2,
+    # Sequence range, executemany insert, ids, audit entry and its refresh, items
+    f"crud.create_items_bulk.{BULK_SIZE}": 6,
+    "crud.update_item_quantity": 5,
+    "GET /dashboard/stats": 12,
+    "GET /reports/monthly": 4,
+}
+
+
+def seeded_database(size: int, seed_value: int, data_dir: str) -> str:
+    """Path of a database seeded for ``size``, created on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"seed-{size}-{seed_value}.db")
+    if os.path.exists(path):
+        return path
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    engine = create_db_engine(f"sqlite:///{partial}", profile="default")
+    migrate(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"email": "admin@example.com", "hashed_password": security.get_password_hash("admin"),
+             "role": models.Role.ADMIN},
+        ])
+    print(f"Seeding {size:,} rows into {path}...", file=sys.stderr)
+    seed(engine, items=size, audit_logs=size, alerts=max(size // 10, 1), seed=seed_value, days=365)
+    engine.dispose()
+    os.replace(partial, path)
+    return path
+
+
+def _crud_cases(Session, size: int, rng: random.Random):
+    def with_session(fn):
+        def run():
+            db = Session()
+            try:
+                fn(db)
+            finally:
+                db.close()
+        return run
+
+    def create_bulk(db):
+        crud.create_items_bulk(db, [
+            # In stock, so no out-of-stock alert emails are attempted
+            item_schemas.ItemCreate(title=f"Bench item {n}", description="Benchmark", quantity=1 + n % 50,
+                                    price=10 + n, category="Bench")
+            for n in range(BULK_SIZE)
+        ], user_id=1)
+
+    def update_quantity(db):
+        crud.update_item_quantity(db, rng.randint(1, size), user_id=1, delta=1)
+
+    search = NOUNS[0]
+    return {
+        "crud.get_items": with_session(lambda db: crud.get_items(db, limit=100)),
+        "crud.get_items.search": with_session(lambda db: crud.get_items(db, limit=100, search=search)),
+        "crud.get_alerts": with_session(lambda db: crud.get_alerts(db, limit=100)),
+        "crud.get_audit_logs": with_session(lambda db: crud.get_audit_logs(db, limit=100)),
+        f"crud.create_items_bulk.{BULK_SIZE}": with_session(create_bulk),
+        "crud.update_item_quantity": with_session(update_quantity),
+    }
+
+
+def _route_cases(client: TestClient, headers: dict):
+    def get(url):
+        def run():
+            response = client.get(url, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url}: {response.status_code} {response.text[:200]}")
+        return run
+
+    return {
+        "GET /dashboard/stats": get("/dashboard/stats"),
+        "GET /reports/monthly": get("/reports/monthly"),
+    }
+
+
+def measure(run, engine, repeat: int, max_seconds: float) -> dict:
+    with QueryCounter(engine) as queries:
+        run()  # also warms caches and the statement cache
+    times = []
+    deadline = time.perf_counter() + max_seconds
+    while len(times) < repeat and (len(times) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "rounds": len(times),
+        "min_ms": round(times[0], 3),
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "statements": queries.count,
+    }
+
+
+def run_size(size: int, args, selected) -> dict:
+    source = seeded_database(size, args.seed, args.data_dir)
+    workdir = tempfile.mkdtemp(prefix=f"bench_suite_{size}_")
+    path = os.path.join(workdir, "bench.db")
+    shutil.copyfile(source, path)
+    engine = create_db_engine(f"sqlite:///{path}", profile=args.profile)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    headers = {"Authorization": f"Bearer {security.create_access_token({'sub': 'admin@example.com'})}"}
+    results = {}
+    try:
+        with TestClient(app) as client:
+            cases = {**_crud_cases(Session, size, random.Random(args.seed)), **_route_cases(client, headers)}
+            for name, run in cases.items():
+                if selected and name not in selected:
+                    continue
+                results[name] = measure(run, engine, args.repeat, args.max_seconds)
+                result = results[name]
+                print(f"{size:>9,}  {name:<32} {result['median_ms']:>10.2f} ms  (p95 {result['p95_ms']:.2f}, "
+                      f"{result['statements']} statements)")
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float, case_thresholds: dict,
+            min_delta_ms: float, max_extra_statements: int) -> list:
+    """Regressions of ``current`` against ``baseline``, as printable strings."""
+    regressions = []
+    for size, cases in current["results"].items():
+        for name, result in cases.items():
+            base = baseline["results"].get(size, {}).get(name)
+            if base is None:
+                continue
+            allowed = case_thresholds.get(name, threshold)
+            slower = result["median_ms"] - base["median_ms"]
+            if slower > min_delta_ms and result["median_ms"] > base["median_ms"] * (1 + allowed):
+                regressions.append(
+                    f"{name} at {int(size):,} rows: median {base['median_ms']:.2f} -> {result['median_ms']:.2f} ms "
+                    f"(+{slower / base['median_ms']:.0%}, allowed +{allowed:.0%})"
+                )
+            if result["statements"] > base["statements"] + max_extra_statements:
+                regressions.append(
+                    f"{name} at {int(size):,} rows: {base['statements']} -> {result['statements']} SQL statements"
+                )
+    return regressions
+
+
+def over_statement_limits(current: dict) -> list:
+    """Cases of ``current`` that issued more statements than MAX_STATEMENTS allows, as printable strings."""
+    return [
+        f"{name} at {int(size):,} rows: {result['statements']} SQL statements, at most {MAX_STATEMENTS[name]} allowed"
+        for size, cases in current["results"].items()
+        for name, result in cases.items()
+        if name in MAX_STATEMENTS and result["statements"] > MAX_STATEMENTS[name]
+    ]
+
+
+def _case_thresholds(values) -> dict:
+    thresholds = {}
+    for value in values:
+        name, _, fraction = value.rpartition("=")
+        if not name:
+            raise argparse.ArgumentTypeError(f"--case-threshold expects NAME=FRACTION, got {value!r}")
+        thresholds[name] = float(fraction)
+    return thresholds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crud functions and API routes against seeded databases.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts")
+    parser.add_argument("--cases", help="comma-separated case names (default: all)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed rounds per case")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="stop timing a case after this long (min 3 rounds)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", default="production", help="DB profile of the benchmark engine")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where seeded databases are kept")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown, as a fraction")
+    parser.add_argument("--case-threshold", action="append", default=[], metavar="NAME=FRACTION")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--max-extra-statements", type=int, default=0)
+    args = parser.parse_args()
+
+    case_thresholds = _case_thresholds(args.case_threshold)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    selected = set(args.cases.split(",")) if args.cases else None
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    current = {
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "profile": args.profile,
+        "results": {str(size): run_size(size, args, selected) for size in sizes},
+    }
+
+    if args.save:
+        partial = args.save + ".partial"
+        with open(partial, "w") as f:
+            json.dump(current, f, indent=2)
+        os.replace(partial, args.save)
+        print(f"Saved results to {args.save}")
+
+    regressions = over_statement_limits(current)
+    if baseline is not None:
+        regressions += compare(baseline, current, args.threshold, case_thresholds,
+                               args.min_delta_ms, args.max_extra_statements)
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    if baseline is not None:
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
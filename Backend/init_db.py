@@ -1,96 +1,103 @@
-from sqlalchemy.orm import Session
+"""
+Create the schema, the demo users and generated data. Usage (from Backend/):
+
+    python init_db.py                      # demo: 50 items, 100 audit log entries
+    python init_db.py --items 1000000 --audit-logs 50000000 --alerts 100000 --days 365
+
+Tables that already have rows are left alone. The same --seed gives the same
+data; see app.db.seed for the distributions.
+"""
+import argparse
+import sys
+import time
+
 from app.db import models
-from app.db.database import SessionLocal, engine
+from app.db.database import SessionLocal, create_db_engine, engine as default_engine
+from app.db.migrate import migrate
+from app.db.seed import CHUNK_SIZE, seed
 from app.core.security import get_password_hash
-import random
-from datetime import datetime, timedelta
-
-def init_db():
-    models.Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    
-    # Create admin user
-    admin_user = db.query(models.User).filter(models.User.email == "admin@example.com").first()
-    if not admin_user:
-        print("Creating admin user...")
-        admin_user = models.User(
-            email="admin@example.com",
-            hashed_password=get_password_hash("admin"),
-            role=models.Role.ADMIN
-        )
-        db.add(admin_user)
-        print("Admin user created: admin@example.com / admin")
-    else:
-        print("Admin user already exists.")
-    
-    # Create manager user
-    manager_user = db.query(models.User).filter(models.User.email == "manager@example.com").first()
-    if not manager_user:
-        print("Creating manager user...")
-        manager_user = models.User(
-            email="manager@example.com",
-            hashed_password=get_password_hash("manager"),
-            role=models.Role.MANAGER
-        )
-        db.add(manager_user)
-        print("Manager user created: manager@example.com / manager")
-    else:
-        print("Manager user already exists.")
-    
-    # Create viewer user
-    viewer_user = db.query(models.User).filter(models.User.email == "viewer@example.com").first()
-    if not viewer_user:
-        print("Creating viewer user...")
-        viewer_user = models.User(
-            email="viewer@example.com",
-            hashed_password=get_password_hash("viewer"),
-            role=models.Role.VIEWER
-        )
-        db.add(viewer_user)
-        print("Viewer user created: viewer@example.com / viewer")
-    else:
-        print("Viewer user already exists.")
-
-    # Create dummy products
-    if db.query(models.Item).count() == 0:
-        print("Creating dummy products...")
-        categories = ["Electronics", "Clothing", "Home", "Sports", "Books"]
-        for i in range(1, 51):
-            item = models.Item(
-                title=f"Product {i}",
-                description=f"Description for product {i}",
-                quantity=random.randint(1, 100),
-                price=random.randint(10, 1000),
-                category=random.choice(categories),
-                last_updated=datetime.utcnow() - timedelta(days=random.randint(0, 30))
-            )
-            db.add(item)
-        print("50 dummy products created.")
-    else:
-        print("Products already exist.")
-
-    # Create dummy audit logs
-    if db.query(models.AuditLog).count() == 0:
-        print("Creating dummy audit logs...")
-        actions = ["CREATE", "UPDATE", "DELETE"]
-        entity_types = ["ITEM", "USER"]
-        for i in range(1, 101):
-            audit_log = models.AuditLog(
-                action=random.choice(actions),
-                entity_type=random.choice(entity_types),
-                entity_id=random.randint(1, 50),
-                user_id=random.randint(1, 3), # Assuming user IDs 1-3 exist
-                timestamp=datetime.utcnow() - timedelta(days=random.randint(0, 30)),
-                details=f"Details for audit log {i}"
-            )
-            db.add(audit_log)
-        print("100 dummy audit logs created.")
-    else:
-        print("Audit logs already exist.")
-    
+
+DEMO_USERS = [
+    ("admin@example.com", "admin", models.Role.ADMIN),
+    ("manager@example.com", "manager", models.Role.MANAGER),
+    ("viewer@example.com", "viewer", models.Role.VIEWER),
+]
+
+
+def create_users(db, extra_viewers: int = 0):
+    for email, password, role in DEMO_USERS:
+        if db.query(models.User).filter(models.User.email == email).first():
+            print(f"{role.value.capitalize()} user already exists.")
+            continue
+        db.add(models.User(email=email, hashed_password=get_password_hash(password), role=role))
+        print(f"{role.value.capitalize()} user created: {email} / {password}")
+    if extra_viewers:
+        existing = {email for (email,) in db.query(models.User.email).filter(models.User.email.like("user%@example.com"))}
+        # One hash for all of them; bcrypt takes a noticeable time per call
+        hashed = get_password_hash("viewer")
+        new = [{"email": f"user{n}@example.com", "hashed_password": hashed, "role": models.Role.VIEWER}
+               for n in range(1, extra_viewers + 1) if f"user{n}@example.com" not in existing]
+        if new:
+            db.execute(models.User.__table__.insert(), new)
+        print(f"{len(new)} viewer users created: user<n>@example.com / viewer")
     db.commit()
-    db.close()
 
-if __name__ == "__main__":
+
+class Progress:
+    """Prints rows inserted and the insert rate, at most once a second per table."""
+
+    def __init__(self):
+        self.started = {}
+        self.printed = 0.0
+
+    def __call__(self, table: str, done: int, total: int):
+        now = time.perf_counter()
+        start = self.started.setdefault(table, now)
+        if not done or (now - self.printed < 1.0 and done < total):
+            return
+        self.printed = now
+        rate = done / (now - start) if now > start else 0
+        print(f"{table}: {done:,}/{total:,} ({done * 100 // total}%), {rate:,.0f} rows/s", file=sys.stderr)
+
+
+def init_db(items: int = 50, audit_logs: int = 100, alerts: int = 0, users: int = 0, seed_value: int = 0,
+            days: int = 30, chunk_size: int = CHUNK_SIZE, database_url: str = None):
+    bind = create_db_engine(database_url) if database_url else default_engine
+    migrate(bind)
+    db = SessionLocal(bind=bind)
+    try:
+        create_users(db, users)
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    inserted = seed(bind, items=items, audit_logs=audit_logs, alerts=alerts, seed=seed_value, days=days,
+                    chunk_size=chunk_size, progress=Progress())
+    requested = {"items": items, "audit_logs": audit_logs, "alerts": alerts}
+    for table, count in inserted.items():
+        if count:
+            print(f"{count:,} {table.replace('_', ' ')} created.")
+        elif requested[table]:
+            print(f"{table.replace('_', ' ').capitalize()} already exist.")
+    print(f"Seeded in {time.perf_counter() - started:.1f}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the schema, demo users and generated data.")
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--audit-logs", type=int, default=100)
+    parser.add_argument("--alerts", type=int, default=0)
+    parser.add_argument("--users", type=int, default=0, help="viewer accounts added to the three demo users")
+    parser.add_argument("--seed", type=int, default=0, help="the same seed gives the same data")
+    parser.add_argument("--days", type=int, default=30, help="history the audit log and alerts cover")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per insert transaction")
+    parser.add_argument("--database-url", help="seed this database instead of DATABASE_URL")
+    args = parser.parse_args()
+
     print("Initializing database...")
-    init_db()
+    init_db(items=args.items, audit_logs=args.audit_logs, alerts=args.alerts, users=args.users,
+            seed_value=args.seed, days=args.days, chunk_size=args.chunk_size, database_url=args.database_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,31 @@
+import os
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
+
+# Settings are read once; make sure tests never depend on a developer's .env
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+# Record every statement so N+1 patterns and budget overruns fail the test
+os.environ.setdefault("QUERY_DEBUG", "true")
+# A request must see the writes made just before it, not a coalesced result from earlier
+os.environ.setdefault("COALESCE_TTL_SECONDS", "0")
+# Slow queries are aggregated in memory only; tests that need the file set their own
+os.environ.setdefault("SLOW_QUERY_LOG_FILE", "")
 from app.main import app
 from app.db.database import Base
-from app.dependencies import get_db
+from app.dependencies import get_db, get_read_db
 from app.core import security
 from app.db import models
+from app.core.metrics import instrument_engine
+from app.core.profiler import profile_engine
+from app.core.slow_queries import log_slow_queries
+from app.core import query_budget
+from app.core.shared_state import get_shared_state
+from app.core.singleflight import single_flight
+from app.core.admission import set_admission_controller
 
 # Use an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -17,6 +35,9 @@ engine = create_engine(
     connect_args={"check_same_thread": False}, 
     poolclass=StaticPool
 )
+instrument_engine(engine)
+profile_engine(engine)
+log_slow_queries(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="function")
@@ -28,8 +49,24 @@ def db():
         yield session
     finally:
         session.close()
-        # Drop tables
+        # Drop tables, and anything cached from them
         Base.metadata.drop_all(bind=engine)
+        get_shared_state().clear()
+        single_flight.clear()
+        set_admission_controller(None)
+
+@pytest.fixture(autouse=True)
+def no_query_budget_violations():
+    query_budget.violations.clear()
+    yield
+    found = list(query_budget.violations)
+    query_budget.violations.clear()
+    assert not found, "\n".join(str(v) for v in found)
+
+@pytest.fixture
+def count_queries():
+    """Usage: `with count_queries() as queries: ...` then assert on `queries.count`."""
+    return lambda: query_budget.QueryCounter(engine)
 
 @pytest.fixture(scope="function")
 def client(db):
@@ -40,6 +77,7 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from app.core import crud
+from app.db import models
+from app.db.migrate import backfill_item_activity
+
+
+def test_most_active_items_follow_the_window(client, db, admin_headers):
+    ids = [client.post("/items/", json={"title": t, "quantity": 50}, headers=admin_headers).json()["id"]
+           for t in ("Bolt", "Nut")]
+    # Bolt was busy last week, Nut is busy today
+    crud.record_item_activity(db, ids[0], at=datetime.utcnow() - timedelta(days=3), count=10)
+    db.commit()
+    for _ in range(3):
+        client.patch(f"/items/{ids[1]}/quantity", json={"delta": -1}, headers=admin_headers)
+
+    day = client.get("/dashboard/stats?window=24h", headers=admin_headers).json()
+    assert day["window"] == "24h"
+    assert [(s["title"], s["activity"]) for s in day["item_stats"]] == [("Nut", 4), ("Bolt", 1)]
+
+    week = client.get("/dashboard/stats?window=7d", headers=admin_headers).json()
+    assert [s["title"] for s in week["item_stats"]] == ["Bolt", "Nut"]
+
+    assert client.get("/dashboard/stats?window=1y", headers=admin_headers).status_code == 422
+
+
+def test_each_quantity_update_is_one_activity(client, db, admin_headers):
+    item_id = client.post("/items/", json={"title": "Bolt", "quantity": 50}, headers=admin_headers).json()["id"]
+    client.patch(f"/items/{item_id}/quantity", json={"delta": -1}, headers=admin_headers)
+    client.put(f"/items/{item_id}", json={"quantity": 5}, headers=admin_headers)
+    logs = db.query(models.AuditLog).filter(models.AuditLog.entity_id == item_id).order_by(models.AuditLog.id).all()
+    assert [log.action for log in logs] == ["CREATE", "UPDATE", "UPDATE"]
+    # The PUT is logged as the admin who sent it, with the details the dashboard history reads
+    assert (logs[-1].user_id, logs[-1].details, logs[-1].data) == (logs[0].user_id, "Updated quantity to 5", {"quantity": 5})
+    assert db.query(models.ItemActivity.count).filter(models.ItemActivity.item_id == item_id).scalar() == 3
+
+
+def test_old_buckets_are_pruned(db):
+    crud.record_item_activity(db, 1, at=datetime.utcnow() - timedelta(days=45))
+    crud.record_item_activity(db, 1)
+    db.commit()
+    assert crud.prune_item_activity(db) == 1
+    assert db.query(models.ItemActivity).count() == 1
+
+
+def test_migration_backfills_counters_from_audit_logs(db):
+    now = datetime.utcnow()
+    db.add_all([
+        models.AuditLog(action="UPDATE", entity_type="ITEM", entity_id=7, user_id=1, timestamp=now),
+        models.AuditLog(action="UPDATE", entity_type="ITEM", entity_id=7, user_id=1, timestamp=now),
+        models.AuditLog(action="UPDATE", entity_type="ITEM", entity_id=8, user_id=1, timestamp=now - timedelta(days=90)),
+        models.AuditLog(action="CREATE", entity_type="ALERT", entity_id=7, user_id=1, timestamp=now),
+    ])
+    db.commit()
+    with db.get_bind().begin() as conn:
+        backfill_item_activity(conn)
+    assert crud.get_most_active_items(db, window="30d") == [(7, 2)]
@@ -0,0 +1,131 @@
+import pytest
+from app.core.admission import AdmissionController, AdmissionRejected, set_admission_controller
+from app.core.config import get_settings
+from app.core.shared_state import MemoryState, set_shared_state
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def controller(**options):
+    options.setdefault("rate_limits", {"viewer": 10})
+    options.setdefault("concurrency_limits", {"viewer": 2})
+    options.setdefault("window_seconds", 60)
+    return AdmissionController(MemoryState(), **options)
+
+
+def test_rate_limit_slides_over_the_previous_window():
+    clock = Clock(999_980.0)  # 20s into a 60s window
+    limits = controller(clock=clock)
+    for _ in range(8):
+        limits.admit("1", "viewer", cost=1)
+        limits.release("1", "viewer")
+    with pytest.raises(AdmissionRejected) as rejected:
+        limits.admit("1", "viewer", cost=3)
+    assert rejected.value.status_code == 429
+    # The rejected cost was not kept
+    limits.admit("1", "viewer", cost=2)
+    limits.release("1", "viewer")
+
+    # 30s into the next window, half of the 10 units used before still count
+    clock.now += 70
+    limits.admit("1", "viewer", cost=5)
+    with pytest.raises(AdmissionRejected) as rejected:
+        limits.admit("1", "viewer", cost=1)
+    # Room for 1 more unit once the previous window weighs less than 4
+    assert rejected.value.retry_after == 6
+
+    # Other users have their own budget; roles without a limit have none
+    limits.admit("2", "viewer", cost=10)
+    limits.admit("3", "admin", cost=1000)
+
+
+def test_concurrency_slots_are_released():
+    limits = controller()
+    limits.admit("1", "viewer")
+    limits.admit("1", "viewer")
+    with pytest.raises(AdmissionRejected) as rejected:
+        limits.admit("1", "viewer")
+    assert rejected.value.status_code == 429
+    limits.release("1", "viewer")
+    limits.admit("1", "viewer")
+
+
+def test_requests_rejected_for_concurrency_use_no_rate_budget():
+    limits = controller(rate_limits={"viewer": 3})
+    limits.admit("1", "viewer")
+    limits.admit("1", "viewer")
+    for _ in range(5):
+        with pytest.raises(AdmissionRejected) as rejected:
+            limits.admit("1", "viewer")
+        assert rejected.value.detail == "Too many concurrent requests"
+    limits.release("1", "viewer")
+    # Only the two admitted requests were charged
+    limits.admit("1", "viewer")
+
+
+class RecordingState(MemoryState):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def incr(self, key, amount=1, ttl=None):
+        self.calls.append(key)
+        return super().incr(key, amount, ttl)
+
+
+def test_counters_stay_in_the_worker_with_the_database_backend(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "shared_state_backend", "database")
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    shared = RecordingState()
+    set_shared_state(shared)
+    try:
+        limits = AdmissionController(rate_limits={"viewer": 10}, concurrency_limits={"viewer": 2}, window_seconds=60)
+        # The rate limit is split between the two workers
+        for _ in range(5):
+            limits.admit("1", "viewer")
+            limits.release("1", "viewer")
+        with pytest.raises(AdmissionRejected):
+            limits.admit("1", "viewer")
+        assert shared.calls == []
+    finally:
+        set_shared_state(None)
+
+
+def test_load_shedding_rejects_expensive_routes_on_every_worker():
+    state = MemoryState()
+    first = AdmissionController(state, rate_limits={}, concurrency_limits={},
+                                shed_latency_ms=100, shed_min_cost=5, shed_hold_seconds=10)
+    second = AdmissionController(state, rate_limits={}, concurrency_limits={},
+                                 shed_latency_ms=100, shed_min_cost=5, shed_hold_seconds=10)
+    first.admit("1", "viewer", cost=10)
+
+    for _ in range(50):
+        first.observe_statement(0.5)
+    with pytest.raises(AdmissionRejected) as rejected:
+        first.admit("1", "viewer", cost=10)
+    assert (rejected.value.status_code, rejected.value.retry_after) == (503, 10)
+    # Cheap requests still go through
+    first.admit("1", "viewer", cost=1)
+    # Another worker sees the shared flag
+    with pytest.raises(AdmissionRejected):
+        second.admit("1", "viewer", cost=5)
+
+
+def test_over_limit_requests_get_429_with_retry_after(client, user_headers, admin_headers):
+    set_admission_controller(controller(rate_limits={"viewer": 12}))
+    assert client.get("/items/", headers=user_headers).status_code == 200
+    # The dashboard costs 3 units
+    for _ in range(3):
+        assert client.get("/dashboard/stats", headers=user_headers).status_code == 200
+    res = client.get("/dashboard/stats", headers=user_headers)
+    assert res.status_code == 429
+    assert int(res.headers["retry-after"]) >= 1
+    # Limits are per user
+    assert client.get("/dashboard/stats", headers=admin_headers).status_code == 200
@@ -0,0 +1,100 @@
+from datetime import date, datetime
+import pytest
+from sqlalchemy import text
+from app.core import audit_archive, snapshots
+from app.core.config import get_settings
+from app.db import models
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "audit_archive_dir", str(tmp_path))
+    return tmp_path
+
+
+def add_logs(db, *entries):
+    db.add_all([models.AuditLog(action=action, entity_type="ITEM", entity_id=1, user_id=user_id,
+                                timestamp=timestamp, details=f"{action} at {timestamp:%Y-%m-%d}")
+                for action, user_id, timestamp in entries])
+    db.commit()
+
+
+def test_actions_and_entity_types_are_stored_as_codes(db):
+    add_logs(db, ("TRANSFER", 1, datetime(2025, 1, 1)))
+    assert db.execute(text("SELECT action, entity_type FROM audit_logs")).one() == (7, 1)
+    assert db.query(models.AuditLog.action).filter(models.AuditLog.action == "TRANSFER").scalar() == "TRANSFER"
+
+    db.add(models.AuditLog(action="RENAME", entity_type="ITEM", entity_id=1, user_id=1))
+    with pytest.raises(Exception, match="RENAME"):
+        db.commit()
+    db.rollback()
+
+
+def test_quantity_changes_record_structured_details(client, db, admin_headers, manager_headers):
+    item = client.post("/items/", json={"title": "Bolt", "quantity": 5, "price": 1}, headers=admin_headers).json()
+    client.patch(f"/items/{item['id']}/quantity", json={"delta": -2}, headers=manager_headers)
+    log = db.query(models.AuditLog).filter(models.AuditLog.action == "UPDATE").one()
+    assert log.data == {"quantity": 3, "delta": -2}
+
+
+def test_old_months_move_to_archive_files(db, archive_dir):
+    add_logs(db, ("CREATE", 1, datetime(2025, 1, 3)), ("UPDATE", 2, datetime(2025, 1, 20)),
+             ("DELETE", 1, datetime(2025, 3, 9)), ("UPDATE", 1, datetime(2026, 1, 2)))
+
+    moved = audit_archive.archive_old_logs(db, keep_months=6, now=datetime(2026, 2, 15))
+    assert moved == 3
+    assert [log.timestamp for log in db.query(models.AuditLog)] == [datetime(2026, 1, 2)]
+    assert audit_archive.archived_months() == [(2025, 3), (2025, 1)]
+    january = audit_archive.read_month(2025, 1)
+    assert [(row["action"], row["timestamp"]) for row in january] == [
+        ("UPDATE", datetime(2025, 1, 20)), ("CREATE", datetime(2025, 1, 3))
+    ]
+
+    # Entries that turn up later for an archived month are merged into its file
+    add_logs(db, ("UPDATE", 3, datetime(2025, 1, 10)))
+    assert audit_archive.archive_old_logs(db, keep_months=6, now=datetime(2026, 2, 15)) == 1
+    assert [row["user_id"] for row in audit_archive.read_month(2025, 1)] == [2, 3, 1]
+    assert not list(archive_dir.glob("*.partial"))
+
+    assert audit_archive.archive_old_logs(db, keep_months=0) == 0
+
+
+def test_audit_endpoints_can_include_archived_months(client, db, admin_headers, archive_dir):
+    now = datetime.utcnow()
+    add_logs(db, ("CREATE", 1, datetime(2020, 1, 3)), ("UPDATE", 2, datetime(2020, 1, 20)),
+             ("DELETE", 1, datetime(2020, 2, 9)), ("UPDATE", 1, now))
+    audit_archive.archive_old_logs(db, keep_months=1)
+
+    assert client.get("/audit-logs/", headers=admin_headers).json()["total"] == 1
+    res = client.get("/audit-logs/?include_archived=true&size=2&page=2&fields=action", headers=admin_headers).json()
+    assert res["total"] == 4
+    assert [row["action"] for row in res["items"]] == ["UPDATE", "CREATE"]
+    res = client.get("/audit-logs/?include_archived=true&user_id=1", headers=admin_headers).json()
+    assert [row["action"] for row in res["items"]] == ["UPDATE", "DELETE", "CREATE"]
+
+    lines = client.get("/audit-logs/export?include_archived=true", headers=admin_headers).text.splitlines()
+    assert len(lines) == 4
+
+    # Searches only read the archived months in their time range
+    res = client.get("/audit-logs/search?include_archived=true&since=2020-01-10T00:00:00&until=2020-02-01T00:00:00",
+                     headers=admin_headers).json()
+    assert [row["action"] for row in res["items"]] == ["UPDATE"]
+    first = client.get("/audit-logs/search?include_archived=true&limit=2", headers=admin_headers).json()
+    rest = client.get(f"/audit-logs/search?include_archived=true&limit=2&cursor={first['next_cursor']}",
+                      headers=admin_headers).json()
+    assert [row["action"] for row in first["items"] + rest["items"]] == ["UPDATE", "DELETE", "UPDATE", "CREATE"]
+    assert not rest["has_more"]
+
+
+def test_monthly_report_reads_archived_activity(client, db, admin_headers, archive_dir):
+    db.add(models.Item(title="Bolt", quantity=1, price=1))
+    db.commit()
+    snapshots.take_snapshot(db, date(2020, 1, 31))
+    add_logs(db, ("CREATE", 1, datetime(2020, 1, 3)), ("UPDATE", 2, datetime(2020, 1, 20)))
+    audit_archive.archive_old_logs(db, keep_months=1)
+
+    report = client.get("/reports/monthly?year=2020&month=1", headers=admin_headers).json()
+    assert [(row["action"], row["timestamp"]) for row in report["activities"]] == [
+        ("UPDATE", "2020-01-20T00:00:00"), ("CREATE", "2020-01-03T00:00:00")
+    ]
+    assert "data" not in report["activities"][0]
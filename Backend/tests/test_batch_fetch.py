@@ -0,0 +1,69 @@
+def create_items(client, admin_headers, count=3):
+    return [
+        client.post("/items/", json={"title": f"Item {i}", "description": "x" * 200, "quantity": i, "price": 5},
+                    headers=admin_headers).json()
+        for i in range(count)
+    ]
+
+
+def test_ids_filter_fetches_the_items_in_one_query(client, admin_headers, count_queries):
+    items = create_items(client, admin_headers, 4)
+    wanted = [items[0]["id"], items[2]["id"], items[3]["id"]]
+
+    with count_queries() as queries:
+        res = client.get(f"/items/?ids={','.join(map(str, wanted))}&sort=id", headers=admin_headers)
+    assert res.status_code == 200
+    # user lookup, count, page
+    assert queries.count == 3
+    assert [item["id"] for item in res.json()["items"]] == wanted
+    assert res.json()["total"] == 3
+
+    assert client.get("/items/?ids=1,x", headers=admin_headers).status_code == 400
+    too_many = ",".join(str(i) for i in range(1001))
+    assert client.get(f"/items/?ids={too_many}", headers=admin_headers).status_code == 400
+
+
+def test_batch_keeps_the_requested_order_and_reports_missing_ids(client, admin_headers, user_headers, count_queries):
+    items = create_items(client, admin_headers)
+    ids = [items[2]["id"], 999, items[0]["id"], items[2]["id"]]
+
+    with count_queries() as queries:
+        res = client.post("/items/batch", json={"ids": ids}, headers=user_headers)
+    assert res.status_code == 200
+    assert queries.count == 2
+    assert [item["id"] for item in res.json()["items"]] == [items[2]["id"], items[0]["id"]]
+    assert res.json()["items"][0]["title"] == "Item 2"
+    assert res.json()["missing"] == [999]
+
+    assert client.post("/items/batch", json={"ids": list(range(1001))}, headers=user_headers).status_code == 422
+    assert client.post("/items/batch", json={"ids": []}, headers=user_headers).json() == {"items": [], "missing": []}
+
+
+def test_fields_narrow_the_payload(client, admin_headers):
+    create_items(client, admin_headers)
+    full = client.get("/items/", headers=admin_headers)
+    narrow = client.get("/items/?fields=title,quantity", headers=admin_headers)
+    assert narrow.status_code == 200
+    assert set(narrow.json()["items"][0]) == {"id", "title", "quantity"}
+    assert len(narrow.content) < len(full.content) / 3
+
+    batch = client.post("/items/batch", json={"ids": [full.json()["items"][0]["id"]], "fields": ["price"]},
+                        headers=admin_headers).json()
+    assert batch["items"] == [{"id": full.json()["items"][0]["id"], "price": 5.0}]
+
+    lines = client.get("/items/export?fields=title", headers=admin_headers).text.splitlines()
+    assert all(line.count(":") == 2 for line in lines)
+
+
+def test_unknown_fields_are_rejected(client, admin_headers):
+    res = client.get("/items/?fields=title,password", headers=admin_headers)
+    assert res.status_code == 400
+    assert "password" in res.json()["detail"]
+    assert client.post("/items/batch", json={"ids": [1], "fields": ["owner"]}, headers=admin_headers).status_code == 400
+    assert client.get("/audit-logs/?fields=nope", headers=admin_headers).status_code == 400
+
+
+def test_audit_log_fields(client, admin_headers):
+    create_items(client, admin_headers, 1)
+    logs = client.get("/audit-logs/?fields=action,entity_id", headers=admin_headers).json()["items"]
+    assert logs and all(set(log) == {"id", "action", "entity_id"} for log in logs)
@@ -0,0 +1,73 @@
+import asyncio
+import gzip
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.metrics import registry, render
+from app.db import models
+
+
+def run(app, accept="gzip"):
+    """Drive an ASGI app through the middleware and collect what it sends."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    return dict(sent[0]["headers"]), [m["body"] for m in sent[1:]]
+
+
+def streaming_app(content_type, chunks):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("*") == "gzip"
+
+
+def test_streams_are_compressed_chunk_by_chunk():
+    chunks = [b'{"id": %d}\n' % i * 50 for i in range(3)]
+    headers, bodies = run(streaming_app(b"application/x-ndjson", chunks))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # One compressed message per chunk, each decodable as soon as it arrives
+    assert len(bodies) == 3
+    decoder = gzip.zlib.decompressobj(16 + gzip.zlib.MAX_WBITS)
+    assert decoder.decompress(bodies[0]) == chunks[0]
+    assert gzip.decompress(b"".join(bodies)) == b"".join(chunks)
+
+
+def test_event_streams_and_small_bodies_pass_through():
+    headers, bodies = run(streaming_app(b"text/event-stream", [b"event: ping\n\n", b""]))
+    assert b"content-encoding" not in headers
+    assert bodies == [b"event: ping\n\n", b""]
+
+    headers, bodies = run(streaming_app(b"application/json", [b"{}"]))
+    assert b"content-encoding" not in headers
+    assert bodies == [b"{}"]
+
+
+def test_large_json_responses_are_compressed_and_measured(client, db, admin_headers):
+    registry.reset()
+    db.add_all([models.Item(title=f"Item {i}", quantity=20) for i in range(20)])
+    db.commit()
+    res = client.get("/items/?size=50", headers={**admin_headers, "Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert int(res.headers["content-length"]) < len(res.content)
+    assert res.json()["total"] == 20
+
+    text = render()
+    assert 'http_responses_compressed_total{encoding="gzip"} 1' in text
+    assert 'http_response_uncompressed_bytes_total{encoding="gzip"}' in text
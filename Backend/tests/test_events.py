@@ -0,0 +1,177 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from app.core import events, security
+from app.core.events import Broadcaster
+
+
+@pytest.fixture
+def published(monkeypatch):
+    sent = []
+    monkeypatch.setattr(events, "publish", lambda event_type, **data: sent.append({"type": event_type, **data}))
+    monkeypatch.setattr(events, "has_listeners", lambda: True)
+    return sent
+
+
+def test_broadcaster_fans_out_from_worker_threads():
+    async def scenario():
+        broadcaster = Broadcaster()
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        # crud runs in the threadpool, not on the event loop
+        thread = threading.Thread(target=broadcaster.publish, args=({"type": "alert.created"},))
+        thread.start()
+        thread.join()
+        received = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), timeout=1)
+        broadcaster.unsubscribe(first)
+        broadcaster.unsubscribe(second)
+        return received, broadcaster.subscriber_count
+
+    received, remaining = asyncio.run(scenario())
+    assert [e["type"] for e in received] == ["alert.created", "alert.created"]
+    assert remaining == 0
+
+
+def test_publish_without_subscribers_is_a_no_op():
+    Broadcaster().publish({"type": "dashboard.delta"})
+
+
+def test_item_and_alert_writes_publish_events(client, admin_headers, published):
+    res = client.post("/items/", json={"title": "Bolt", "quantity": 20}, headers=admin_headers)
+    item_id = res.json()["id"]
+    client.patch(f"/items/{item_id}/quantity", json={"quantity": 3}, headers=admin_headers)
+
+    assert published[0] == {"type": "dashboard.delta", "delta": {"total_items": 1, "low_stock": 0, "out_of_stock": 0}}
+    assert published[1] == {"type": "dashboard.delta", "delta": {"total_items": 0, "low_stock": 1, "out_of_stock": 0}}
+
+    res = client.post("/alerts/", json={"item_id": item_id, "alert_type": "manual", "message": "Check"}, headers=admin_headers)
+    alert_event = published[2]
+    assert alert_event["type"] == "alert.created"
+    assert alert_event["alert"]["id"] == res.json()["id"]
+    assert alert_event["active_alerts"] == 1
+
+    client.patch(f"/alerts/{alert_event['alert']['id']}/resolve", headers=admin_headers)
+    assert published[-1]["type"] == "alert.resolved"
+    assert published[-1]["active_alerts"] == 0
+
+    client.delete(f"/items/{item_id}", headers=admin_headers)
+    assert published[-1] == {"type": "dashboard.delta", "delta": {"total_items": -1, "low_stock": -1, "out_of_stock": 0}}
+
+
+def test_alert_count_is_skipped_without_listeners(client, admin_headers, count_queries):
+    item_id = client.post("/items/", json={"title": "Bolt", "quantity": 20}, headers=admin_headers).json()["id"]
+    with count_queries() as queries:
+        res = client.post("/alerts/", json={"item_id": item_id, "alert_type": "manual", "message": "Check"},
+                          headers=admin_headers)
+    assert res.status_code == 200
+    assert not [s for s in queries.statements if s.startswith("SELECT count(*)")]
+
+
+def test_broadcaster_asks_the_relay_about_other_workers():
+    class Relay:
+        listening = False
+
+        def has_listeners(self):
+            return self.listening
+
+    broadcaster = Broadcaster()
+    broadcaster.relay = Relay()
+    assert not broadcaster.has_listeners()
+    broadcaster.relay.listening = True
+    assert broadcaster.has_listeners()
+
+
+def test_stream_requires_token(client):
+    assert client.get("/events/stream").status_code == 401
+
+
+async def _read_stream(app, path, chunks, publish=None):
+    """Drive the ASGI app directly; TestClient buffers the whole (endless) response."""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path.split("?")[0], "raw_path": path.split("?")[0].encode(), "root_path": "",
+        "query_string": path.partition("?")[2].encode(), "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    body, done = [], asyncio.Event()
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            body.append(message["body"].decode())
+            if publish and len(body) == 2:
+                publish()
+            if len(body) >= chunks:
+                done.set()
+
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(done.wait(), timeout=5)
+    task.cancel()
+    return body
+
+
+def test_stream_sends_count_then_events(client, admin_headers):
+    ticket = client.post("/events/ticket", headers=admin_headers).json()["ticket"]
+    chunks = asyncio.run(_read_stream(
+        client.app, f"/events/stream?ticket={ticket}", chunks=3,
+        publish=lambda: events.publish("alert.resolved", alert={"id": 1}, active_alerts=0),
+    ))
+    assert chunks[0] == "retry: 5000\n\n"
+    event_type, data = chunks[1].strip().split("\n")
+    assert event_type == "event: alerts.count"
+    assert json.loads(data[len("data: "):]) == {"type": "alerts.count", "active_alerts": 0}
+    assert chunks[2].startswith("event: alert.resolved\n")
+    assert events.get_broadcaster().subscriber_count == 0
+
+
+def test_access_tokens_are_not_accepted_in_the_url(client, admin_token):
+    assert client.get(f"/events/stream?token={admin_token}").status_code == 401
+    assert client.get(f"/events/stream?ticket={admin_token}").status_code == 401
+
+
+def test_stream_tickets_are_not_api_tokens(client, admin_headers):
+    ticket = client.post("/events/ticket", headers=admin_headers).json()["ticket"]
+    assert client.get("/items/", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+
+
+def test_stream_ends_when_the_session_expires(client, admin_token):
+    ticket = security.create_stream_ticket("admin@test.com", int(time.time()) - 1)
+    chunks = asyncio.run(_read_stream(client.app, f"/events/stream?ticket={ticket}", chunks=3))
+    assert chunks[2].startswith("event: stream.expired\n")
+    assert events.get_broadcaster().subscriber_count == 0
+
+
+def test_database_relay_round_trip(tmp_path):
+    from app.db.database import Base, create_db_engine
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    Base.metadata.create_all(bind=engine)
+    relay = events.DatabaseRelay(engine, poll_interval=0.01)
+
+    relay.mark_listening()
+    relay.publish({"type": "alert.created", "active_alerts": 2})
+    rows = relay._fetch(after_id=0)
+    assert len(rows) == 1
+    row_id, origin, payload = rows[0]
+    assert origin == events.ORIGIN
+    assert json.loads(payload)["active_alerts"] == 2
+    assert relay._fetch(after_id=row_id) == []
+    engine.dispose()
+
+
+def test_database_relay_skips_the_event_log_without_listeners(tmp_path):
+    from app.db.database import Base, create_db_engine
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    Base.metadata.create_all(bind=engine)
+    relay = events.DatabaseRelay(engine, poll_interval=0.01)
+    other_worker = events.DatabaseRelay(engine, poll_interval=0.01)
+
+    relay.publish({"type": "alert.created", "active_alerts": 1})
+    assert relay._fetch(after_id=0) == []
+
+    other_worker.mark_listening()
+    relay.publish({"type": "alert.created", "active_alerts": 2})
+    assert [json.loads(payload)["active_alerts"] for _, _, payload in relay._fetch(after_id=0)] == [2]
+    engine.dispose()
@@ -0,0 +1,57 @@
+def sync(client, headers, since=0, limit=500):
+    res = client.get(f"/items/changes?since={since}&limit={limit}", headers=headers)
+    assert res.status_code == 200
+    return res.json()
+
+
+def test_change_feed_returns_upserts_and_deletes_in_order(client, admin_headers):
+    ids = [client.post("/items/", json={"title": t, "quantity": 20}, headers=admin_headers).json()["id"]
+           for t in ("Bolt", "Nut", "Washer")]
+    feed = sync(client, admin_headers)
+    assert [c["item_id"] for c in feed["changes"]] == ids
+    assert all(c["op"] == "upsert" for c in feed["changes"])
+    assert feed["has_more"] is False
+    since = feed["next_since"]
+
+    client.patch(f"/items/{ids[0]}/quantity", json={"quantity": 5}, headers=admin_headers)
+    client.delete(f"/items/{ids[1]}", headers=admin_headers)
+
+    feed = sync(client, admin_headers, since)
+    assert [(c["op"], c["item_id"]) for c in feed["changes"]] == [("upsert", ids[0]), ("delete", ids[1])]
+    assert feed["changes"][0]["item"]["quantity"] == 5
+    assert feed["changes"][1]["item"] is None
+
+    # Nothing new: the cursor stays put
+    assert sync(client, admin_headers, feed["next_since"]) == {
+        "changes": [], "next_since": feed["next_since"], "has_more": False
+    }
+
+
+def test_change_feed_batches(client, admin_headers, count_queries):
+    for i in range(5):
+        client.post("/items/", json={"title": f"Item {i}", "quantity": 20}, headers=admin_headers)
+    client.delete("/items/1", headers=admin_headers)
+
+    seen, since, has_more = [], 0, True
+    while has_more:
+        with count_queries() as queries:
+            feed = sync(client, admin_headers, since, limit=2)
+        assert queries.count == 3
+        assert len(feed["changes"]) <= 2
+        seen += [(c["op"], c["item_id"]) for c in feed["changes"]]
+        since, has_more = feed["next_since"], feed["has_more"]
+
+    assert seen == [("upsert", i) for i in range(2, 6)] + [("delete", 1)]
+
+
+def test_bulk_created_items_take_a_constant_number_of_statements(client, admin_headers, count_queries):
+    body = [{"title": f"Item {n}", "quantity": 20} for n in range(50)]
+    with count_queries() as queries:
+        res = client.post("/items/bulk", json=body, headers=admin_headers)
+    assert res.status_code == 200
+    # User lookup, sequence range, executemany insert, ids, audit entry and its refresh, items
+    assert queries.count == 7
+    created = res.json()
+    assert [item["title"] for item in created] == [f"Item {n}" for n in range(50)]
+    # In the change feed in the order they were sent
+    assert [c["item_id"] for c in sync(client, admin_headers)["changes"]] == [item["id"] for item in created]
@@ -0,0 +1,51 @@
+from app.db import models
+
+
+def seed(db):
+    db.add_all([
+        models.Item(title="Bolt", category="Hardware", price=2, quantity=0),
+        models.Item(title="Nut", category="Hardware", price=1, quantity=5),
+        models.Item(title="Drill", category="Tools", price=80, quantity=12),
+        models.Item(title="Saw", category="Tools", price=30, quantity=40),
+    ])
+    db.commit()
+
+
+def titles(client, headers, query):
+    res = client.get(f"/items/?{query}", headers=headers)
+    assert res.status_code == 200, res.text
+    return [item["title"] for item in res.json()["items"]]
+
+
+def test_filters_combine(client, db, admin_headers):
+    seed(db)
+    assert titles(client, admin_headers, "category=Tools&sort=title") == ["Drill", "Saw"]
+    assert titles(client, admin_headers, "min_price=2&max_price=30&sort=price") == ["Bolt", "Saw"]
+    assert titles(client, admin_headers, "min_quantity=5&max_quantity=12&sort=-quantity") == ["Drill", "Nut"]
+    assert titles(client, admin_headers, "stock_status=out_of_stock") == ["Bolt"]
+    assert titles(client, admin_headers, "stock_status=low_stock") == ["Nut"]
+    assert titles(client, admin_headers, "stock_status=in_stock&category=Tools&sort=-price") == ["Drill", "Saw"]
+
+
+def test_sort_keys_are_whitelisted(client, db, admin_headers):
+    seed(db)
+    res = client.get("/items/?sort=hashed_password", headers=admin_headers)
+    assert res.status_code == 400
+    assert client.get("/items/?stock_status=lots", headers=admin_headers).status_code == 422
+
+
+def test_facets_are_cached_until_an_item_changes(client, db, admin_headers, count_queries):
+    seed(db)
+    res = client.get("/items/facets", headers=admin_headers)
+    assert res.json() == {
+        "total": 4,
+        "categories": {"Hardware": 2, "Tools": 2},
+        "stock_status": {"in_stock": 2, "low_stock": 1, "out_of_stock": 1},
+    }
+    with count_queries() as queries:
+        client.get("/items/facets", headers=admin_headers)
+    assert not any("GROUP BY" in statement for statement in queries.statements)
+
+    client.patch("/items/2/quantity", json={"delta": -5}, headers=admin_headers)
+    facets = client.get("/items/facets", headers=admin_headers).json()
+    assert facets["stock_status"] == {"in_stock": 2, "low_stock": 0, "out_of_stock": 2}
@@ -0,0 +1,73 @@
+import pytest
+from app.core import crud
+from app.db import models
+from app.schemas.item import ItemUpdate
+
+
+def create_item(client, headers, quantity=10):
+    return client.post("/items/", json={"title": "Bolt", "quantity": quantity}, headers=headers).json()
+
+
+def test_delta_updates_are_relative_and_never_negative(client, manager_headers, admin_headers):
+    item = create_item(client, admin_headers)
+    res = client.patch(f"/items/{item['id']}/quantity", json={"delta": -3}, headers=manager_headers)
+    assert res.status_code == 200
+    assert res.json()["quantity"] == 7
+    assert res.json()["version"] == item["version"] + 1
+    assert res.headers["ETag"] == f'"{item["version"] + 1}"'
+
+    res = client.patch(f"/items/{item['id']}/quantity", json={"delta": -8}, headers=manager_headers)
+    assert res.status_code == 409
+    assert client.get(f"/items/{item['id']}", headers=admin_headers).json()["quantity"] == 7
+
+    assert client.patch("/items/999/quantity", json={"delta": 1}, headers=manager_headers).status_code == 404
+    assert client.patch(f"/items/{item['id']}/quantity", json={"quantity": 1, "delta": 1},
+                        headers=manager_headers).status_code == 422
+
+
+def test_selling_out_does_not_reload_the_item_per_step(client, manager_headers, admin_headers, count_queries):
+    item = create_item(client, admin_headers, quantity=2)
+    with count_queries() as queries:
+        res = client.patch(f"/items/{item['id']}/quantity", json={"delta": -2}, headers=manager_headers)
+    assert res.status_code == 200
+    assert res.json()["quantity"] == 0
+    item_loads = [s for s in queries.statements if s.startswith("SELECT items.id, items.title")]
+    # Once for the response; alerting and the audit entry reuse what the UPDATE returned
+    assert len(item_loads) == 1
+    alerts = client.get("/alerts/", headers=admin_headers).json()["items"]
+    assert alerts[0]["alert_type"] == "out_of_stock"
+
+
+def test_put_rejects_a_null_quantity(client, admin_headers):
+    item = create_item(client, admin_headers)
+    assert client.put(f"/items/{item['id']}", json={"quantity": None}, headers=admin_headers).status_code == 422
+    assert client.put(f"/items/{item['id']}", json={"price": 5}, headers=admin_headers).status_code == 200
+
+
+def test_put_with_stale_if_match_is_rejected(client, admin_headers):
+    item = create_item(client, admin_headers)
+    etag = client.get(f"/items/{item['id']}", headers=admin_headers).headers["ETag"]
+
+    res = client.put(f"/items/{item['id']}", json={"price": 5}, headers={**admin_headers, "If-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+    res = client.put(f"/items/{item['id']}", json={"price": 6}, headers={**admin_headers, "If-Match": etag})
+    assert res.status_code == 412
+    assert client.get(f"/items/{item['id']}", headers=admin_headers).json()["price"] == 5
+
+    res = client.put(f"/items/{item['id']}", json={"quantity": -1}, headers=admin_headers)
+    assert res.status_code == 409
+
+
+def test_orm_update_detects_concurrent_write(db):
+    item = models.Item(title="Nut", quantity=5)
+    db.add(item)
+    db.commit()
+    # Another writer bumps the version between our read and our write
+    db.execute(models.Item.__table__.update().values(version=models.Item.version + 1))
+    with pytest.raises(crud.VersionMismatchError):
+        crud.update_item(db, item.id, 1, ItemUpdate(price=3), expected_version=1)
+    db.rollback()
+    # Without If-Match the update is retried against the fresh row
+    assert crud.update_item(db, item.id, 1, ItemUpdate(price=3)).price == 3
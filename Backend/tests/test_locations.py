@@ -0,0 +1,110 @@
+from app.db import models
+
+
+def setup_stock(client, db, admin_headers, quantity=10):
+    item = client.post("/items/", json={"title": "Bolt", "quantity": quantity, "price": 2}, headers=admin_headers).json()
+    east = client.post("/locations/", json={"code": "EAST", "name": "East warehouse"}, headers=admin_headers).json()
+    west = client.post("/locations/", json={"code": "WEST", "name": "West warehouse"}, headers=admin_headers).json()
+    return item, east, west
+
+
+def stock(client, item, headers):
+    return client.get(f"/items/{item['id']}/stock", headers=headers).json()
+
+
+def test_location_changes_keep_the_total_in_sync(client, db, admin_headers, manager_headers):
+    item, east, west = setup_stock(client, db, admin_headers)
+    res = client.patch(f"/items/{item['id']}/stock/{east['id']}", json={"delta": 5}, headers=manager_headers)
+    assert res.status_code == 200
+    assert res.json()["total"] == 15
+    assert res.json()["unassigned"] == 10
+    assert res.json()["locations"] == [{"location_id": east["id"], "code": "EAST", "name": "East warehouse", "quantity": 5}]
+
+    # Setting an absolute level moves the total by the difference
+    res = client.patch(f"/items/{item['id']}/stock/{east['id']}", json={"quantity": 2}, headers=manager_headers)
+    assert (res.json()["total"], res.json()["locations"][0]["quantity"]) == (12, 2)
+    item_row = client.get(f"/items/{item['id']}", headers=admin_headers).json()
+    assert item_row["quantity"] == 12
+    assert item_row["version"] == item["version"] + 2
+
+    # A location never goes negative, and nothing changes when it would
+    res = client.patch(f"/items/{item['id']}/stock/{west['id']}", json={"delta": -1}, headers=manager_headers)
+    assert res.status_code == 409
+    assert stock(client, item, admin_headers)["total"] == 12
+    assert client.patch(f"/items/{item['id']}/stock/999", json={"delta": 1}, headers=manager_headers).status_code == 404
+
+
+def test_transfers_move_stock_without_changing_the_total(client, db, admin_headers, manager_headers):
+    item, east, west = setup_stock(client, db, admin_headers)
+    # From the unassigned stock into a location...
+    res = client.post(f"/items/{item['id']}/transfers", json={"to_location_id": east["id"], "quantity": 6},
+                      headers=manager_headers)
+    assert res.status_code == 200
+    assert (res.json()["total"], res.json()["unassigned"]) == (10, 4)
+    # ...and between locations
+    res = client.post(f"/items/{item['id']}/transfers",
+                      json={"from_location_id": east["id"], "to_location_id": west["id"], "quantity": 4},
+                      headers=manager_headers)
+    assert [(row["code"], row["quantity"]) for row in res.json()["locations"]] == [("EAST", 2), ("WEST", 4)]
+
+    for transfer in ({"from_location_id": east["id"], "to_location_id": west["id"], "quantity": 3},
+                     {"to_location_id": west["id"], "quantity": 5}):
+        res = client.post(f"/items/{item['id']}/transfers", json=transfer, headers=manager_headers)
+        assert res.status_code == 409
+    assert client.post(f"/items/{item['id']}/transfers", json={"to_location_id": 999, "quantity": 1},
+                       headers=manager_headers).status_code == 404
+    assert client.post(f"/items/{item['id']}/transfers", json={"quantity": 1},
+                       headers=manager_headers).status_code == 422
+
+    logs = db.query(models.AuditLog).filter(models.AuditLog.action == "TRANSFER").all()
+    assert [log.details for log in logs] == ["Transferred 6 from unassigned to EAST", "Transferred 4 from EAST to WEST"]
+
+
+def test_item_level_writes_cannot_take_assigned_stock(client, db, admin_headers, manager_headers):
+    item, east, _ = setup_stock(client, db, admin_headers)
+    client.post(f"/items/{item['id']}/transfers", json={"to_location_id": east["id"], "quantity": 8},
+                headers=manager_headers)
+
+    assert client.patch(f"/items/{item['id']}/quantity", json={"delta": -3}, headers=manager_headers).status_code == 409
+    assert client.patch(f"/items/{item['id']}/quantity", json={"quantity": 7}, headers=manager_headers).status_code == 409
+    assert client.put(f"/items/{item['id']}", json={"quantity": 7}, headers=admin_headers).status_code == 409
+    res = client.patch(f"/items/{item['id']}/quantity", json={"delta": -2}, headers=manager_headers)
+    assert res.json()["quantity"] == 8
+    assert stock(client, item, admin_headers)["unassigned"] == 0
+
+
+def test_summary_groups_stock_per_location(client, db, admin_headers, manager_headers, count_queries):
+    item, east, west = setup_stock(client, db, admin_headers)
+    other = client.post("/items/", json={"title": "Nut", "quantity": 5, "price": 1}, headers=admin_headers).json()
+    client.post(f"/items/{item['id']}/transfers", json={"to_location_id": east["id"], "quantity": 6},
+                headers=manager_headers)
+    client.patch(f"/items/{other['id']}/stock/{east['id']}", json={"delta": 3}, headers=manager_headers)
+
+    with count_queries() as queries:
+        summary = client.get("/locations/summary", headers=admin_headers).json()
+    assert queries.count == 3
+    assert summary["locations"] == [
+        {"location_id": east["id"], "code": "EAST", "name": "East warehouse",
+         "item_count": 2, "total_quantity": 9, "total_value": 15.0},
+        {"location_id": west["id"], "code": "WEST", "name": "West warehouse",
+         "item_count": 0, "total_quantity": 0, "total_value": 0.0},
+    ]
+    assert summary["unassigned"] == {"item_count": 2, "total_quantity": 9, "total_value": 13.0}
+
+    dashboard = client.get("/dashboard/stats?by_location=true", headers=admin_headers).json()
+    assert dashboard["locations"] == summary
+    assert "locations" not in client.get("/dashboard/stats", headers=admin_headers).json()
+
+
+def test_deleting_an_item_removes_its_stock_rows(client, db, admin_headers, manager_headers):
+    item, east, _ = setup_stock(client, db, admin_headers)
+    client.patch(f"/items/{item['id']}/stock/{east['id']}", json={"delta": 1}, headers=manager_headers)
+    assert client.delete(f"/items/{item['id']}", headers=admin_headers).status_code == 204
+    assert db.query(models.ItemStock).count() == 0
+
+
+def test_locations_are_created_by_admins_with_unique_codes(client, admin_headers, manager_headers):
+    assert client.post("/locations/", json={"code": "A", "name": "A"}, headers=manager_headers).status_code == 403
+    assert client.post("/locations/", json={"code": "A", "name": "A"}, headers=admin_headers).status_code == 201
+    assert client.post("/locations/", json={"code": "A", "name": "B"}, headers=admin_headers).status_code == 409
+    assert [loc["code"] for loc in client.get("/locations/", headers=manager_headers).json()] == ["A"]
@@ -0,0 +1,54 @@
+import re
+from app.core.metrics import registry
+
+
+def _value(body, line_prefix):
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", body, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_records_routes_and_sql(client, admin_headers):
+    registry.reset()
+    client.post("/items/", json={"title": "Widget", "quantity": 5}, headers=admin_headers)
+    client.get("/items/", headers=admin_headers)
+    client.get("/items/", headers=admin_headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+
+    # Labelled by route template, not by the concrete URL
+    assert _value(body, 'http_requests_total{method="GET",route="/items/",status="200"}') == 2
+    assert _value(body, 'http_request_duration_seconds_count{method="GET",route="/items/"}') == 2
+    # user lookup + COUNT + page query per list request
+    assert _value(body, 'db_statements_total{method="GET",route="/items/"}') == 6
+    assert _value(body, 'db_statement_seconds_total{method="GET",route="/items/"}') > 0
+    # The scrape itself is in flight while rendering
+    assert _value(body, "http_requests_in_progress") == 1
+
+
+def test_unmatched_routes_share_one_label(client):
+    registry.reset()
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    body = client.get("/metrics").text
+    assert _value(body, 'http_requests_total{method="GET",route="unmatched",status="404"}') == 2
+
+
+def test_metrics_dir_merges_worker_snapshots(tmp_path):
+    import json
+    from app.core import metrics
+    registry.reset()
+    other_worker = registry.snapshot()
+    other_worker.update({
+        "pid": 2 ** 22 + 1,  # not a running process
+        "requests_total": [[["GET", "/alerts/", "200"], 3]],
+        "in_progress": 4,
+    })
+    (tmp_path / "other.json").write_text(json.dumps(other_worker))
+
+    body = metrics.render(str(tmp_path))
+    assert _value(body, 'http_requests_total{method="GET",route="/alerts/",status="200"}') == 3
+    # Gauges from exited workers are dropped, counters are kept
+    assert _value(body, "http_requests_in_progress") == 0
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from sqlalchemy import create_engine, inspect, text
+from app.db import models
+from app.db.migrate import migrate
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_migrate_upgrades_older_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # items as it looked before the category column existed
+        conn.execute(text(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, title VARCHAR, description VARCHAR, "
+            "quantity INTEGER, price INTEGER, last_updated DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO items (title, quantity, price) VALUES ('Old', 1, 2)"))
+
+    migrate(bind=engine)
+
+    inspector = inspect(engine)
+    assert "category" in {c["name"] for c in inspector.get_columns("items")}
+    assert "ix_items_category" in {i["name"] for i in inspector.get_indexes("items")}
+    assert inspector.has_table("audit_logs")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT title FROM items")).scalar() == "Old"
+        # Existing rows join the change feed and new writes are numbered after them
+        assert conn.execute(text("SELECT change_seq FROM items")).scalar() == 1
+        assert conn.execute(text("SELECT value FROM change_sequences WHERE name = 'items'")).scalar() == 1
+        # Today's snapshot, so historical reports have data from the first day
+        assert conn.execute(
+            text("SELECT total_quantity FROM inventory_snapshots WHERE category = :all"),
+            {"all": models.InventorySnapshot.ALL_CATEGORIES},
+        ).scalar() == 1
+    engine.dispose()
+
+
+def test_migrate_converts_audit_log_strings_to_codes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE audit_logs (id INTEGER PRIMARY KEY, action VARCHAR, entity_type VARCHAR, "
+            "entity_id INTEGER, user_id INTEGER, timestamp DATETIME, details VARCHAR)"
+        ))
+        conn.execute(text("CREATE INDEX ix_audit_logs_action ON audit_logs (action)"))
+        conn.execute(text(
+            "INSERT INTO audit_logs (action, entity_type, entity_id, user_id, details) "
+            "VALUES ('UPDATE', 'ITEM', 3, 1, 'Updated quantity to 4'), ('UPDATE_ROLE', 'USER', 2, 1, NULL)"
+        ))
+
+    migrate(bind=engine)
+    # A second run finds nothing to convert
+    migrate(bind=engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT action, entity_type, details FROM audit_logs ORDER BY id")).all() == [
+            (2, 1, "Updated quantity to 4"), (6, 2, None)
+        ]
+    assert "data" in {c["name"] for c in inspect(engine).get_columns("audit_logs")}
+    engine.dispose()
+
+
+def test_app_startup_has_no_schema_side_effects(tmp_path):
+    db_path = tmp_path / "untouched.db"
+    script = (
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app):\n"
+        "    pass\n"
+    )
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, cwd=BACKEND_DIR)
+    assert not db_path.exists()
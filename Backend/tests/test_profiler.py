@@ -0,0 +1,84 @@
+import asyncio
+import time
+import pytest
+from app.core import crud, profiler
+from app.core.config import get_settings
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_interval_ms", 1.0)
+    return tmp_path
+
+
+@pytest.fixture
+def slow_items(monkeypatch):
+    get_items = crud.get_items
+
+    def slow_get_items(*args, **kwargs):
+        time.sleep(0.05)
+        return get_items(*args, **kwargs)
+
+    monkeypatch.setattr(crud, "get_items", slow_get_items)
+
+
+def test_admin_gets_a_profile_of_the_handler(client, admin_headers, profile_dir, slow_items):
+    res = client.get("/items/", headers={**admin_headers, "X-Profile": "1"})
+    assert res.status_code == 200
+    profile_id = res.headers["X-Profile-Id"]
+
+    report = client.get(f"/profiles/{profile_id}", headers=admin_headers).json()
+    assert report["id"] == profile_id
+    assert (report["method"], report["route"], report["status"]) == ("GET", "/items/", 200)
+    assert report["samples"] > 0
+    # Every sampled stack starts at the endpoint
+    assert all(stack.startswith("read_items (app/routers/items.py:") for stack in report["stacks"])
+    slow = next(f for f in report["functions"] if f["function"].startswith("slow_get_items"))
+    assert slow["self"] > 0
+    # User lookup, count and page
+    assert report["sql"]["statements"] == 3
+    assert all(entry["duration_ms"] >= 0 for entry in report["sql"]["log"])
+
+    assert client.get("/profiles/", headers=admin_headers).json() == [profile_id]
+
+
+def test_query_flag_also_profiles(client, admin_headers, profile_dir):
+    res = client.get("/items/?profile=1", headers=admin_headers)
+    assert "X-Profile-Id" in res.headers
+
+
+def test_report_is_written_off_the_event_loop(client, admin_headers, profile_dir, monkeypatch):
+    save_report = profiler.save_report
+    loops = []
+
+    def recording_save_report(report):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return save_report(report)
+
+    monkeypatch.setattr(profiler, "save_report", recording_save_report)
+    assert "X-Profile-Id" in client.get("/items/", headers={**admin_headers, "X-Profile": "1"}).headers
+    assert loops == [None]
+
+
+def test_only_flagged_admin_requests_are_profiled(client, admin_headers, user_headers, profile_dir):
+    assert "X-Profile-Id" not in client.get("/items/", headers=admin_headers).headers
+    assert "X-Profile-Id" not in client.get("/items/", headers={**admin_headers, "X-Profile": "0"}).headers
+    assert "X-Profile-Id" not in client.get("/items/", headers={**user_headers, "X-Profile": "1"}).headers
+    assert not list(profile_dir.iterdir())
+
+    assert client.get("/profiles/", headers=user_headers).status_code == 403
+    assert client.get("/profiles/../../etc/passwd", headers=admin_headers).status_code == 404
+    assert client.get("/profiles/20250101T000000000000-deadbeef", headers=admin_headers).status_code == 404
+
+
+def test_old_profiles_are_pruned(client, admin_headers, profile_dir, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profile_keep", 2)
+    ids = [client.get("/items/", headers={**admin_headers, "X-Profile": "1"}).headers["X-Profile-Id"]
+           for _ in range(3)]
+    assert len(list(profile_dir.glob("*.json"))) == 2
+    assert client.get("/profiles/", headers=admin_headers).json() == [ids[2], ids[1]]
@@ -0,0 +1,52 @@
+from app.core import query_budget
+from app.core.metrics import RequestStats
+from app.core.query_budget import normalise, repeated_statements
+from app.db import models
+
+
+def test_normalise_collapses_parameter_lists():
+    a = "SELECT * FROM items WHERE id IN (?, ?, ?)"
+    b = "SELECT *\n  FROM items WHERE id IN (?)"
+    assert normalise(a) == normalise(b)
+
+
+def test_repeated_statements_detects_loops():
+    statements = ["SELECT * FROM users WHERE id = ?"] * 6 + ["SELECT count(*) FROM alerts"]
+    assert repeated_statements(statements, threshold=5) == [("SELECT * FROM users WHERE id = ?", 6)]
+
+
+def test_alert_list_has_no_n_plus_one(client, db, admin_headers, count_queries):
+    admin = db.query(models.User).first()
+    for i in range(8):
+        item = models.Item(title=f"Item {i}", quantity=0)
+        db.add(item)
+        db.flush()
+        db.add(models.Alert(item_id=item.id, alert_type=models.AlertType.OUT_OF_STOCK,
+                            message="out", created_by=admin.id, resolved_by=admin.id))
+    db.commit()
+
+    with count_queries() as queries:
+        response = client.get("/alerts/", headers=admin_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 8
+    assert body["items"][0]["item_title"].startswith("Item")
+    assert body["items"][0]["created_by_email"] == "admin@test.com"
+    # user lookup + COUNT + one joined page query, however many alerts there are
+    assert queries.count == 3
+    assert not queries.repeated()
+
+
+def test_budget_violation_is_recorded():
+    stats = RequestStats("GET")
+    stats.statements, stats.query_budget = 5, 3
+    stats.statement_log = ["SELECT 1"] * 5
+
+    query_budget.QueryBudgetMiddleware(app=None).check(stats, {})
+
+    assert len(query_budget.violations) == 1
+    violation = query_budget.violations[0]
+    assert violation.budget == 3 and violation.statements == 5
+    assert "budget 3" in str(violation)
+    assert "repeated 5x: SELECT 1" in str(violation)
+    query_budget.violations.clear()
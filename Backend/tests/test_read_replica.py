@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from fastapi.testclient import TestClient
+from app.main import app
+from app import dependencies
+from app.core import crud, security
+from app.db.routing import client_key, sticky_writes
+from app.db import models
+from app.db.database import Base, create_db_engine, create_replica_sessionmaker
+from app.core.shared_state import MemoryState, set_shared_state
+
+
+@pytest.fixture
+def replica_client(tmp_path, monkeypatch):
+    # Two SQLite files stand in for the primary and the replica.
+    primary_engine = create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica_engine = create_db_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=primary_engine)
+    Base.metadata.create_all(bind=replica_engine)
+    PrimarySession = sessionmaker(autocommit=False, autoflush=False, bind=primary_engine)
+    ReplicaSession = create_replica_sessionmaker(replica_engine)
+
+    for Session in (PrimarySession, sessionmaker(bind=replica_engine)):
+        session = Session()
+        session.add(models.User(
+            email="admin@test.com",
+            hashed_password=security.get_password_hash("password"),
+            role=models.Role.ADMIN
+        ))
+        session.commit()
+        session.close()
+
+    monkeypatch.setattr(dependencies, "SessionLocal", PrimarySession)
+    monkeypatch.setattr(dependencies, "ReplicaSessionLocal", ReplicaSession)
+    set_shared_state(MemoryState())
+    token = security.create_access_token(data={"sub": "admin@test.com", "role": "admin"})
+    with TestClient(app) as c:
+        yield c, {"Authorization": f"Bearer {token}"}, PrimarySession
+    set_shared_state(None)
+    primary_engine.dispose()
+    replica_engine.dispose()
+
+
+def test_reads_go_to_replica(replica_client):
+    client, headers, PrimarySession = replica_client
+    session = PrimarySession()
+    session.add(models.Item(title="Primary only", quantity=1))
+    session.commit()
+    session.close()
+
+    # The replica has not caught up, so a GET sees no items
+    response = client.get("/items/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+
+
+def test_read_your_writes_after_write(replica_client):
+    client, headers, _ = replica_client
+    response = client.post("/items/", json={"title": "Fresh", "quantity": 3}, headers=headers)
+    assert response.status_code == 200
+
+    # The writer is pinned to the primary for the stickiness window
+    response = client.get("/items/", headers=headers)
+    assert response.json()["total"] == 1
+
+
+def test_writer_is_sticky_before_the_response_is_sent(replica_client, monkeypatch):
+    client, headers, _ = replica_client
+    key = client_key(Request({"type": "http", "headers": [(b"authorization", headers["Authorization"].encode())]}))
+    create_item = crud.create_item
+    seen = []
+
+    def create_item_and_check(*args, **kwargs):
+        # Still inside the request: the response has not started yet
+        seen.append(sticky_writes.is_sticky(key))
+        return create_item(*args, **kwargs)
+
+    monkeypatch.setattr(crud, "create_item", create_item_and_check)
+    response = client.post("/items/", json={"title": "Fresh", "quantity": 3}, headers=headers)
+    assert response.status_code == 200
+    assert seen == [True]
+
+
+def test_writes_are_marked_once_and_only_with_a_replica(replica_client, monkeypatch):
+    client, headers, _ = replica_client
+    marks = []
+    monkeypatch.setattr(sticky_writes, "mark", marks.append)
+    client.post("/items/", json={"title": "Fresh", "quantity": 3}, headers=headers)
+    assert len(marks) == 1
+
+    # Without a replica every read is on the primary anyway
+    monkeypatch.setattr(dependencies, "ReplicaSessionLocal", dependencies.SessionLocal)
+    client.post("/items/", json={"title": "Fresh", "quantity": 3}, headers=headers)
+    assert len(marks) == 1
+
+
+def test_replica_session_rejects_writes(replica_client):
+    session = dependencies.ReplicaSessionLocal()
+    session.add(models.Item(title="Nope"))
+    with pytest.raises(RuntimeError):
+        session.flush()
+    session.close()
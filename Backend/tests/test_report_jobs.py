@@ -0,0 +1,164 @@
+import csv
+import gzip
+import io
+import os
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.core import report_jobs, snapshots
+from app.core.report_jobs import ReportJobQueue
+from app.db import models
+
+
+@pytest.fixture
+def jobs(db, tmp_path):
+    """Runs report jobs on a real worker thread; ``jobs.drain()`` waits for the queued ones."""
+    class Jobs:
+        def start(self):
+            self.queue = ReportJobQueue(sessionmaker(bind=db.get_bind()), tmp_path, workers=1)
+            report_jobs.set_report_queue(self.queue)
+
+        def drain(self):
+            self.queue.shutdown()
+            self.start()
+
+    jobs = Jobs()
+    jobs.start()
+    yield jobs
+    jobs.queue.shutdown()
+    report_jobs.set_report_queue(None)
+
+
+def add_items(db):
+    db.add_all([
+        models.Item(title="Bolt", category="Hardware", quantity=5, price=2),
+        models.Item(title="Glue", category="Adhesives", quantity=3, price=10),
+    ])
+    db.commit()
+
+
+def test_job_computes_and_stores_a_compressed_artifact(client, db, admin_headers, jobs):
+    add_items(db)
+    res = client.post("/reports/jobs", json={}, headers=admin_headers)
+    assert res.status_code == 202
+    job = res.json()
+    assert job["status"] == "queued"
+    assert res.headers["location"] == f"/reports/jobs/{job['id']}"
+
+    jobs.drain()
+    job = client.get(f"/reports/jobs/{job['id']}", headers=admin_headers).json()
+    assert job["status"] == "done"
+    assert job["artifact_size"] > 0
+    path = db.get(models.ReportJob, job["id"]).artifact_path
+    assert path.endswith(".json.gz")
+    with gzip.open(path) as artifact:
+        assert b'"total_inventory_value":40.0' in artifact.read()
+
+    # Sent as stored to clients that accept gzip...
+    res = client.get(f"/reports/jobs/{job['id']}/download", headers=admin_headers)
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["content-disposition"].startswith('attachment; filename="report-')
+    report = res.json()
+    assert report["stats"] == {"total_items": 8, "total_inventory_value": 40.0, "low_stock_count": 2}
+
+    # ...and decompressed for the others
+    res = client.get(f"/reports/jobs/{job['id']}/download", headers={**admin_headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in res.headers
+    assert res.json() == report
+
+
+def test_csv_artifact(client, db, admin_headers, jobs):
+    add_items(db)
+    job = client.post("/reports/jobs", json={"format": "csv"}, headers=admin_headers).json()
+    jobs.drain()
+    res = client.get(f"/reports/jobs/{job['id']}/download", headers=admin_headers)
+    assert res.headers["content-type"].startswith("text/csv")
+    assert list(csv.reader(io.StringIO(res.text))) == [
+        ["category", "item_count", "value"],
+        ["Adhesives", "3", "30.0"],
+        ["Hardware", "5", "10.0"],
+        ["Total", "8", "40.0"],
+    ]
+
+
+def test_identical_jobs_in_flight_are_deduplicated(client, db, admin_headers, jobs):
+    now = datetime.utcnow()
+    queued = models.ReportJob(job_key=report_jobs.job_key(now.year, now.month, "json"),
+                              year=now.year, month=now.month, format="json")
+    db.add(queued)
+    db.commit()
+
+    res = client.post("/reports/jobs", json={"year": now.year, "month": now.month}, headers=admin_headers)
+    assert res.status_code == 202
+    assert res.json()["id"] == queued.id
+    # A different format is a different job
+    assert client.post("/reports/jobs", json={"format": "csv"}, headers=admin_headers).json()["id"] != queued.id
+    jobs.drain()
+
+    # A job stuck for longer than the timeout is given up on
+    queued.created_at = now - timedelta(hours=1)
+    db.commit()
+    res = client.post("/reports/jobs", json={}, headers=admin_headers)
+    assert res.json()["id"] != queued.id
+    jobs.drain()
+    db.refresh(queued)
+    assert queued.status == models.ReportJobStatus.FAILED
+
+
+def test_racing_submissions_share_one_job(db, jobs, monkeypatch):
+    now = datetime.utcnow()
+    other = models.ReportJob(job_key=report_jobs.job_key(now.year, now.month, "json"),
+                             year=now.year, month=now.month, format="json")
+    db.add(other)
+    db.commit()
+
+    # The first lookup misses the job, as if it was queued right after it
+    lookup = jobs.queue._reusable_job
+    lookups = []
+
+    def racing_lookup(*args):
+        lookups.append(args)
+        return lookup(*args) if len(lookups) > 1 else None
+
+    monkeypatch.setattr(jobs.queue, "_reusable_job", racing_lookup)
+    job, created = jobs.queue.submit(db, now.year, now.month, "json")
+    assert (job.id, created) == (other.id, False)
+    assert db.query(models.ReportJob).count() == 1
+
+
+def test_closed_month_artifacts_are_reused(client, db, admin_headers, jobs):
+    add_items(db)
+    snapshots.take_snapshot(db, date(2025, 1, 31))
+    first = client.post("/reports/jobs", json={"year": 2025, "month": 1}, headers=admin_headers).json()
+    jobs.drain()
+
+    res = client.post("/reports/jobs", json={"year": 2025, "month": 1}, headers=admin_headers)
+    assert res.status_code == 200
+    assert res.json()["id"] == first["id"]
+    assert res.json()["status"] == "done"
+
+    # Once the file is gone the report is computed again
+    os.remove(db.get(models.ReportJob, first["id"]).artifact_path)
+    res = client.get(f"/reports/jobs/{first['id']}/download", headers=admin_headers)
+    assert res.status_code == 410
+    res = client.post("/reports/jobs", json={"year": 2025, "month": 1}, headers=admin_headers)
+    assert res.status_code == 202
+    assert res.json()["id"] != first["id"]
+    jobs.drain()
+
+
+def test_failed_job_records_the_error(client, db, admin_headers, jobs):
+    job = client.post("/reports/jobs", json={"year": 2024, "month": 3}, headers=admin_headers).json()
+    jobs.drain()
+
+    job = client.get(f"/reports/jobs/{job['id']}", headers=admin_headers).json()
+    assert job["status"] == "failed"
+    assert job["error"] == "No inventory snapshot was taken in 2024-03"
+    res = client.get(f"/reports/jobs/{job['id']}/download", headers=admin_headers)
+    assert res.status_code == 409
+
+
+def test_report_jobs_are_admin_only(client, manager_headers, jobs):
+    assert client.post("/reports/jobs", json={}, headers=manager_headers).status_code == 403
+    assert client.get("/reports/jobs/1", headers=manager_headers).status_code == 403
@@ -0,0 +1,85 @@
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from app.core import snapshots
+from app.db import models
+
+
+def add_items(db, *items):
+    db.add_all([models.Item(title=title, category=category, quantity=quantity, price=price)
+                for title, category, quantity, price in items])
+    db.commit()
+
+
+def test_current_month_is_rolled_up_live(client, db, admin_headers, count_queries):
+    add_items(db, ("Bolt", "Hardware", 5, 2), ("Nut", "Hardware", 20, 1), ("Glue", "", 3, 10))
+    with count_queries() as queries:
+        res = client.get("/reports/monthly", headers=admin_headers)
+    assert res.status_code == 200
+    assert queries.count == 4
+    report = res.json()
+    assert report["stats"] == {"total_items": 28, "total_inventory_value": 60.0, "low_stock_count": 2}
+    assert report["stats_as_of"] == datetime.utcnow().date().isoformat()
+    assert report["category_breakdown"] == [
+        {"category": "Hardware", "item_count": 25, "value": 30.0},
+        {"category": "Uncategorized", "item_count": 3, "value": 30.0},
+    ]
+    assert report["trend"] is None
+
+
+def test_past_months_read_their_closing_snapshot(client, db, admin_headers):
+    add_items(db, ("Bolt", "Hardware", 10, 2))
+    snapshots.take_snapshot(db, date(2025, 1, 10))
+    db.query(models.Item).update({"quantity": 50})
+    db.commit()
+    snapshots.take_snapshot(db, date(2025, 1, 31))
+    # Re-running a day replaces its rows
+    assert snapshots.take_snapshot(db, date(2025, 1, 31)) == 2
+    db.query(models.Item).update({"quantity": 40})
+    db.commit()
+    snapshots.take_snapshot(db, date(2025, 2, 28))
+    # Live stock moves on; February's report must not
+    db.query(models.Item).update({"quantity": 1})
+    db.commit()
+
+    report = client.get("/reports/monthly?month=2&year=2025", headers=admin_headers).json()
+    assert report["stats_as_of"] == "2025-02-28"
+    assert report["stats"]["total_items"] == 40
+    assert report["trend"]["previous_total_inventory_value"] == 100.0
+    assert report["trend"]["total_inventory_value_change"] == -20.0
+    assert report["trend"]["total_inventory_value_change_pct"] == -20.0
+
+    res = client.get("/reports/monthly?month=3&year=2024", headers=admin_headers)
+    assert res.status_code == 404
+
+
+def test_monthly_report_rejects_out_of_range_dates(client, admin_headers):
+    for query in ("month=13", "month=0", "year=0", "year=10000&month=1"):
+        assert client.get(f"/reports/monthly?{query}", headers=admin_headers).status_code == 422
+
+
+def test_trend_lists_closing_totals_per_month(client, db, admin_headers):
+    add_items(db, ("Bolt", "Hardware", 10, 2))
+    snapshots.take_snapshot(db)
+    res = client.get("/reports/trend?months=3", headers=admin_headers)
+    assert res.status_code == 200
+    assert [(m["total_items"], m["total_inventory_value"]) for m in res.json()] == [(10, 20.0)]
+
+
+def test_daily_snapshot_schedule(db, monkeypatch):
+    assert snapshots.next_run(datetime(2026, 3, 1, 12, 0), "23:50") == datetime(2026, 3, 1, 23, 50)
+    assert snapshots.next_run(datetime(2026, 3, 31, 23, 55), "23:50") == datetime(2026, 4, 1, 23, 50)
+
+    add_items(db, ("Bolt", "Hardware", 10, 2))
+    # Due right away, then not again during the test
+    runs = iter([0, 3600])
+    monkeypatch.setattr(snapshots, "next_run", lambda now, at: now + timedelta(seconds=next(runs, 3600)))
+    scheduler = snapshots.SnapshotScheduler("23:50", session_factory=sessionmaker(bind=db.get_bind()))
+    scheduler.start()
+    deadline = time.time() + 5
+    while not db.query(models.InventorySnapshot).count() and time.time() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    scheduler.join()
+    as_of, rollup = snapshots.month_end_rollup(db, *datetime.utcnow().timetuple()[:2])
+    assert rollup[snapshots.ALL_CATEGORIES]["total_quantity"] == 10
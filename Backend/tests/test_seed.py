@@ -0,0 +1,99 @@
+from collections import Counter
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app.core.crud import ACTIVITY_RETENTION
+from app.db import models
+from app.db.migrate import migrate
+from app.db.seed import seed
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def _seeded(path, **volumes):
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"email": f"user{n}@example.com", "hashed_password": "x", "role": models.Role.VIEWER} for n in range(5)
+        ])
+    inserted = seed(engine, now=NOW, days=90, chunk_size=500, **volumes)
+    return engine, inserted
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    engine, inserted = _seeded(tmp_path / "seed.db", items=2000, audit_logs=5000, alerts=300)
+    yield engine, inserted
+    engine.dispose()
+
+
+def test_same_seed_gives_same_rows(tmp_path, seeded):
+    engine, _ = seeded
+    other, _ = _seeded(tmp_path / "other.db", items=2000, audit_logs=5000, alerts=300)
+    for table in ("items", "audit_logs", "alerts"):
+        query = text(f"SELECT * FROM {table} ORDER BY id")
+        with engine.connect() as a, other.connect() as b:
+            assert a.execute(query).all() == b.execute(query).all()
+    other.dispose()
+
+
+def test_volumes_progress_and_distributions(tmp_path):
+    reported = []
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    migrate(bind=engine)
+    inserted = seed(engine, items=2000, audit_logs=5000, now=NOW, chunk_size=1500,
+                    progress=lambda table, done, total: reported.append((table, done)))
+    assert inserted == {"items": 2000, "audit_logs": 5000, "alerts": 0}
+    assert [done for table, done in reported if table == "items"] == [0, 1500, 2000]
+
+    with engine.connect() as conn:
+        quantities = [q for (q,) in conn.execute(text("SELECT quantity FROM items"))]
+        categories = Counter(c for (c,) in conn.execute(text("SELECT category FROM items")))
+        activity = Counter(i for (i,) in conn.execute(text("SELECT entity_id FROM audit_logs WHERE entity_type = 1")))
+    assert 0.03 < quantities.count(0) / len(quantities) < 0.07
+    assert categories.most_common(1)[0][0] == "Electronics"
+    # Skewed activity: the busiest 10% of items have far more than 10% of the entries
+    busiest = sum(count for _, count in activity.most_common(200))
+    assert busiest > 0.35 * sum(activity.values())
+    engine.dispose()
+
+
+def test_quantity_changes_are_logged_as_the_app_logs_them(seeded):
+    engine, _ = seeded
+    with engine.connect() as conn:
+        actions = Counter(
+            (action, details.startswith("Updated quantity to"))
+            for action, details in conn.execute(text("SELECT action, details FROM audit_logs WHERE entity_type = 1"))
+        )
+    codes = models.AUDIT_ACTION_CODES
+    # The dashboard history reads UPDATE entries whose details start "Updated quantity to"
+    assert actions[(codes["UPDATE"], True)] > 0.6 * sum(actions.values())
+    assert actions[(codes["UPDATE"], False)] > 0
+    assert not any(action == codes["UPDATE_QUANTITY"] or (quantity and action != codes["UPDATE"])
+                   for action, quantity in actions)
+
+
+def test_derived_state_matches_generated_rows(seeded):
+    engine, inserted = seeded
+    assert inserted == {"items": 2000, "audit_logs": 5000, "alerts": 300}
+    indexes = {index["name"] for index in inspect(engine).get_indexes("audit_logs")}
+    assert {index.name for index in models.AuditLog.__table__.indexes} <= indexes
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT value FROM change_sequences WHERE name = 'items'")).scalar() == 2000
+        recent = conn.execute(
+            text("SELECT COUNT(*) FROM audit_logs WHERE entity_type = 1 AND timestamp >= :since"),
+            {"since": NOW - ACTIVITY_RETENTION},
+        ).scalar()
+        assert conn.execute(text("SELECT SUM(count) FROM item_activity")).scalar() == recent
+        assert conn.execute(text("SELECT MAX(timestamp) FROM audit_logs")).scalar() <= str(NOW)
+        assert conn.execute(
+            text("SELECT COUNT(*) FROM alerts WHERE status = 'RESOLVED' AND resolved_at IS NULL")
+        ).scalar() == 0
+
+
+def test_tables_with_rows_are_left_alone(seeded):
+    engine, _ = seeded
+    assert seed(engine, items=10, audit_logs=10, alerts=10, now=NOW) == {"items": 0, "audit_logs": 0, "alerts": 0}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM items")).scalar() == 2000
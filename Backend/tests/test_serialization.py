@@ -0,0 +1,44 @@
+import json
+from app.core.serialization import dumps
+from app.db import models
+from app.schemas import item as item_schemas
+
+
+def test_lean_items_page_matches_response_model(client, db, admin_headers):
+    db.add_all([models.Item(title=f"Item {i}", quantity=i, price=3, category="Tools") for i in range(3)])
+    db.commit()
+    res = client.get("/items/?size=10", headers=admin_headers)
+    assert res.status_code == 200
+    expected = [item_schemas.Item.model_validate(item).model_dump(mode="json")
+                for item in db.query(models.Item).order_by(models.Item.last_updated.desc()).all()]
+    assert res.json()["items"] == expected
+    assert res.json()["total"] == 3
+
+
+def test_lean_alerts_page_serializes_enums_and_joins(client, admin_headers):
+    item = client.post("/items/", json={"title": "Bolt", "quantity": 0}, headers=admin_headers).json()
+    alert = client.get("/alerts/", headers=admin_headers).json()["items"][0]
+    assert alert["alert_type"] == "out_of_stock"
+    assert alert["status"] == "active"
+    assert alert["item_title"] == item["title"]
+    assert alert["created_by_email"] is None
+
+
+def test_exports_stream_ndjson(client, db, admin_headers):
+    client.post("/items/", json={"title": "Bolt", "quantity": 4}, headers=admin_headers)
+    client.post("/items/", json={"title": "Nut", "quantity": 9}, headers=admin_headers)
+
+    res = client.get("/items/export", headers=admin_headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["title"] for line in res.text.splitlines()] == ["Bolt", "Nut"]
+
+    res = client.get("/audit-logs/export", headers=admin_headers)
+    assert [json.loads(line)["action"] for line in res.text.splitlines()] == ["CREATE", "CREATE"]
+
+
+def test_dumps_handles_dates_and_enums():
+    from datetime import date, datetime
+    assert json.loads(dumps({"d": date(2025, 1, 2), "t": datetime(2025, 1, 2, 3, 4, 5), "r": models.Role.ADMIN})) == {
+        "d": "2025-01-02", "t": "2025-01-02T03:04:05", "r": "admin"
+    }
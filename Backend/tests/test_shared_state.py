@@ -0,0 +1,49 @@
+import time
+import pytest
+from app.core.shared_state import MemoryState, DatabaseState
+from app.db.database import Base, create_db_engine
+
+
+@pytest.fixture(params=["memory", "database"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryState()
+        return
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'state.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield DatabaseState(engine)
+    engine.dispose()
+
+
+def test_set_get_delete(state):
+    assert state.get("k") is None
+    state.set("k", "v")
+    assert state.get("k") == "v"
+    state.set("k", "w")
+    assert state.get("k") == "w"
+    state.delete("k")
+    assert state.get("k") is None
+
+
+def test_incr(state):
+    assert state.incr("counter") == 1
+    assert state.incr("counter", 5) == 6
+    assert state.get("counter") == "6"
+
+
+def test_ttl_expiry(state):
+    state.set("flag", "1", ttl=0.05)
+    state.incr("window", ttl=0.05)
+    time.sleep(0.1)
+    assert state.get("flag") is None
+    # An expired counter starts a new window
+    assert state.incr("window", ttl=10) == 1
+
+
+def test_two_handles_share_database_state(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'state.db'}")
+    Base.metadata.create_all(bind=engine)
+    worker_a, worker_b = DatabaseState(engine), DatabaseState(engine)
+    worker_a.incr("version:items")
+    assert worker_b.incr("version:items") == 2
+    engine.dispose()
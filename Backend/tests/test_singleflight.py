@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.singleflight import SingleFlight
+
+
+def _slow(calls, value="report", delay=0.1):
+    def fn():
+        calls.append(1)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls, results = [], []
+    fn = _slow(calls)
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn, ttl=0))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["report"] * 8
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    calls = []
+    assert flight.do(("monthly_report", 2024, 1), _slow(calls, "jan", 0), ttl=0) == "jan"
+    assert flight.do(("monthly_report", 2024, 2), _slow(calls, "feb", 0), ttl=0) == "feb"
+    assert len(calls) == 2
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.do("k", failing, ttl=10)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 4
+    # The failure was not kept: the next call runs again
+    assert flight.do("k", lambda: "ok", ttl=10) == "ok"
+
+
+def test_result_reused_within_ttl():
+    flight = SingleFlight()
+    calls = []
+    fn = _slow(calls, delay=0)
+    flight.do("k", fn, ttl=0.05)
+    flight.do("k", fn, ttl=0.05)
+    assert len(calls) == 1
+
+    time.sleep(0.1)
+    flight.do("k", fn, ttl=0.05)
+    assert len(calls) == 2
+
+    flight.clear()
+    flight.do("k", fn, ttl=0.05)
+    assert len(calls) == 3
+
+
+def test_zero_ttl_keeps_nothing():
+    flight = SingleFlight()
+    calls = []
+    fn = _slow(calls, delay=0)
+    flight.do("k", fn, ttl=0)
+    flight.do("k", fn, ttl=0)
+    assert len(calls) == 2
+
+
+def test_async_callers_wait_on_a_sync_leader():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def leader_fn():
+        started.set()
+        return _slow(calls, delay=0.1)()
+
+    leader = threading.Thread(target=lambda: flight.do("k", leader_fn, ttl=0))
+    leader.start()
+    started.wait()
+
+    async def follower():
+        return await flight.do_async("k", _async_never_called, ttl=0)
+
+    async def followers():
+        return await asyncio.gather(*(follower() for _ in range(3)))
+
+    assert asyncio.run(followers()) == ["report"] * 3
+    leader.join()
+    assert len(calls) == 1
+
+
+async def _async_never_called():
+    pytest.fail("a follower must not run the computation")
+
+
+def test_async_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "report"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", compute, ttl=0) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["report"] * 5
+    assert len(calls) == 1
+
+
+def test_dashboard_requests_coalesce(client, admin_headers, monkeypatch):
+    from app.routers import dashboard
+
+    calls = []
+    compute = dashboard._dashboard_stats
+
+    def counting(db, window, by_location):
+        calls.append(window)
+        time.sleep(0.1)
+        return compute(db, window, by_location)
+
+    monkeypatch.setattr(dashboard, "_dashboard_stats", counting)
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(client.get("/dashboard/stats", headers=admin_headers)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len({r.content for r in responses}) == 1
+    assert calls == ["7d"]
@@ -0,0 +1,87 @@
+import json
+import pytest
+from sqlalchemy import text
+from app.core import slow_queries
+from app.core.slow_queries import SlowQueryLog, fingerprint, redact, set_slow_query_log
+from app.db import models
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    # A threshold this low logs every statement
+    log = SlowQueryLog(threshold_ms=1e-6, log_file=str(tmp_path / "slow.log"))
+    set_slow_query_log(log)
+    yield log
+    log.close()
+    set_slow_query_log(None)
+
+
+def test_fingerprint_collapses_literals_and_parameter_lists():
+    a = fingerprint("SELECT * FROM items WHERE id IN (?, ?, ?) AND name = 'bolt' AND quantity > 10")
+    b = fingerprint("SELECT *  FROM items WHERE id IN (?) AND name = 'it''s' AND quantity > 3.5")
+    assert a == b
+    assert "bolt" not in a
+
+
+def test_redact_keeps_shape_but_not_text():
+    assert redact(("secret@example.com", 5, None, 1.5, b"\x00\x01")) == ["<str:18>", 5, None, 1.5, "<bytes:2>"]
+    assert redact({"email": "x"}) == {"email": "<str:1>"}
+
+
+def test_slow_statements_are_aggregated_with_a_plan(client, admin_headers, db, slow_log, tmp_path):
+    for title in ("bolt", "nut"):
+        db.execute(text("SELECT id FROM items WHERE title = :title"), {"title": title})
+    top = slow_log.top(sort="count")
+    entry = next(e for e in top if "FROM items WHERE title = ?" in e["statement"])
+    assert entry["count"] == 2
+    assert entry["routes"] == {"background": 2}
+    assert "ix_items_title" in entry["plan"]
+
+    lines = [json.loads(line) for line in (tmp_path / "slow.log").read_text().splitlines()]
+    ours = [line for line in lines if line["fingerprint"] == entry["fingerprint"]]
+    assert [line["parameters"] for line in ours] == [["<str:4>"], ["<str:3>"]]
+    # The plan is logged once, with the first occurrence
+    assert "plan" in ours[0] and "plan" not in ours[1]
+
+
+def test_failed_explain_leaves_the_transaction_alone(db):
+    db.add(models.Item(title="Bolt", quantity=1, price=1))
+    db.flush()
+    cursor = db.connection().connection.cursor()
+    plan = slow_queries.explain(cursor, "sqlite", "SELECT no_such_column FROM items", ())
+    assert plan.startswith("EXPLAIN failed")
+    db.commit()
+    assert db.query(models.Item).filter(models.Item.title == "Bolt").count() == 1
+
+
+def test_route_is_recorded_and_admins_can_read_and_reset(client, admin_headers, user_headers, slow_log):
+    client.get("/items/", headers=admin_headers)
+    res = client.get("/slow-queries/?sort=max_ms&limit=50", headers=admin_headers)
+    assert res.status_code == 200
+    routes = {route for entry in res.json() for route in entry["routes"]}
+    assert "GET /items/" in routes
+
+    assert client.get("/slow-queries/?sort=name", headers=admin_headers).status_code == 400
+    assert client.get("/slow-queries/", headers=user_headers).status_code == 403
+    assert client.delete("/slow-queries/", headers=admin_headers).status_code == 204
+    # Only the statements of the GET below are left
+    remaining = client.get("/slow-queries/", headers=admin_headers).json()
+    assert all(set(entry["routes"]) == {"GET /slow-queries/"} for entry in remaining)
+
+
+def test_fast_statements_are_not_recorded(db, tmp_path):
+    log = SlowQueryLog(threshold_ms=10_000, log_file="")
+    set_slow_query_log(log)
+    try:
+        db.query(models.Item).all()
+        assert log.top() == []
+    finally:
+        set_slow_query_log(None)
+
+
+def test_fingerprints_are_bounded(monkeypatch):
+    monkeypatch.setattr(slow_queries, "MAX_FINGERPRINTS", 2)
+    log = SlowQueryLog(threshold_ms=0.001, log_file="")
+    for n, seconds in enumerate((0.3, 0.1, 0.2)):
+        log.observe(None, "sqlite", f"INSERT INTO t{n} VALUES (1)", (), seconds, executemany=False)
+    assert sorted(e["statement"] for e in log.top()) == ["INSERT INTO t0 VALUES (?)", "INSERT INTO t2 VALUES (?)"]
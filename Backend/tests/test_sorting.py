@@ -2,7 +2,7 @@ from app.db import models
 from app.core import security
 import time
 
-def test_items_sorted_by_last_updated(client, admin_headers):
+def test_items_sorted_by_last_updated(client, admin_headers, count_queries):
     # 1. Create Item A
     response = client.post(
         "/items/",
@@ -25,8 +25,10 @@ def test_items_sorted_by_last_updated(client, admin_headers):
     item_b_id = response.json()["id"]
 
     # Verify initial order: B (newest), A (oldest)
-    response = client.get("/items/", headers=admin_headers)
+    with count_queries() as queries:
+        response = client.get("/items/", headers=admin_headers)
     assert response.status_code == 200
+    assert queries.count == 3
     items = response.json()["items"]
     assert len(items) >= 2
     # Check specifically our items in the result list (filtering by IDs we just created)
@@ -47,8 +49,10 @@ def test_items_sorted_by_last_updated(client, admin_headers):
     assert response.status_code == 200
     
     # 6. Verify new order: A (updated newest), B (older)
-    response = client.get("/items/", headers=admin_headers)
+    with count_queries() as queries:
+        response = client.get("/items/", headers=admin_headers)
     assert response.status_code == 200
+    assert queries.count == 3
     items = response.json()["items"]
     our_items = [i for i in items if i["id"] in [item_a_id, item_b_id]]
     
@@ -0,0 +1,68 @@
+import api from './axios';
+
+// One EventSource per tab, shared by every component that subscribes.
+const EVENT_TYPES = ['alerts.count', 'alert.created', 'alert.resolved', 'alert.deleted', 'dashboard.delta'];
+
+let source = null;
+let opening = false;
+let connected = false;
+const listeners = new Set();
+
+const notify = (event) => {
+    listeners.forEach((listener) => listener(event));
+};
+
+const close = () => {
+    if (source) {
+        source.close();
+        source = null;
+    }
+};
+
+const open = async () => {
+    if (!localStorage.getItem('token') || opening) return;
+    opening = true;
+    let ticket;
+    try {
+        // Short-lived and only good for the stream, so the access token stays out of URLs
+        ({ data: { ticket } } = await api.post('/events/ticket'));
+    } catch (error) {
+        notify({ type: 'stream.closed' });
+        return;
+    } finally {
+        opening = false;
+    }
+    if (listeners.size === 0 || source) return;
+    source = new EventSource(`${api.defaults.baseURL}/events/stream?ticket=${encodeURIComponent(ticket)}`);
+    EVENT_TYPES.forEach((type) => {
+        source.addEventListener(type, (e) => notify(JSON.parse(e.data)));
+    });
+    source.addEventListener('stream.expired', () => {
+        // The session ended; a new ticket needs a valid access token
+        close();
+        if (listeners.size > 0) open();
+    });
+    source.onopen = () => {
+        connected = true;
+    };
+    source.onerror = () => {
+        // The browser would retry with the same ticket, which expires within a minute
+        const wasConnected = connected;
+        connected = false;
+        close();
+        if (wasConnected && listeners.size > 0) {
+            open();
+        } else {
+            notify({ type: 'stream.closed' });
+        }
+    };
+};
+
+export const subscribeToEvents = (listener) => {
+    listeners.add(listener);
+    if (!source) open();
+    return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0) close();
+    };
+};
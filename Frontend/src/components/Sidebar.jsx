@@ -2,6 +2,7 @@ import React, { useContext, useState, useEffect } from 'react';
 import { Link, useNavigate, useLocation } from 'react-router-dom';
 import AuthContext from '../context/AuthProvider';
 import api from '../api/axios';
+import { subscribeToEvents } from '../api/events';
 import './Sidebar.css';
 import TokenTimer from './TokenTimer';
 
@@ -13,9 +14,20 @@ const Sidebar = ({ isCollapsed, toggleCollapse }) => {
 
     useEffect(() => {
         if (user) {
-            fetchAlertCount();
-            const interval = setInterval(fetchAlertCount, 10000); // Poll every 30s
-            return () => clearInterval(interval);
+            // Alert counts are pushed over the event stream; poll only if it is unavailable
+            let interval = null;
+            const unsubscribe = subscribeToEvents((event) => {
+                if (event.active_alerts !== undefined) {
+                    setAlertCount(event.active_alerts);
+                } else if (event.type === 'stream.closed' && !interval) {
+                    fetchAlertCount();
+                    interval = setInterval(fetchAlertCount, 30000);
+                }
+            });
+            return () => {
+                unsubscribe();
+                if (interval) clearInterval(interval);
+            };
         }
     }, [user]);
 
@@ -11,6 +11,7 @@ import {
 } from 'chart.js';
 import { Line } from 'react-chartjs-2';
 import api from '../api/axios';
+import { subscribeToEvents } from '../api/events';
 import AuthContext from '../context/AuthProvider';
 import './Dashboard.css';
 
@@ -35,6 +36,26 @@ const Dashboard = () => {
         fetchAllData();
     }, []);
 
+    useEffect(() => {
+        // Keep the summary cards current from pushed deltas instead of refetching
+        return subscribeToEvents((event) => {
+            setStats((prev) => {
+                if (!prev) return prev;
+                if (event.type === 'dashboard.delta') {
+                    const summary = { ...prev.summary };
+                    Object.entries(event.delta).forEach(([key, value]) => {
+                        summary[key] = (summary[key] || 0) + value;
+                    });
+                    return { ...prev, summary };
+                }
+                if (event.active_alerts !== undefined) {
+                    return { ...prev, summary: { ...prev.summary, active_alerts: event.active_alerts } };
+                }
+                return prev;
+            });
+        });
+    }, []);
+
     const fetchAllData = async () => {
         setLoading(true);
         setError('');